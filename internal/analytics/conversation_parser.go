@@ -63,6 +63,27 @@ func NewConversationParser(repo *database.Repository) *ConversationParser {
 	}
 }
 
+// stringInterner returns one shared copy of strings that repeat across conversation lines.
+// Every decoded line allocates its own tool name, session ID, working directory and branch,
+// and up to maxToolMapSize pending tool executions keep them alive.
+type stringInterner map[string]string
+
+// intern returns the shared copy of s
+func (in stringInterner) intern(s string) string {
+	if shared, ok := in[s]; ok {
+		return shared
+	}
+	in[s] = s
+	return s
+}
+
+// resultSucceeded reports whether a tool result reads as a success, i.e. mentions neither "error" nor "failed".
+// Results can be whole file contents, so the result is lowercased once for both checks.
+func resultSucceeded(result string) bool {
+	lower := strings.ToLower(result)
+	return !strings.Contains(lower, "error") && !strings.Contains(lower, "failed")
+}
+
 // ParseConversationFile parses a conversation file and records tool usage.
 // It applies memory limits to prevent unbounded growth on large conversation files.
 func (cp *ConversationParser) ParseConversationFile(filePath string) error {
@@ -73,6 +94,7 @@ func (cp *ConversationParser) ParseConversationFile(filePath string) error {
 	defer file.Close() //nolint:errcheck
 
 	toolMap := make(map[string]*ToolExecution)
+	strs := make(stringInterner)
 	scanner := bufio.NewScanner(file)
 
 	// Configure scanner buffer with memory limit
@@ -91,6 +113,12 @@ func (cp *ConversationParser) ParseConversationFile(filePath string) error {
 			continue // Skip malformed messages
 		}
 
+		// Every tool use and text block of a message shares its timestamp, so parse it once per line
+		var timestamp time.Time
+		if msg.Type == "assistant" || msg.Type == "user" {
+			timestamp, _ = time.Parse(time.RFC3339, msg.Timestamp)
+		}
+
 		// Process assistant messages for tool_use
 		if msg.Type == "assistant" && msg.Message.Role == "assistant" {
 			for _, content := range msg.Message.Content {
@@ -108,14 +136,13 @@ func (cp *ConversationParser) ParseConversationFile(filePath string) error {
 						}
 					}
 
-					timestamp, _ := time.Parse(time.RFC3339, msg.Timestamp)
 					toolMap[content.ID] = &ToolExecution{
 						ToolID:           content.ID,
-						ToolName:         content.Name,
+						ToolName:         strs.intern(content.Name),
 						Input:            content.Input,
-						ConversationID:   msg.SessionID,
-						WorkingDirectory: msg.CWD,
-						GitBranch:        msg.GitBranch,
+						ConversationID:   strs.intern(msg.SessionID),
+						WorkingDirectory: strs.intern(msg.CWD),
+						GitBranch:        strs.intern(msg.GitBranch),
 						ExecutedAt:       timestamp,
 					}
 				}
@@ -140,8 +167,7 @@ func (cp *ConversationParser) ParseConversationFile(filePath string) error {
 						}
 
 						tool.Result = result
-						tool.Success = !strings.Contains(strings.ToLower(result), "error") &&
-							!strings.Contains(strings.ToLower(result), "failed")
+						tool.Success = resultSucceeded(result)
 
 						// Record the tool execution
 						if err := cp.recordToolExecution(tool); err != nil {
@@ -156,7 +182,6 @@ func (cp *ConversationParser) ParseConversationFile(filePath string) error {
 
 				// Handle user text messages
 				if content.Type == "text" && content.Text != "" {
-					timestamp, _ := time.Parse(time.RFC3339, msg.Timestamp)
 					userMsg := &database.UserMessage{
 						ConversationID:   msg.SessionID,
 						Message:          content.Text,
@@ -6,6 +6,7 @@ import (
 	"path/filepath"
 	"testing"
 	"time"
+	"unsafe"
 
 	"github.com/schlunsen/claude-control-terminal/internal/database"
 )
@@ -35,6 +36,38 @@ func TestNewConversationParser(t *testing.T) {
 	}
 }
 
+func TestStringInterner(t *testing.T) {
+	strs := make(stringInterner)
+
+	first := strs.intern(string([]byte("Bash")))
+	second := strs.intern(string([]byte("Bash")))
+	if first != "Bash" || second != "Bash" {
+		t.Errorf("expected 'Bash', got %q and %q", first, second)
+	}
+	if unsafe.StringData(first) != unsafe.StringData(second) {
+		t.Error("expected equal strings to share one copy")
+	}
+	if len(strs) != 1 {
+		t.Errorf("expected 1 interned string, got %d", len(strs))
+	}
+}
+
+func TestResultSucceeded(t *testing.T) {
+	tests := map[string]bool{
+		"File written":            true,
+		"":                        true,
+		"Error: file not found":   false,
+		"command FAILED with 1":   false,
+		"no errors, build failed": false,
+	}
+
+	for result, expected := range tests {
+		if got := resultSucceeded(result); got != expected {
+			t.Errorf("expected resultSucceeded(%q) = %v, got %v", result, expected, got)
+		}
+	}
+}
+
 func TestParseConversationFileNonExistent(t *testing.T) {
 	tempDB := setupTestDB(t)
 	defer tempDB.Close()
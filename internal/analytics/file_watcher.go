@@ -79,15 +79,29 @@ func (fw *FileWatcher) Start() error {
 	return nil
 }
 
+// refreshDebounce is how long the watcher waits after a change before refreshing.
+const refreshDebounce = 100 * time.Millisecond
+
 // watchLoop handles file system events until context is cancelled.
+// A single timer debounces changes: the first change arms it, and changes arriving
+// before it fires are folded into the same refresh instead of each waiting on a timer of its own.
 func (fw *FileWatcher) watchLoop() {
 	defer fw.wg.Done()
 
+	debounce := time.NewTimer(refreshDebounce)
+	debounce.Stop()
+	defer debounce.Stop()
+	pending := false
+
 	for {
 		select {
 		case <-fw.ctx.Done():
 			return
 
+		case <-debounce.C:
+			pending = false
+			fw.triggerRefresh()
+
 		case event, ok := <-fw.watcher.Events:
 			if !ok {
 				return
@@ -95,15 +109,11 @@ func (fw *FileWatcher) watchLoop() {
 
 			// Only trigger on .jsonl file changes
 			if filepath.Ext(event.Name) == ".jsonl" {
-				if event.Op&fsnotify.Write == fsnotify.Write ||
-					event.Op&fsnotify.Create == fsnotify.Create {
+				if (event.Op&fsnotify.Write == fsnotify.Write ||
+					event.Op&fsnotify.Create == fsnotify.Create) && !pending {
 					// Debounce: wait a bit to avoid multiple rapid refreshes
-					select {
-					case <-time.After(100 * time.Millisecond):
-						fw.triggerRefresh()
-					case <-fw.ctx.Done():
-						return
-					}
+					debounce.Reset(refreshDebounce)
+					pending = true
 				}
 			}
 
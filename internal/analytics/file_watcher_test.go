@@ -286,6 +286,51 @@ func TestFileWatcher_FileChange(t *testing.T) {
 	}
 }
 
+func TestFileWatcher_BurstCoalesced(t *testing.T) {
+	tmpDir := t.TempDir()
+
+	callCount := 0
+	var mu sync.Mutex
+
+	callback := func() error {
+		mu.Lock()
+		callCount++
+		mu.Unlock()
+		return nil
+	}
+
+	fw, err := NewFileWatcherWithOptions(tmpDir, callback, true)
+	if err != nil {
+		t.Fatalf("NewFileWatcher failed: %v", err)
+	}
+	defer fw.Stop()
+
+	fw.Start()
+
+	// Give watcher time to start
+	time.Sleep(100 * time.Millisecond)
+
+	// Write a burst of changes well within the debounce window
+	const writes = 10
+	testFile := filepath.Join(tmpDir, "test.jsonl")
+	for i := 0; i < writes; i++ {
+		if err := os.WriteFile(testFile, []byte("test content"), 0644); err != nil {
+			t.Fatalf("Failed to write test file: %v", err)
+		}
+	}
+
+	// Wait for debounce and callback
+	time.Sleep(300 * time.Millisecond)
+
+	mu.Lock()
+	count := callCount
+	mu.Unlock()
+
+	if count < 1 || count >= writes {
+		t.Errorf("Expected the burst to be coalesced into fewer than %d refreshes, got %d", writes, count)
+	}
+}
+
 func TestFileWatcher_NonJsonlFileIgnored(t *testing.T) {
 	tmpDir := t.TempDir()
 
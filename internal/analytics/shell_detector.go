@@ -8,6 +8,9 @@ import (
 	"time"
 )
 
+// shellIDPattern extracts the shell ID from a background shell command line
+var shellIDPattern = regexp.MustCompile(`shell-(\d+)`)
+
 // BackgroundShell represents a background bash shell process
 type BackgroundShell struct {
 	ShellID    string    `json:"shell_id"`
@@ -57,7 +60,6 @@ func (sd *ShellDetector) DetectBackgroundShells() ([]BackgroundShell, error) {
 	}
 
 	lines := strings.Split(out.String(), "\n")
-	shellIDPattern := regexp.MustCompile(`shell-(\d+)`)
 
 	for _, line := range lines {
 		line = strings.TrimSpace(line)
@@ -178,42 +178,30 @@ func ProcessMCPFile(mcpContent string, destPath string, selectedMCPs []string) e
 		return fmt.Errorf("failed to parse MCP config: %w", err)
 	}
 
-	// Clean and prepare MCP config (remove descriptions)
-	cleanMcpConfig := map[string]interface{}{
-		"mcpServers": make(map[string]interface{}),
-	}
-
-	if servers, ok := mcpConfig["mcpServers"].(map[string]interface{}); ok {
-		cleanServers := make(map[string]interface{})
-
-		for serverName, serverConfig := range servers {
-			if serverMap, ok := serverConfig.(map[string]interface{}); ok {
-				// Copy server config without description
-				cleanServerConfig := make(map[string]interface{})
-				for key, value := range serverMap {
-					if key != "description" {
-						cleanServerConfig[key] = value
-					}
-				}
-				cleanServers[serverName] = cleanServerConfig
+	// Pick the servers to write: the selected ones, or all of them if none were selected
+	servers, _ := mcpConfig["mcpServers"].(map[string]interface{})
+	if len(selectedMCPs) > 0 {
+		selected := make(map[string]interface{}, len(selectedMCPs))
+		for _, mcpID := range selectedMCPs {
+			if serverValue, exists := servers[mcpID]; exists {
+				selected[mcpID] = serverValue
 			}
 		}
-
-		cleanMcpConfig["mcpServers"] = cleanServers
+		servers = selected
 	}
 
-	// Filter MCPs based on selection
-	if len(selectedMCPs) > 0 {
-		if servers, ok := cleanMcpConfig["mcpServers"].(map[string]interface{}); ok {
-			filteredServers := make(map[string]interface{})
-			for _, mcpID := range selectedMCPs {
-				if serverValue, exists := servers[mcpID]; exists {
-					filteredServers[mcpID] = serverValue
-				}
-			}
-			cleanMcpConfig["mcpServers"] = filteredServers
+	// Remove descriptions. The parsed config is ours, so server entries are edited
+	// in place instead of being copied key by key into new maps.
+	cleanServers := make(map[string]interface{}, len(servers))
+	for serverName, serverConfig := range servers {
+		if serverMap, ok := serverConfig.(map[string]interface{}); ok {
+			delete(serverMap, "description")
+			cleanServers[serverName] = serverMap
 		}
 	}
+	cleanMcpConfig := map[string]interface{}{
+		"mcpServers": cleanServers,
+	}
 
 	// Ensure directory exists
 	if err := os.MkdirAll(filepath.Dir(destPath), 0755); err != nil {
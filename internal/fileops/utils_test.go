@@ -662,6 +662,39 @@ func TestProcessMCPFile(t *testing.T) {
 	}
 }
 
+func TestProcessMCPFileWithoutSelection(t *testing.T) {
+	destPath := filepath.Join(t.TempDir(), ".mcp.json")
+
+	mcpContent := `{
+		"mcpServers": {
+			"server1": {"command": "node", "description": "Server 1 description"},
+			"server2": {"command": "python"}
+		}
+	}`
+
+	if err := ProcessMCPFile(mcpContent, destPath, nil); err != nil {
+		t.Fatalf("ProcessMCPFile failed: %v", err)
+	}
+
+	data, err := os.ReadFile(destPath)
+	if err != nil {
+		t.Fatalf("Failed to read MCP file: %v", err)
+	}
+
+	var mcpConfig map[string]map[string]map[string]interface{}
+	if err := json.Unmarshal(data, &mcpConfig); err != nil {
+		t.Fatalf("Failed to parse MCP config: %v", err)
+	}
+
+	servers := mcpConfig["mcpServers"]
+	if len(servers) != 2 {
+		t.Errorf("Expected all 2 servers without a selection, got %d", len(servers))
+	}
+	if _, ok := servers["server1"]["description"]; ok {
+		t.Error("description should be removed from server1")
+	}
+}
+
 func TestCheckWritePermissions(t *testing.T) {
 	// Create temp directory
 	tempDir, err := os.MkdirTemp("", "test_writeperms_*")
@@ -11,6 +11,9 @@ import (
 	"time"
 )
 
+// nodeVersionPattern matches the numeric part of a Node.js version (e.g., "18.17.0")
+var nodeVersionPattern = regexp.MustCompile(`^(\d+)\.(\d+)\.(\d+)`)
+
 // NodeInfo contains information about the Node.js installation
 type NodeInfo struct {
 	// Installed indicates if Node.js is found in PATH
@@ -115,8 +118,7 @@ func (nd *NodeDetector) ParseNodeVersion(version string) (major, minor, patch in
 	version = strings.TrimPrefix(version, "v")
 
 	// Match version pattern (e.g., "18.17.0")
-	re := regexp.MustCompile(`^(\d+)\.(\d+)\.(\d+)`)
-	matches := re.FindStringSubmatch(version)
+	matches := nodeVersionPattern.FindStringSubmatch(version)
 
 	if len(matches) < 4 {
 		return 0, 0, 0, fmt.Errorf("invalid version format: %s", version)
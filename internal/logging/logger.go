@@ -190,6 +190,12 @@ func (l *Logger) IsVerbose() bool {
 
 // Helper functions for global logger
 
+// DebugEnabled reports whether debug messages are logged.
+// Hot loops check it once so disabled debug calls don't box their arguments.
+func DebugEnabled() bool {
+	return globalLogger.IsVerbose()
+}
+
 // Debug logs a debug message to the global logger
 func Debug(format string, args ...interface{}) {
 	if globalLogger != nil {
@@ -0,0 +1,235 @@
+package server
+
+import (
+	"encoding/json"
+	"os"
+	"path/filepath"
+	"strings"
+	"sync"
+	"time"
+)
+
+// agentFiles caches parsed agent definitions across requests
+var agentFiles = newAgentFileCache()
+
+// agentLists caches the encoded agent list response per agents directory
+var agentLists = newAgentListCache()
+
+// agentFile is a parsed agent definition file
+type agentFile struct {
+	modTime time.Time
+	size    int64
+
+	// frontmatter holds the frontmatter fields only (agent list); nil if the file has none
+	frontmatter map[string]interface{}
+	// detail holds the frontmatter plus system prompt (agent detail); nil if the file has no frontmatter
+	detail map[string]interface{}
+
+	// detailBody is the encoded agent detail response, built on first request
+	detailOnce sync.Once
+	detailBody []byte
+	detailErr  error
+}
+
+// detailJSON returns the encoded {"agent": detail} response, encoding it only once per parsed file
+func (af *agentFile) detailJSON() ([]byte, error) {
+	af.detailOnce.Do(func() {
+		af.detailBody, af.detailErr = json.Marshal(map[string]interface{}{"agent": af.detail})
+	})
+	return af.detailBody, af.detailErr
+}
+
+// agentFileCache caches parsed agent files by path.
+// Entries are reused until the file's size or modification time changes.
+type agentFileCache struct {
+	mu       sync.RWMutex
+	entries  map[string]*agentFile
+	inflight map[string]*agentFileLoad
+}
+
+// agentFileLoad is a read in progress; concurrent callers for the same path wait for it instead of re-reading
+type agentFileLoad struct {
+	done chan struct{}
+	af   *agentFile
+	err  error
+}
+
+// newAgentFileCache creates an empty agent file cache
+func newAgentFileCache() *agentFileCache {
+	return &agentFileCache{
+		entries:  make(map[string]*agentFile),
+		inflight: make(map[string]*agentFileLoad),
+	}
+}
+
+// load returns the parsed agent file at path, reading and parsing it only if it changed since the last load
+func (ac *agentFileCache) load(path string) (*agentFile, error) {
+	info, err := os.Stat(path)
+	if err != nil {
+		if os.IsNotExist(err) {
+			ac.forget(path)
+		}
+		return nil, err
+	}
+	return ac.loadInfo(path, info)
+}
+
+// loadEntry is like load but reuses the file info from a directory listing instead of a separate stat.
+// Symlinks are still resolved with a stat so edits to their targets are noticed.
+func (ac *agentFileCache) loadEntry(dir string, entry os.DirEntry) (*agentFile, error) {
+	path := filepath.Join(dir, entry.Name())
+
+	info, err := entry.Info()
+	if err != nil || info.Mode()&os.ModeSymlink != 0 {
+		return ac.load(path)
+	}
+	return ac.loadInfo(path, info)
+}
+
+// loadInfo returns the cached entry for path if info still matches it, otherwise reads and parses the file
+func (ac *agentFileCache) loadInfo(path string, info os.FileInfo) (*agentFile, error) {
+	ac.mu.RLock()
+	cached, ok := ac.entries[path]
+	ac.mu.RUnlock()
+	if ok && cached.matches(info) {
+		return cached, nil
+	}
+
+	// Check again under the write lock: another caller may have refreshed the entry or be reading it now
+	ac.mu.Lock()
+	if cached, ok := ac.entries[path]; ok && cached.matches(info) {
+		ac.mu.Unlock()
+		return cached, nil
+	}
+	if load, ok := ac.inflight[path]; ok {
+		ac.mu.Unlock()
+		<-load.done
+		return load.af, load.err
+	}
+	load := &agentFileLoad{done: make(chan struct{})}
+	ac.inflight[path] = load
+	ac.mu.Unlock()
+
+	load.af, load.err = readAgentFile(path, info)
+
+	ac.mu.Lock()
+	delete(ac.inflight, path)
+	if load.err == nil {
+		ac.entries[path] = load.af
+	} else if os.IsNotExist(load.err) {
+		delete(ac.entries, path)
+	}
+	ac.mu.Unlock()
+	close(load.done)
+
+	return load.af, load.err
+}
+
+// readAgentFile reads and parses the agent file at path, stamping it with info
+func readAgentFile(path string, info os.FileInfo) (*agentFile, error) {
+	content, err := os.ReadFile(path)
+	if err != nil {
+		return nil, err
+	}
+
+	af := parseAgentFile(string(content))
+	af.modTime = info.ModTime()
+	af.size = info.Size()
+	return af, nil
+}
+
+// matches reports whether the cached entry still reflects a file with the given info
+func (af *agentFile) matches(info os.FileInfo) bool {
+	return af.size == info.Size() && af.modTime.Equal(info.ModTime())
+}
+
+// forget drops the cached entry for path
+func (ac *agentFileCache) forget(path string) {
+	ac.mu.Lock()
+	delete(ac.entries, path)
+	ac.mu.Unlock()
+}
+
+// prune drops cached entries in dir whose files are no longer among files,
+// so agents deleted from disk do not stay cached for the life of the server
+func (ac *agentFileCache) prune(dir string, files []os.DirEntry) {
+	seen := make(map[string]struct{}, len(files))
+	for _, entry := range files {
+		seen[filepath.Join(dir, entry.Name())] = struct{}{}
+	}
+
+	ac.mu.Lock()
+	for path := range ac.entries {
+		if filepath.Dir(path) != dir {
+			continue
+		}
+		if _, ok := seen[path]; !ok {
+			delete(ac.entries, path)
+		}
+	}
+	ac.mu.Unlock()
+}
+
+// parseAgentFile parses the frontmatter once and derives both the list and detail views from it
+func parseAgentFile(content string) *agentFile {
+	frontmatter, body, hasBody, ok := splitFrontmatter(content)
+	if !ok {
+		return &agentFile{}
+	}
+
+	fields := parseFrontmatterFields(frontmatter)
+	detail := make(map[string]interface{}, len(fields)+2)
+	for key, value := range fields {
+		detail[key] = value
+	}
+
+	if hasBody {
+		systemPrompt := strings.TrimSpace(body)
+		detail["system_prompt"] = systemPrompt
+		detail["system_prompt_length"] = len(systemPrompt)
+	}
+
+	return &agentFile{frontmatter: fields, detail: detail}
+}
+
+// agentListCache remembers the last encoded agent list for each directory.
+// A cached body is valid as long as the directory still yields the very same parsed files,
+// which the file cache only replaces when a file changes.
+type agentListCache struct {
+	mu      sync.Mutex
+	entries map[string]*agentList
+}
+
+// agentList is an encoded agent list and the parsed files it was built from
+type agentList struct {
+	files []*agentFile
+	body  []byte
+}
+
+// newAgentListCache creates an empty agent list cache
+func newAgentListCache() *agentListCache {
+	return &agentListCache{entries: make(map[string]*agentList)}
+}
+
+// get returns the cached body for dir if it was built from exactly these files
+func (lc *agentListCache) get(dir string, files []*agentFile) ([]byte, bool) {
+	lc.mu.Lock()
+	list, ok := lc.entries[dir]
+	lc.mu.Unlock()
+	if !ok || len(list.files) != len(files) {
+		return nil, false
+	}
+	for i, af := range files {
+		if af != list.files[i] {
+			return nil, false
+		}
+	}
+	return list.body, true
+}
+
+// put stores the body encoded from files for dir
+func (lc *agentListCache) put(dir string, files []*agentFile, body []byte) {
+	lc.mu.Lock()
+	lc.entries[dir] = &agentList{files: files, body: body}
+	lc.mu.Unlock()
+}
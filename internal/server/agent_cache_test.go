@@ -0,0 +1,183 @@
+package server
+
+import (
+	"os"
+	"path/filepath"
+	"sync"
+	"testing"
+	"time"
+)
+
+func TestAgentFileCache(t *testing.T) {
+	cache := newAgentFileCache()
+	path := filepath.Join(t.TempDir(), "reviewer.md")
+
+	if err := os.WriteFile(path, []byte("---\nname: reviewer\n---\nReview code."), 0644); err != nil {
+		t.Fatalf("Failed to write agent file: %v", err)
+	}
+
+	first, err := cache.load(path)
+	if err != nil {
+		t.Fatalf("load failed: %v", err)
+	}
+	if first.frontmatter["name"] != "reviewer" {
+		t.Errorf("expected name 'reviewer', got %v", first.frontmatter["name"])
+	}
+	if _, ok := first.frontmatter["system_prompt"]; ok {
+		t.Error("list view should not include system_prompt")
+	}
+	if first.detail["system_prompt"] != "Review code." {
+		t.Errorf("expected system_prompt 'Review code.', got %v", first.detail["system_prompt"])
+	}
+
+	// Unchanged file is served from cache
+	second, err := cache.load(path)
+	if err != nil {
+		t.Fatalf("load failed: %v", err)
+	}
+	if second != first {
+		t.Error("expected cached entry for unchanged file")
+	}
+
+	// Modified file is re-parsed
+	if err := os.WriteFile(path, []byte("---\nname: auditor\n---\nAudit code."), 0644); err != nil {
+		t.Fatalf("Failed to rewrite agent file: %v", err)
+	}
+	future := time.Now().Add(time.Minute)
+	if err := os.Chtimes(path, future, future); err != nil {
+		t.Fatalf("Failed to update mtime: %v", err)
+	}
+
+	third, err := cache.load(path)
+	if err != nil {
+		t.Fatalf("load failed: %v", err)
+	}
+	if third.frontmatter["name"] != "auditor" {
+		t.Errorf("expected reloaded name 'auditor', got %v", third.frontmatter["name"])
+	}
+
+	// Deleted file is dropped from cache
+	if err := os.Remove(path); err != nil {
+		t.Fatalf("Failed to remove agent file: %v", err)
+	}
+	if _, err := cache.load(path); !os.IsNotExist(err) {
+		t.Errorf("expected not-exist error, got %v", err)
+	}
+	if _, ok := cache.entries[path]; ok {
+		t.Error("expected deleted file to be evicted from cache")
+	}
+}
+
+func TestAgentFileCacheConcurrentLoads(t *testing.T) {
+	cache := newAgentFileCache()
+	path := filepath.Join(t.TempDir(), "reviewer.md")
+
+	if err := os.WriteFile(path, []byte("---\nname: reviewer\n---\nReview code."), 0644); err != nil {
+		t.Fatalf("Failed to write agent file: %v", err)
+	}
+
+	const callers = 16
+	results := make([]*agentFile, callers)
+	var wg sync.WaitGroup
+	for i := 0; i < callers; i++ {
+		wg.Add(1)
+		go func(i int) {
+			defer wg.Done()
+			af, err := cache.load(path)
+			if err != nil {
+				t.Errorf("load failed: %v", err)
+				return
+			}
+			results[i] = af
+		}(i)
+	}
+	wg.Wait()
+
+	// Every caller must share the single parsed entry
+	for i, af := range results {
+		if af != results[0] {
+			t.Errorf("caller %d got a different entry than caller 0", i)
+		}
+	}
+	if len(cache.inflight) != 0 {
+		t.Errorf("expected no in-flight loads, got %d", len(cache.inflight))
+	}
+}
+
+func TestAgentFileCachePrune(t *testing.T) {
+	cache := newAgentFileCache()
+	dir := t.TempDir()
+
+	for _, name := range []string{"reviewer.md", "auditor.md"} {
+		content := "---\nname: " + name + "\n---\nBody."
+		if err := os.WriteFile(filepath.Join(dir, name), []byte(content), 0644); err != nil {
+			t.Fatalf("Failed to write agent file: %v", err)
+		}
+	}
+
+	scan := func() {
+		files, err := os.ReadDir(dir)
+		if err != nil {
+			t.Fatalf("Failed to read dir: %v", err)
+		}
+		for _, entry := range files {
+			if _, err := cache.loadEntry(dir, entry); err != nil {
+				t.Fatalf("loadEntry failed: %v", err)
+			}
+		}
+		cache.prune(dir, files)
+	}
+
+	scan()
+	if len(cache.entries) != 2 {
+		t.Fatalf("expected 2 cached entries, got %d", len(cache.entries))
+	}
+
+	// An entry from another directory must survive pruning
+	other := filepath.Join(t.TempDir(), "other.md")
+	if err := os.WriteFile(other, []byte("---\nname: other\n---\nBody."), 0644); err != nil {
+		t.Fatalf("Failed to write agent file: %v", err)
+	}
+	if _, err := cache.load(other); err != nil {
+		t.Fatalf("load failed: %v", err)
+	}
+
+	// Deleted file is pruned on the next scan
+	if err := os.Remove(filepath.Join(dir, "auditor.md")); err != nil {
+		t.Fatalf("Failed to remove agent file: %v", err)
+	}
+	scan()
+	if len(cache.entries) != 2 {
+		t.Errorf("expected 2 cached entries after delete, got %d", len(cache.entries))
+	}
+	if _, ok := cache.entries[filepath.Join(dir, "auditor.md")]; ok {
+		t.Error("expected deleted file to be pruned from cache")
+	}
+	if _, ok := cache.entries[other]; !ok {
+		t.Error("expected entry from another directory to be kept")
+	}
+}
+
+func TestAgentListCache(t *testing.T) {
+	cache := newAgentListCache()
+	a, b := &agentFile{}, &agentFile{}
+
+	if _, ok := cache.get("/agents", []*agentFile{a, b}); ok {
+		t.Error("expected miss on empty cache")
+	}
+
+	cache.put("/agents", []*agentFile{a, b}, []byte(`{"count":2}`))
+
+	if body, ok := cache.get("/agents", []*agentFile{a, b}); !ok || string(body) != `{"count":2}` {
+		t.Errorf("expected cached body, got %q (hit=%v)", body, ok)
+	}
+	if _, ok := cache.get("/agents", []*agentFile{a, &agentFile{}}); ok {
+		t.Error("expected miss when a file was re-parsed")
+	}
+	if _, ok := cache.get("/agents", []*agentFile{a}); ok {
+		t.Error("expected miss when a file was removed")
+	}
+	if _, ok := cache.get("/other", []*agentFile{a, b}); ok {
+		t.Error("expected miss for a different directory")
+	}
+}
@@ -1,13 +1,16 @@
 package agents
 
 import (
+	"bytes"
 	"database/sql"
 	"encoding/json"
 	"fmt"
 	"log"
 	"net/http"
+	"strings"
 	"sync"
 	"time"
+	"unicode/utf8"
 
 	"github.com/google/uuid"
 	"github.com/gorilla/websocket"
@@ -23,6 +26,25 @@ var upgrader = websocket.Upgrader{
 	},
 }
 
+// pongFrame is the reply to a ping, encoded once and written as-is
+var pongFrame, _ = json.Marshal(BaseMessage{Type: MessageTypePong})
+
+// maxPooledBufferSize keeps oversized frames (e.g. image payloads) out of the buffer pool
+const maxPooledBufferSize = 64 * 1024
+
+// jsonBufferPool recycles encode buffers for outbound WebSocket frames
+var jsonBufferPool = sync.Pool{
+	New: func() interface{} { return new(bytes.Buffer) },
+}
+
+// encodeJSON writes v to buf without HTML escaping; frames are never embedded in HTML,
+// and agent output is full of <, > and & that would otherwise grow to six bytes each
+func encodeJSON(buf *bytes.Buffer, v interface{}) error {
+	enc := json.NewEncoder(buf)
+	enc.SetEscapeHTML(false)
+	return enc.Encode(v)
+}
+
 // AgentHandler manages WebSocket connections and Claude Agent SDK integration
 type AgentHandler struct {
 	Config         *Config         // Exported for server access
@@ -73,29 +95,58 @@ func (h *AgentHandler) HandleWebSocket(w http.ResponseWriter, r *http.Request) {
 		h.Mu.Unlock()
 	}()
 
+	// Responses are only forwarded to sessions marked connected; track the ones this connection
+	// streams so they are marked disconnected again when it closes
+	connectedSessions := make(map[uuid.UUID]struct{})
+	registerSession := func(session *AgentSession) {
+		session.SetWebSocketConnected(true)
+		connectedSessions[session.ID] = struct{}{}
+	}
+	defer func() {
+		for sessionID := range connectedSessions {
+			if session, err := h.SessionManager.GetSession(sessionID); err == nil {
+				session.SetWebSocketConnected(false)
+				session.DiscardPendingResponses()
+			}
+		}
+	}()
+
 	log.Printf("WebSocket connection established from %s", r.RemoteAddr)
 
 	// Main message loop
 	for {
-		var rawMsg map[string]interface{}
-		if err := ws.ReadJSON(&rawMsg); err != nil {
+		_, data, err := ws.ReadMessage()
+		if err != nil {
 			if websocket.IsUnexpectedCloseError(err, websocket.CloseGoingAway, websocket.CloseAbnormalClosure) {
 				log.Printf("Error receiving message: %v", err)
 			}
 			return
 		}
 
-		msgType, ok := rawMsg["type"].(string)
-		if !ok {
-			log.Printf("ERROR: Missing or invalid message type in: %+v", rawMsg)
+		// Decode only the type here; handlers decode the frame straight into their typed message
+		var base BaseMessage
+		if err := json.Unmarshal(data, &base); err != nil || base.Type == "" {
+			log.Printf("ERROR: Missing or invalid message type in: %s", data)
 			h.sendError(ws, "missing or invalid message type")
 			continue
 		}
+		msgType := base.Type
+
+		// Pings are the most frequent frame on an idle connection; answer them without logging or routing
+		if msgType == MessageTypePing {
+			if err := ws.WriteMessage(websocket.TextMessage, pongFrame); err != nil {
+				log.Printf("Failed to send pong: %v", err)
+			}
+			continue
+		}
 
-		log.Printf("📥 WS INCOMING: type=%s, sessionID=%v, data=%+v", msgType, rawMsg["session_id"], rawMsg)
+		// Boxing data for the log call allocates per frame, so skip it unless debugging
+		if logging.DebugEnabled() {
+			logging.Debug("📥 WS INCOMING: type=%s, data=%s", msgType, data)
+		}
 
 		// Route message to appropriate handler
-		if err := h.routeMessage(ws, MessageType(msgType), rawMsg); err != nil {
+		if err := h.routeMessage(ws, msgType, data, registerSession); err != nil {
 			log.Printf("ERROR: Failed to handle message type %s: %v", msgType, err)
 			h.sendError(ws, fmt.Sprintf("message handling failed: %v", err))
 		}
@@ -123,7 +174,7 @@ func (h *AgentHandler) HandleFiberWebSocket(c *fiberws.Conn) {
 	h.Mu.Unlock()
 
 	// Track which sessions are connected via this WebSocket
-	connectedSessions := make(map[uuid.UUID]bool)
+	connectedSessions := make(map[uuid.UUID]struct{})
 	var connectedSessionsMu sync.Mutex
 
 	// Helper function to register a session with this WebSocket
@@ -141,7 +192,7 @@ func (h *AgentHandler) HandleFiberWebSocket(c *fiberws.Conn) {
 			session.SetWebSocketConnected(true)
 		}
 
-		connectedSessions[sessionID] = true
+		connectedSessions[sessionID] = struct{}{}
 		logging.Info("Session %s registered with WebSocket connection", sessionID)
 	}
 
@@ -159,46 +210,66 @@ func (h *AgentHandler) HandleFiberWebSocket(c *fiberws.Conn) {
 				session.SetWebSocketConnected(false)
 				session.CleanupPendingPermissions()
 				session.StopPermissionForwarder()
+				if discarded := session.DiscardPendingResponses(); discarded > 0 {
+					logging.Debug("Discarded %d undelivered messages for session %s", discarded, sessionID)
+				}
 			}
 		}
 		connectedSessionsMu.Unlock()
 	}()
 
+	// All writes for this connection go through a single writer goroutine
+	conn := newFiberConn(c)
+	defer conn.Close()
+
 	log.Printf("Fiber WebSocket connection established from %s", c.RemoteAddr().String())
 	logging.Info("WebSocket connection established from %s (active: %d)", c.RemoteAddr().String(), h.Active)
 
 	// Main message loop
 	for {
-		var rawMsg map[string]interface{}
-		if err := c.ReadJSON(&rawMsg); err != nil {
+		_, data, err := c.ReadMessage()
+		if err != nil {
 			if fiberws.IsUnexpectedCloseError(err, fiberws.CloseGoingAway, fiberws.CloseAbnormalClosure) {
 				log.Printf("Error receiving message: %v", err)
 			}
 			return
 		}
 
-		msgType, ok := rawMsg["type"].(string)
-		if !ok {
-			log.Printf("ERROR: Missing or invalid message type in: %+v", rawMsg)
-			h.sendFiberError(c, "missing or invalid message type")
+		// Decode only the type here; handlers decode the frame straight into their typed message
+		var base BaseMessage
+		if err := json.Unmarshal(data, &base); err != nil || base.Type == "" {
+			log.Printf("ERROR: Missing or invalid message type in: %s", data)
+			h.sendFiberError(conn, "missing or invalid message type")
+			continue
+		}
+		msgType := base.Type
+
+		// Pings are the most frequent frame on an idle connection; answer them without logging or routing
+		if msgType == MessageTypePing {
+			if err := conn.WriteFrame(pongFrame); err != nil {
+				log.Printf("Failed to send pong: %v", err)
+			}
 			continue
 		}
 
-		log.Printf("📥 WS INCOMING: type=%s, sessionID=%v, data=%+v", msgType, rawMsg["session_id"], rawMsg)
+		// Boxing data for the log call allocates per frame, so skip it unless debugging
+		if logging.DebugEnabled() {
+			logging.Debug("📥 WS INCOMING: type=%s, data=%s", msgType, data)
+		}
 
 		// Route message to appropriate handler
-		if err := h.routeFiberMessage(c, MessageType(msgType), rawMsg, registerSession); err != nil {
+		if err := h.routeFiberMessage(conn, msgType, data, registerSession); err != nil {
 			log.Printf("ERROR: Failed to handle message type %s: %v", msgType, err)
-			h.sendFiberError(c, fmt.Sprintf("message handling failed: %v", err))
+			h.sendFiberError(conn, fmt.Sprintf("message handling failed: %v", err))
 		}
 	}
 }
 
 // sendFiberError sends an error message via Fiber WebSocket
-func (h *AgentHandler) sendFiberError(c *fiberws.Conn, errMsg string) {
-	err := c.WriteJSON(map[string]interface{}{
-		"type":    "error",
-		"message": errMsg,
+func (h *AgentHandler) sendFiberError(c *fiberConn, errMsg string) {
+	err := c.WriteJSON(ErrorMessage{
+		BaseMessage: BaseMessage{Type: MessageTypeError},
+		Message:     errMsg,
 	})
 	if err != nil {
 		log.Printf("Failed to send error message: %v", err)
@@ -206,32 +277,32 @@ func (h *AgentHandler) sendFiberError(c *fiberws.Conn, errMsg string) {
 }
 
 // routeFiberMessage routes messages to appropriate handlers for Fiber WebSocket
-func (h *AgentHandler) routeFiberMessage(c *fiberws.Conn, msgType MessageType, rawMsg map[string]interface{}, registerSession func(uuid.UUID)) error {
+func (h *AgentHandler) routeFiberMessage(c *fiberConn, msgType MessageType, data []byte, registerSession func(uuid.UUID)) error {
 	switch msgType {
 	case MessageTypeAuth:
 		// Authentication handled by server middleware, skip
 		return nil
 
 	case MessageTypeCreateSession:
-		return h.handleFiberCreateSession(c, rawMsg, registerSession)
+		return h.handleFiberCreateSession(c, data, registerSession)
 
 	case MessageTypeSendPrompt:
-		return h.handleFiberSendPrompt(c, rawMsg, registerSession)
+		return h.handleFiberSendPrompt(c, data, registerSession)
 
 	case MessageTypeEndSession:
-		return h.handleFiberEndSession(c, rawMsg)
+		return h.handleFiberEndSession(c, data)
 
 	case MessageTypeInterruptSession:
-		return h.handleFiberInterruptSession(c, rawMsg)
+		return h.handleFiberInterruptSession(c, data)
 
 	case MessageTypeDeleteSession:
-		return h.handleFiberDeleteSession(c, rawMsg)
+		return h.handleFiberDeleteSession(c, data)
 
 	case MessageTypeListSessions:
 		return h.handleFiberListSessions(c, registerSession)
 
 	case MessageTypeLoadMessages:
-		return h.handleFiberLoadMessages(c, rawMsg)
+		return h.handleFiberLoadMessages(c, data)
 
 	case MessageTypeKillAllAgents:
 		return h.handleFiberKillAllAgents(c)
@@ -243,16 +314,16 @@ func (h *AgentHandler) routeFiberMessage(c *fiberws.Conn, msgType MessageType, r
 		return h.handleFiberPing(c)
 
 	case MessageTypePermissionResponse:
-		return h.handleFiberPermissionResponse(c, rawMsg)
+		return h.handleFiberPermissionResponse(c, data)
 
 	case MessageTypeAddAlwaysAllowRule:
-		return h.handleFiberAddAlwaysAllowRule(c, rawMsg)
+		return h.handleFiberAddAlwaysAllowRule(c, data)
 
 	case MessageTypeRemoveAlwaysAllowRule:
-		return h.handleFiberRemoveAlwaysAllowRule(c, rawMsg)
+		return h.handleFiberRemoveAlwaysAllowRule(c, data)
 
 	case MessageTypeListAlwaysAllowRules:
-		return h.handleFiberListAlwaysAllowRules(c, rawMsg)
+		return h.handleFiberListAlwaysAllowRules(c, data)
 
 	default:
 		return fmt.Errorf("unknown message type: %s", msgType)
@@ -260,20 +331,20 @@ func (h *AgentHandler) routeFiberMessage(c *fiberws.Conn, msgType MessageType, r
 }
 
 // routeMessage routes messages to appropriate handlers
-func (h *AgentHandler) routeMessage(ws *websocket.Conn, msgType MessageType, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) routeMessage(ws *websocket.Conn, msgType MessageType, data []byte, registerSession func(*AgentSession)) error {
 	switch msgType {
 	case MessageTypeAuth:
 		// Authentication handled by proxy, skip
 		return nil
 
 	case MessageTypeCreateSession:
-		return h.handleCreateSession(ws, rawMsg)
+		return h.handleCreateSession(ws, data)
 
 	case MessageTypeSendPrompt:
-		return h.handleSendPrompt(ws, rawMsg)
+		return h.handleSendPrompt(ws, data, registerSession)
 
 	case MessageTypeEndSession:
-		return h.handleEndSession(ws, rawMsg)
+		return h.handleEndSession(ws, data)
 
 	case MessageTypeListSessions:
 		return h.handleListSessions(ws)
@@ -290,10 +361,9 @@ func (h *AgentHandler) routeMessage(ws *websocket.Conn, msgType MessageType, raw
 }
 
 // handleCreateSession creates a new agent session
-func (h *AgentHandler) handleCreateSession(ws *websocket.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleCreateSession(ws *websocket.Conn, data []byte) error {
 	var msg CreateSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid create_session message: %w", err)
 	}
 
@@ -327,10 +397,9 @@ func (h *AgentHandler) handleCreateSession(ws *websocket.Conn, rawMsg map[string
 }
 
 // handleSendPrompt sends a prompt to an agent session
-func (h *AgentHandler) handleSendPrompt(ws *websocket.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleSendPrompt(ws *websocket.Conn, data []byte, registerSession func(*AgentSession)) error {
 	var msg SendPromptMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid send_prompt message: %w", err)
 	}
 
@@ -338,6 +407,15 @@ func (h *AgentHandler) handleSendPrompt(ws *websocket.Conn, rawMsg map[string]in
 		return fmt.Errorf("prompt cannot be empty")
 	}
 
+	// Look the session up once; the streamer reads its response channel and git branch from it
+	session, err := h.SessionManager.GetSession(msg.SessionID)
+	if err != nil {
+		return err
+	}
+
+	// Mark the session connected before sending, or its responses are dropped rather than queued
+	registerSession(session)
+
 	log.Printf("Sending prompt to session %s: %s", msg.SessionID, msg.Prompt)
 
 	// Send prompt to session
@@ -345,28 +423,24 @@ func (h *AgentHandler) handleSendPrompt(ws *websocket.Conn, rawMsg map[string]in
 		return err
 	}
 
-	// Get response channel
-	responseChan, err := h.SessionManager.GetResponseChannel(msg.SessionID)
-	if err != nil {
-		return err
-	}
-
 	// Stream responses back to client
-	go h.streamResponses(ws, msg.SessionID, responseChan)
+	go h.streamResponses(ws, session)
 
 	return nil
 }
 
 // streamResponses streams Claude responses back to the WebSocket client
-func (h *AgentHandler) streamResponses(ws *websocket.Conn, sessionID uuid.UUID, responseChan chan types.Message) {
-	for msg := range responseChan {
-		if err := h.sendAgentMessage(ws, sessionID, msg); err != nil {
+func (h *AgentHandler) streamResponses(ws *websocket.Conn, session *AgentSession) {
+	sessionID := session.ID
+	envelope := newAgentMessageEnvelope(sessionID)
+	for msg := range session.responseChan {
+		if err := h.sendAgentMessage(ws, session, envelope, msg); err != nil {
 			log.Printf("Error sending agent message: %v", err)
 			return
 		}
 
 		// Stop after result message (completion signal)
-		if msg.GetMessageType() == "result" {
+		if _, isResult := msg.(*types.ResultMessage); isResult {
 			log.Printf("Session %s: Streaming complete (received result message)", sessionID)
 			return
 		}
@@ -374,167 +448,195 @@ func (h *AgentHandler) streamResponses(ws *websocket.Conn, sessionID uuid.UUID,
 }
 
 // streamFiberResponses streams Claude responses back to the Fiber WebSocket client
-func (h *AgentHandler) streamFiberResponses(c *fiberws.Conn, sessionID uuid.UUID, responseChan chan types.Message) {
-	for msg := range responseChan {
-		if err := h.sendFiberAgentMessage(c, sessionID, msg); err != nil {
-			log.Printf("Error sending agent message: %v", err)
+// It runs until the connection closes or sessionDone, the session context it was started for,
+// is cancelled (end, delete or interrupt)
+func (h *AgentHandler) streamFiberResponses(c *fiberConn, sessionID uuid.UUID, session *AgentSession, sessionDone <-chan struct{}, token uint64) {
+	defer c.stopStream(sessionID, token)
+
+	responseChan := session.responseChan
+	envelope := newAgentMessageEnvelope(sessionID)
+	for {
+		// After an interrupt a new streamer takes over; leave the next turn's messages to it
+		select {
+		case <-sessionDone:
 			return
+		default:
 		}
 
-		// Stop after result message (completion signal)
-		if msg.GetMessageType() == "result" {
-			log.Printf("Session %s: Streaming complete (received result message)", sessionID)
+		select {
+		case msg, ok := <-responseChan:
+			if !ok {
+				return
+			}
+			if err := h.sendFiberAgentMessage(c, session, envelope, msg); err != nil {
+				log.Printf("Error sending agent message: %v", err)
+				return
+			}
+
+			// Result message marks the end of a turn
+			if _, isResult := msg.(*types.ResultMessage); isResult {
+				log.Printf("Session %s: Streaming complete (received result message)", sessionID)
+			}
+
+		case <-c.Done():
+			return
+
+		case <-sessionDone:
 			return
 		}
 	}
 }
 
-// sendAgentMessage sends a Claude message to the WebSocket client
-func (h *AgentHandler) sendAgentMessage(ws *websocket.Conn, sessionID uuid.UUID, msg types.Message) error {
+// maxUnknownMessageRepr caps how much of an unrecognised SDK message is echoed back to the client
+const maxUnknownMessageRepr = 4096
+
+// boundedRepr formats v for display, truncating the result to at most limit bytes
+func boundedRepr(v interface{}, limit int) string {
+	repr := fmt.Sprintf("%+v", v)
+	if len(repr) <= limit {
+		return repr
+	}
+	return fmt.Sprintf("%s...[truncated %d chars]", repr[:limit], len(repr)-limit)
+}
+
+// sendAgentMessage sends a Claude message to the WebSocket client.
+// The session ID is taken from the stream's envelope rather than formatted per message.
+func (h *AgentHandler) sendAgentMessage(ws *websocket.Conn, session *AgentSession, envelope *agentMessageEnvelope, msg types.Message) error {
+	sessionID := session.ID
 	msgType := msg.GetMessageType()
 	log.Printf("sendAgentMessage: msgType=%s, msg=%+v", msgType, msg)
 
 	var response AgentMessageResponse
 	response.Type = MessageTypeAgentMessage
-	response.SessionID = sessionID
 
-	switch msgType {
-	case "assistant":
-		if assistantMsg, ok := msg.(*types.AssistantMessage); ok {
-			log.Printf("Assistant message type assertion succeeded, content blocks: %d", len(assistantMsg.Content))
-			var textContent []string
-			var toolUses []map[string]interface{}
-
-			for i, block := range assistantMsg.Content {
-				log.Printf("Block %d: type=%s, block=%+v", i, block.GetType(), block)
-
-				if textBlock, ok := block.(*types.TextBlock); ok {
-					log.Printf("TextBlock found with text: %s", textBlock.Text)
-					textContent = append(textContent, textBlock.Text)
-				} else if toolUseBlock, ok := block.(*types.ToolUseBlock); ok {
-					log.Printf("ToolUseBlock found: name=%s, id=%s", toolUseBlock.Name, toolUseBlock.ID)
-					toolUses = append(toolUses, map[string]interface{}{
-						"id":     toolUseBlock.ID,
-						"name":   toolUseBlock.Name,
-						"input":  toolUseBlock.Input,
-						"status": "running",
-					})
-
-					// Broadcast agent_tool_use event for metrics tracking
-					toolUseEvent := map[string]interface{}{
-						"type":       string(MessageTypeAgentToolUse),
-						"session_id": sessionID.String(),
-						"tool":       toolUseBlock.Name,
-						"parameters": toolUseBlock.Input,
-					}
-					if err := ws.WriteJSON(toolUseEvent); err != nil {
-						log.Printf("Failed to send agent_tool_use event: %v", err)
-					}
-				} else {
-					log.Printf("Block %d is not a TextBlock or ToolUseBlock (type=%T)", i, block)
+	switch m := msg.(type) {
+	case *types.AssistantMessage:
+		log.Printf("Assistant message with %d content blocks", len(m.Content))
+		var textContent []string
+		var toolUses []ToolUseContent
+
+		for i, block := range m.Content {
+			log.Printf("Block %d: type=%s, block=%+v", i, block.GetType(), block)
+
+			// One type switch classifies each block in a single dispatch
+			switch b := block.(type) {
+			case *types.TextBlock:
+				log.Printf("TextBlock found with text: %s", b.Text)
+				textContent = append(textContent, b.Text)
+
+			case *types.ToolUseBlock:
+				log.Printf("ToolUseBlock found: name=%s, id=%s", b.Name, b.ID)
+				toolUses = append(toolUses, ToolUseContent{
+					ID:     b.ID,
+					Name:   b.Name,
+					Input:  b.Input,
+					Status: "running",
+				})
+
+				// Broadcast agent_tool_use event for metrics tracking
+				toolUseEvent := AgentToolUseMessage{
+					BaseMessage: BaseMessage{Type: MessageTypeAgentToolUse},
+					SessionID:   sessionID,
+					Tool:        b.Name,
+					Parameters:  b.Input,
+				}
+				if err := ws.WriteJSON(toolUseEvent); err != nil {
+					log.Printf("Failed to send agent_tool_use event: %v", err)
 				}
-			}
-			log.Printf("Extracted %d text blocks and %d tool uses", len(textContent), len(toolUses))
 
-			response.Content = map[string]interface{}{
-				"type":  "assistant",
-				"text":  textContent,
-				"tools": toolUses,
+			default:
+				log.Printf("Block %d is not a TextBlock or ToolUseBlock (type=%T)", i, block)
 			}
-		} else {
-			log.Printf("Failed to assert message as AssistantMessage (type=%T)", msg)
 		}
+		log.Printf("Extracted %d text blocks and %d tool uses", len(textContent), len(toolUses))
 
-	case "user":
-		if userMsg, ok := msg.(*types.UserMessage); ok {
-			var toolResults []map[string]interface{}
-
-			// Check if user message content is a slice of ContentBlocks (tool results)
-			if contentBlocks, ok := userMsg.Content.([]types.ContentBlock); ok {
-				for _, block := range contentBlocks {
-					if toolResultBlock, ok := block.(*types.ToolResultBlock); ok {
-						log.Printf("ToolResultBlock found: tool_use_id=%s", toolResultBlock.ToolUseID)
-						toolResults = append(toolResults, map[string]interface{}{
-							"tool_use_id": toolResultBlock.ToolUseID,
-							"content":     toolResultBlock.Content,
-							"is_error":    toolResultBlock.IsError,
-							"status":      "completed",
-						})
-					}
-				}
-			}
+		response.Content = AssistantContent{
+			Type:  "assistant",
+			Text:  textContent,
+			Tools: toolUses,
+		}
 
-			response.Content = map[string]interface{}{
-				"type":         "user",
-				"content":      userMsg.Content,
-				"tool_results": toolResults,
+	case *types.UserMessage:
+		var toolResults []ToolResultContent
+
+		// Check if user message content is a slice of ContentBlocks (tool results)
+		if contentBlocks, ok := m.Content.([]types.ContentBlock); ok {
+			for _, block := range contentBlocks {
+				if toolResultBlock, ok := block.(*types.ToolResultBlock); ok {
+					log.Printf("ToolResultBlock found: tool_use_id=%s", toolResultBlock.ToolUseID)
+					toolResults = append(toolResults, ToolResultContent{
+						ToolUseID: toolResultBlock.ToolUseID,
+						IsError:   toolResultBlock.IsError,
+						Status:    "completed",
+					})
+				}
 			}
 		}
 
-	case "result":
-		if resultMsg, ok := msg.(*types.ResultMessage); ok {
-			content := map[string]interface{}{
-				"type":        "result",
-				"success":     true,
-				"num_turns":   resultMsg.NumTurns,
-				"duration_ms": resultMsg.DurationMs,
-				"is_error":    resultMsg.IsError,
-			}
-			if resultMsg.TotalCostUSD != nil {
-				content["cost_usd"] = *resultMsg.TotalCostUSD
-			}
-			if resultMsg.Usage != nil {
-				content["usage"] = resultMsg.Usage
-			}
-			response.Content = content
+		response.Content = UserContent{
+			Type:        "user",
+			Content:     m.Content,
+			ToolResults: toolResults,
 		}
 
-	case "system", "control_request":
-		if systemMsg, ok := msg.(*types.SystemMessage); ok {
-			// Check if this is a permission request (control_request)
-			if msg.GetMessageType() == "control_request" && systemMsg.Request != nil {
-				// This is a permission request - forward to frontend as permission_request
-				response.Type = MessageTypePermissionRequest
-				response.Content = map[string]interface{}{
-					"type":          "permission_request",
-					"permission_id": systemMsg.Request["permission_id"],
-					"tool":          systemMsg.Request["tool"],
-					"action":        systemMsg.Request["action"],
-					"details":       systemMsg.Request,
-				}
-			} else {
-				// Regular system message
-				response.Content = map[string]interface{}{
-					"type":    "system",
-					"subtype": systemMsg.Subtype,
-					"data":    systemMsg.Data,
-				}
+	case *types.ResultMessage:
+		result := ResultContent{
+			Type:       "result",
+			Success:    true,
+			NumTurns:   m.NumTurns,
+			DurationMs: m.DurationMs,
+			IsError:    m.IsError,
+			CostUSD:    m.TotalCostUSD,
+		}
+		if m.Usage != nil {
+			result.Usage = m.Usage
+		}
+		response.Content = result
+
+	case *types.SystemMessage:
+		// Check if this is a permission request (control_request)
+		if msgType == "control_request" && m.Request != nil {
+			// This is a permission request - forward to frontend as permission_request
+			response.Type = MessageTypePermissionRequest
+			response.Content = PermissionRequestContent{
+				Type:         "permission_request",
+				PermissionID: m.Request["permission_id"],
+				Tool:         m.Request["tool"],
+				Action:       m.Request["action"],
+				Details:      m.Request,
+			}
+		} else {
+			// Regular system message
+			response.Content = SystemContent{
+				Type:    "system",
+				Subtype: m.Subtype,
+				Data:    m.Data,
 			}
 		}
 
 	default:
 		response.Content = map[string]interface{}{
-			"type": "unknown",
-			"raw":  msg,
+			"type":         "unknown",
+			"message_type": msgType,
+			"raw":          boundedRepr(msg, maxUnknownMessageRepr),
 		}
 	}
 
-	// Add git branch to metadata
-	session, err := h.SessionManager.GetSession(sessionID)
-	if err == nil && session.GitBranch != "" {
-		response.Metadata = map[string]interface{}{
-			"git_branch": session.GitBranch,
-		}
-	}
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+	defer releaseBuffer(buf)
 
-	return ws.WriteJSON(response)
+	// The envelope adds the git branch metadata
+	if err := envelope.encode(buf, response.Type, response.Content, session.GitBranch); err != nil {
+		return err
+	}
+	return ws.WriteMessage(websocket.TextMessage, buf.Bytes())
 }
 
 // handleEndSession ends an agent session
-func (h *AgentHandler) handleEndSession(ws *websocket.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleEndSession(ws *websocket.Conn, data []byte) error {
 	var msg EndSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid end_session message: %w", err)
 	}
 
@@ -585,8 +687,7 @@ func (h *AgentHandler) handleKillAllAgents(ws *websocket.Conn) error {
 
 // handlePing responds to ping with pong
 func (h *AgentHandler) handlePing(ws *websocket.Conn) error {
-	response := BaseMessage{Type: MessageTypePong}
-	return ws.WriteJSON(response)
+	return ws.WriteMessage(websocket.TextMessage, pongFrame)
 }
 
 // sendError sends an error message to the WebSocket client
@@ -609,10 +710,9 @@ func (h *AgentHandler) sendError(ws *websocket.Conn, errMsg string) {
 // Fiber WebSocket Handler Methods (duplicates of above for Fiber compatibility)
 
 // handleFiberCreateSession creates a new agent session (Fiber version)
-func (h *AgentHandler) handleFiberCreateSession(c *fiberws.Conn, rawMsg map[string]interface{}, registerSession func(uuid.UUID)) error {
+func (h *AgentHandler) handleFiberCreateSession(c *fiberConn, data []byte, registerSession func(uuid.UUID)) error {
 	var msg CreateSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid create_session message: %w", err)
 	}
 
@@ -650,10 +750,9 @@ func (h *AgentHandler) handleFiberCreateSession(c *fiberws.Conn, rawMsg map[stri
 
 // handleFiberSendPrompt sends a prompt to an agent session (Fiber version)
 // Note: This returns a response channel that must be monitored by the main handler
-func (h *AgentHandler) handleFiberSendPrompt(c *fiberws.Conn, rawMsg map[string]interface{}, registerSession func(uuid.UUID)) error {
+func (h *AgentHandler) handleFiberSendPrompt(c *fiberConn, data []byte, registerSession func(uuid.UUID)) error {
 	var msg SendPromptMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid send_prompt message: %w", err)
 	}
 
@@ -682,186 +781,249 @@ func (h *AgentHandler) handleFiberSendPrompt(c *fiberws.Conn, rawMsg map[string]
 		go h.forwardPermissionRequests(c, msg.SessionID, session)
 	}
 
-	// Send prompt or content to session
-	if hasContent {
-		// New format: structured content with images
-		log.Printf("Sending structured content to session %s (%d blocks)", msg.SessionID, len(msg.Content))
-		if err := h.SessionManager.SendPromptWithContent(msg.SessionID, msg.Content); err != nil {
-			return err
+	// Stream responses back to client in a goroutine
+	// One streamer serves every prompt of this session on this connection,
+	// so responses stay in order and no goroutine is spawned per prompt
+	// A streamer left over from before an interrupt is replaced rather than reused
+	sessionDone := session.ctx.Done()
+	if token, ok := c.startStream(msg.SessionID, sessionDone); ok {
+		go h.streamFiberResponses(c, msg.SessionID, session, sessionDone, token)
+	}
+
+	// Send prompt or content off the read loop: the first prompt of a session starts
+	// and connects the Claude CLI, which would otherwise stall pings, interrupts and
+	// permission responses on this connection for several seconds.
+	// Text and content prompts share the session's queue, so they reach the agent in the order they arrived.
+	err = session.QueuePrompt(func() {
+		var err error
+		if hasContent {
+			// New format: structured content with images
+			log.Printf("Sending structured content to session %s (%d blocks)", msg.SessionID, len(msg.Content))
+			err = h.SessionManager.SendPromptWithContent(msg.SessionID, msg.Content)
+		} else {
+			// Legacy format: plain text prompt
+			log.Printf("Sending prompt to session %s: %s", msg.SessionID, msg.Prompt)
+			err = h.SessionManager.SendPrompt(msg.SessionID, msg.Prompt)
 		}
-	} else {
-		// Legacy format: plain text prompt
-		log.Printf("Sending prompt to session %s: %s", msg.SessionID, msg.Prompt)
-		if err := h.SessionManager.SendPrompt(msg.SessionID, msg.Prompt); err != nil {
-			return err
+		if err != nil {
+			log.Printf("ERROR: Failed to handle message type %s: %v", MessageTypeSendPrompt, err)
+			h.sendFiberError(c, fmt.Sprintf("message handling failed: %v", err))
 		}
-	}
+	})
 
-	// Get response channel
-	responseChan, err := h.SessionManager.GetResponseChannel(msg.SessionID)
+	// Reject rather than pile up prompts the agent cannot keep up with, or queue them on an ended session
 	if err != nil {
-		return err
+		return fmt.Errorf("session %s cannot take prompt: %w", msg.SessionID, err)
 	}
+	return nil
+}
 
-	// Stream responses back to client in a goroutine
-	// This allows the handler to process subsequent prompts
-	go h.streamFiberResponses(c, msg.SessionID, responseChan)
+// agentMessageEnvelope holds the session-constant parts of agent_message frames.
+// They are encoded once per stream, so each streamed message only encodes its content.
+// An envelope is used by a single streamer goroutine and is not safe for concurrent use.
+type agentMessageEnvelope struct {
+	sessionID []byte // ,"session_id":"<id>"
+	gitBranch string
+	metadata  []byte // ,"metadata":{...} for gitBranch
+}
+
+// newAgentMessageEnvelope creates the envelope for messages of sessionID
+func newAgentMessageEnvelope(sessionID uuid.UUID) *agentMessageEnvelope {
+	return &agentMessageEnvelope{sessionID: []byte(`,"session_id":"` + sessionID.String() + `"`)}
+}
 
+// encode writes a frame equivalent to an encoded AgentMessageResponse into buf.
+// Metadata is only re-encoded when the git branch changes.
+func (e *agentMessageEnvelope) encode(buf *bytes.Buffer, msgType MessageType, content interface{}, gitBranch string) error {
+	buf.WriteString(`{"type":"`)
+	buf.WriteString(string(msgType))
+	buf.WriteByte('"')
+	buf.Write(e.sessionID)
+	buf.WriteString(`,"content":`)
+	if err := encodeJSON(buf, content); err != nil {
+		return err
+	}
+	buf.Truncate(buf.Len() - 1) // Drop the encoder's trailing newline
+
+	if gitBranch != "" {
+		if e.metadata == nil || gitBranch != e.gitBranch {
+			metadata, err := json.Marshal(AgentMessageMetadata{GitBranch: gitBranch})
+			if err != nil {
+				return err
+			}
+			e.metadata = append([]byte(`,"metadata":`), metadata...)
+			e.gitBranch = gitBranch
+		}
+		buf.Write(e.metadata)
+	}
+	buf.WriteByte('}')
 	return nil
 }
 
 // sendFiberAgentMessage sends a Claude message to the WebSocket client (Fiber version)
-func (h *AgentHandler) sendFiberAgentMessage(c *fiberws.Conn, sessionID uuid.UUID, msg types.Message) error {
-	msgType := msg.GetMessageType()
-	log.Printf("sendFiberAgentMessage: msgType=%s, msg=%+v", msgType, msg)
+// The streamer already holds the session and its envelope, so only the content is encoded per message
+func (h *AgentHandler) sendFiberAgentMessage(c *fiberConn, session *AgentSession, envelope *agentMessageEnvelope, msg types.Message) error {
+	sessionID := session.ID
+	debug := logging.DebugEnabled()
+	if debug {
+		logging.Debug("sendFiberAgentMessage: msgType=%s, msg=%+v", msg.GetMessageType(), msg)
+	}
 
-	var response AgentMessageResponse
-	response.Type = MessageTypeAgentMessage
-	response.SessionID = sessionID
+	responseType := MessageTypeAgentMessage
+	var content interface{}
 
-	switch msgType {
-	case "assistant":
-		if assistantMsg, ok := msg.(*types.AssistantMessage); ok {
-			log.Printf("Assistant message type assertion succeeded, content blocks: %d", len(assistantMsg.Content))
-			var textContent []string
-			var toolUses []map[string]interface{}
-
-			for i, block := range assistantMsg.Content {
-				log.Printf("Block %d: type=%s, block=%+v", i, block.GetType(), block)
-
-				if textBlock, ok := block.(*types.TextBlock); ok {
-					log.Printf("TextBlock found with text: %s", textBlock.Text)
-					textContent = append(textContent, textBlock.Text)
-				} else if toolUseBlock, ok := block.(*types.ToolUseBlock); ok {
-					log.Printf("ToolUseBlock found: name=%s, id=%s", toolUseBlock.Name, toolUseBlock.ID)
-					toolUses = append(toolUses, map[string]interface{}{
-						"id":     toolUseBlock.ID,
-						"name":   toolUseBlock.Name,
-						"input":  toolUseBlock.Input,
-						"status": "running",
-					})
+	switch m := msg.(type) {
+	case *types.AssistantMessage:
+		if debug {
+			logging.Debug("Assistant message with %d content blocks", len(m.Content))
+		}
+		var textContent []string
+		var toolUses []ToolUseContent
 
-					// Broadcast agent_tool_use event for metrics tracking
-					toolUseEvent := map[string]interface{}{
-						"type":       string(MessageTypeAgentToolUse),
-						"session_id": sessionID.String(),
-						"tool":       toolUseBlock.Name,
-						"parameters": toolUseBlock.Input,
-					}
-					if err := c.WriteJSON(toolUseEvent); err != nil {
-						log.Printf("Failed to send agent_tool_use event: %v", err)
-					}
-				} else {
-					log.Printf("Block %d is not a TextBlock or ToolUseBlock (type=%T)", i, block)
-				}
+		for i, block := range m.Content {
+			if debug {
+				logging.Debug("Block %d: type=%s, block=%+v", i, block.GetType(), block)
 			}
-			log.Printf("Extracted %d text blocks and %d tool uses", len(textContent), len(toolUses))
 
-			response.Content = map[string]interface{}{
-				"type":  "assistant",
-				"text":  textContent,
-				"tools": toolUses,
+			// One type switch classifies each block in a single dispatch
+			switch b := block.(type) {
+			case *types.TextBlock:
+				if debug {
+					logging.Debug("TextBlock found with text: %s", b.Text)
+				}
+				textContent = append(textContent, b.Text)
+
+			case *types.ToolUseBlock:
+				if debug {
+					logging.Debug("ToolUseBlock found: name=%s, id=%s", b.Name, b.ID)
+				}
+				toolUses = append(toolUses, ToolUseContent{
+					ID:     b.ID,
+					Name:   b.Name,
+					Input:  b.Input,
+					Status: "running",
+				})
+
+				// Broadcast agent_tool_use event for metrics tracking
+				toolUseEvent := AgentToolUseMessage{
+					BaseMessage: BaseMessage{Type: MessageTypeAgentToolUse},
+					SessionID:   sessionID,
+					Tool:        b.Name,
+					Parameters:  b.Input,
+				}
+				if err := c.WriteJSON(toolUseEvent); err != nil {
+					log.Printf("Failed to send agent_tool_use event: %v", err)
+				}
+
+			default:
+				if debug {
+					logging.Debug("Block %d is not a TextBlock or ToolUseBlock (type=%T)", i, block)
+				}
 			}
-		} else {
-			log.Printf("Failed to assert message as AssistantMessage (type=%T)", msg)
+		}
+		if debug {
+			logging.Debug("Extracted %d text blocks and %d tool uses", len(textContent), len(toolUses))
+		}
+
+		content = AssistantContent{
+			Type:  "assistant",
+			Text:  textContent,
+			Tools: toolUses,
 		}
 
-	case "user":
-		if userMsg, ok := msg.(*types.UserMessage); ok {
-			var toolResults []map[string]interface{}
-
-			// Check if user message content is a slice of ContentBlocks (tool results)
-			if contentBlocks, ok := userMsg.Content.([]types.ContentBlock); ok {
-				for _, block := range contentBlocks {
-					if toolResultBlock, ok := block.(*types.ToolResultBlock); ok {
-						log.Printf("ToolResultBlock found: tool_use_id=%s", toolResultBlock.ToolUseID)
-						toolResults = append(toolResults, map[string]interface{}{
-							"tool_use_id": toolResultBlock.ToolUseID,
-							"content":     toolResultBlock.Content,
-							"is_error":    toolResultBlock.IsError,
-							"status":      "completed",
-						})
+	case *types.UserMessage:
+		var toolResults []ToolResultContent
+
+		// Check if user message content is a slice of ContentBlocks (tool results)
+		if contentBlocks, ok := m.Content.([]types.ContentBlock); ok {
+			for _, block := range contentBlocks {
+				if toolResultBlock, ok := block.(*types.ToolResultBlock); ok {
+					if debug {
+						logging.Debug("ToolResultBlock found: tool_use_id=%s", toolResultBlock.ToolUseID)
 					}
+					toolResults = append(toolResults, ToolResultContent{
+						ToolUseID: toolResultBlock.ToolUseID,
+						IsError:   toolResultBlock.IsError,
+						Status:    "completed",
+					})
 				}
 			}
-
-			response.Content = map[string]interface{}{
-				"type":         "user",
-				"content":      userMsg.Content,
-				"tool_results": toolResults,
-			}
 		}
 
-	case "result":
-		if resultMsg, ok := msg.(*types.ResultMessage); ok {
-			content := map[string]interface{}{
-				"type":        "result",
-				"success":     true,
-				"num_turns":   resultMsg.NumTurns,
-				"duration_ms": resultMsg.DurationMs,
-				"is_error":    resultMsg.IsError,
-			}
-			if resultMsg.TotalCostUSD != nil {
-				content["cost_usd"] = *resultMsg.TotalCostUSD
-			}
-			if resultMsg.Usage != nil {
-				content["usage"] = resultMsg.Usage
-			}
-			response.Content = content
+		content = UserContent{
+			Type:        "user",
+			Content:     m.Content,
+			ToolResults: toolResults,
 		}
 
-	case "system", "control_request":
-		if systemMsg, ok := msg.(*types.SystemMessage); ok {
-			// Check if this is a permission request (control_request)
-			if msg.GetMessageType() == "control_request" && systemMsg.Request != nil {
-				// This is a permission request - forward to frontend as permission_request
-				log.Printf("🔐 Permission request detected: tool=%v, action=%v", systemMsg.Request["tool"], systemMsg.Request["action"])
-				response.Type = MessageTypePermissionRequest
-				response.Content = map[string]interface{}{
-					"type":          "permission_request",
-					"permission_id": systemMsg.Request["permission_id"],
-					"tool":          systemMsg.Request["tool"],
-					"action":        systemMsg.Request["action"],
-					"details":       systemMsg.Request,
-				}
-			} else {
-				// Regular system message
-				response.Content = map[string]interface{}{
-					"type":    "system",
-					"subtype": systemMsg.Subtype,
-					"data":    systemMsg.Data,
-				}
+	case *types.ResultMessage:
+		result := ResultContent{
+			Type:       "result",
+			Success:    true,
+			NumTurns:   m.NumTurns,
+			DurationMs: m.DurationMs,
+			IsError:    m.IsError,
+			CostUSD:    m.TotalCostUSD,
+		}
+		if m.Usage != nil {
+			result.Usage = m.Usage
+		}
+		content = result
+
+	case *types.SystemMessage:
+		// Check if this is a permission request (control_request)
+		if m.Request != nil && m.GetMessageType() == "control_request" {
+			// This is a permission request - forward to frontend as permission_request
+			log.Printf("🔐 Permission request detected: tool=%v, action=%v", m.Request["tool"], m.Request["action"])
+			responseType = MessageTypePermissionRequest
+			content = PermissionRequestContent{
+				Type:         "permission_request",
+				PermissionID: m.Request["permission_id"],
+				Tool:         m.Request["tool"],
+				Action:       m.Request["action"],
+				Details:      m.Request,
+			}
+		} else {
+			// Regular system message
+			content = SystemContent{
+				Type:    "system",
+				Subtype: m.Subtype,
+				Data:    m.Data,
 			}
 		}
 
 	default:
+		msgType := msg.GetMessageType()
 		log.Printf("Unknown message type: %s", msgType)
 		return fmt.Errorf("unknown message type: %s", msgType)
 	}
 
-	// Add git branch to metadata
-	session, err := h.SessionManager.GetSession(sessionID)
-	if err == nil && session.GitBranch != "" {
-		response.Metadata = map[string]interface{}{
-			"git_branch": session.GitBranch,
-		}
+	if debug {
+		logging.Debug("📤 WS OUTGOING: type=%s, sessionID=%s, content=%+v", responseType, sessionID, content)
 	}
 
-	log.Printf("📤 WS OUTGOING: type=%s, sessionID=%s, response=%+v", response.Type, response.SessionID, response)
-	if err := c.WriteJSON(response); err != nil {
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+	if err := envelope.encode(buf, responseType, content, session.GitBranch); err != nil {
+		releaseBuffer(buf)
+		log.Printf("ERROR: Failed to encode agent message: %v", err)
+		return err
+	}
+	if err := c.WriteBuffer(buf); err != nil {
 		log.Printf("ERROR: Failed to send agent message: %v", err)
 		return err
 	}
 
-	log.Printf("✅ Message sent to WebSocket client")
+	if debug {
+		logging.Debug("✅ Message sent to WebSocket client")
+	}
 	return nil
 }
 
 // handleFiberEndSession ends an agent session (Fiber version)
-func (h *AgentHandler) handleFiberEndSession(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberEndSession(c *fiberConn, data []byte) error {
 	var msg EndSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid end_session message: %w", err)
 	}
 
@@ -876,10 +1038,9 @@ func (h *AgentHandler) handleFiberEndSession(c *fiberws.Conn, rawMsg map[string]
 }
 
 // handleFiberInterruptSession interrupts an agent session (Fiber version)
-func (h *AgentHandler) handleFiberInterruptSession(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberInterruptSession(c *fiberConn, data []byte) error {
 	var msg InterruptSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid interrupt_session message: %w", err)
 	}
 
@@ -902,10 +1063,9 @@ func (h *AgentHandler) handleFiberInterruptSession(c *fiberws.Conn, rawMsg map[s
 }
 
 // handleFiberDeleteSession deletes an agent session (Fiber version)
-func (h *AgentHandler) handleFiberDeleteSession(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberDeleteSession(c *fiberConn, data []byte) error {
 	var msg DeleteSessionMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid delete_session message: %w", err)
 	}
 
@@ -925,7 +1085,7 @@ func (h *AgentHandler) handleFiberDeleteSession(c *fiberws.Conn, rawMsg map[stri
 }
 
 // handleFiberListSessions lists all sessions from database (Fiber version)
-func (h *AgentHandler) handleFiberListSessions(c *fiberws.Conn, registerSession func(uuid.UUID)) error {
+func (h *AgentHandler) handleFiberListSessions(c *fiberConn, registerSession func(uuid.UUID)) error {
 	log.Printf("handleFiberListSessions: Fetching all sessions from database")
 	sessions, err := h.SessionManager.ListAllSessions("all")
 	if err != nil {
@@ -956,30 +1116,21 @@ func (h *AgentHandler) handleFiberListSessions(c *fiberws.Conn, registerSession
 }
 
 // handleFiberLoadMessages loads messages for a session with pagination (Fiber version)
-func (h *AgentHandler) handleFiberLoadMessages(c *fiberws.Conn, rawMsg map[string]interface{}) error {
-	// Parse session ID
-	sessionIDStr, ok := rawMsg["session_id"].(string)
-	if !ok {
+func (h *AgentHandler) handleFiberLoadMessages(c *fiberConn, data []byte) error {
+	// Parse request; pagination defaults survive when the fields are absent
+	msg := LoadMessagesMessage{Limit: 50}
+	if err := json.Unmarshal(data, &msg); err != nil {
+		h.sendFiberError(c, "invalid load_messages request")
+		return fmt.Errorf("invalid load_messages message: %w", err)
+	}
+	if msg.SessionID == uuid.Nil {
 		h.sendFiberError(c, "missing or invalid session_id")
 		return fmt.Errorf("missing or invalid session_id")
 	}
 
-	sessionID, err := uuid.Parse(sessionIDStr)
-	if err != nil {
-		h.sendFiberError(c, "invalid session ID format")
-		return fmt.Errorf("invalid session ID format")
-	}
-
-	// Parse pagination params with defaults
-	limit := 50
-	offset := 0
-
-	if limitVal, ok := rawMsg["limit"].(float64); ok {
-		limit = int(limitVal)
-	}
-	if offsetVal, ok := rawMsg["offset"].(float64); ok {
-		offset = int(offsetVal)
-	}
+	sessionID := msg.SessionID
+	limit := msg.Limit
+	offset := msg.Offset
 
 	// Validate pagination params
 	// Increased max limit to 1000 to support long conversations
@@ -1018,7 +1169,7 @@ func (h *AgentHandler) handleFiberLoadMessages(c *fiberws.Conn, rawMsg map[strin
 }
 
 // handleFiberKillAllAgents kills all active agent sessions (Fiber version)
-func (h *AgentHandler) handleFiberKillAllAgents(c *fiberws.Conn) error {
+func (h *AgentHandler) handleFiberKillAllAgents(c *fiberConn) error {
 	count := h.SessionManager.EndAllSessions()
 	response := map[string]interface{}{
 		"type":    "kill_all_agents_response",
@@ -1029,7 +1180,7 @@ func (h *AgentHandler) handleFiberKillAllAgents(c *fiberws.Conn) error {
 }
 
 // handleFiberDeleteAllSessions deletes all sessions from database (Fiber version)
-func (h *AgentHandler) handleFiberDeleteAllSessions(c *fiberws.Conn) error {
+func (h *AgentHandler) handleFiberDeleteAllSessions(c *fiberConn) error {
 	count, err := h.SessionManager.DeleteAllSessions()
 	if err != nil {
 		h.sendFiberError(c, fmt.Sprintf("failed to delete all sessions: %v", err))
@@ -1043,9 +1194,103 @@ func (h *AgentHandler) handleFiberDeleteAllSessions(c *fiberws.Conn) error {
 	return c.WriteJSON(response)
 }
 
+// permissionRequestBody holds the per-request fields of a PermissionRequestMessage, in the same order
+type permissionRequestBody struct {
+	PermissionID string      `json:"permission_id"`
+	Tool         string      `json:"tool"`
+	Action       string      `json:"action"`
+	Details      interface{} `json:"details,omitempty"`
+	Description  string      `json:"description"`
+}
+
+// permissionRequestPrefix encodes the session-constant start of permission_request frames,
+// so a forwarder formats its session ID once rather than for every request
+func permissionRequestPrefix(sessionID uuid.UUID) []byte {
+	return []byte(`{"type":"` + string(MessageTypePermissionRequest) + `","session_id":"` + sessionID.String() + `"`)
+}
+
+// writePermissionRequest sends a frame equivalent to an encoded PermissionRequestMessage,
+// encoding only body after the pre-encoded prefix
+func writePermissionRequest(c *fiberConn, prefix []byte, body permissionRequestBody) error {
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+	if err := encodePermissionRequest(buf, prefix, body); err != nil {
+		releaseBuffer(buf)
+		return err
+	}
+	return c.WriteBuffer(buf)
+}
+
+// permissionRequestBatchPrefix encodes the start of permission_request_batch frames up to the opening of the requests array
+func permissionRequestBatchPrefix(sessionID uuid.UUID) []byte {
+	return []byte(`{"type":"` + string(MessageTypePermissionRequestBatch) + `","session_id":"` + sessionID.String() + `","requests":[`)
+}
+
+// writePermissionRequests sends bodies as a single permission_request frame, or as one
+// permission_request_batch frame when there are several
+func writePermissionRequests(c *fiberConn, prefix, batchPrefix []byte, bodies []permissionRequestBody) error {
+	if len(bodies) == 1 {
+		return writePermissionRequest(c, prefix, bodies[0])
+	}
+
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+	if err := encodePermissionRequestBatch(buf, batchPrefix, bodies); err != nil {
+		releaseBuffer(buf)
+		return err
+	}
+	return c.WriteBuffer(buf)
+}
+
+// encodePermissionRequestBatch writes batchPrefix followed by bodies as the requests array into buf
+func encodePermissionRequestBatch(buf *bytes.Buffer, batchPrefix []byte, bodies []permissionRequestBody) error {
+	buf.Write(batchPrefix)
+	for i, body := range bodies {
+		if i > 0 {
+			buf.WriteByte(',')
+		}
+		if err := encodeJSON(buf, body); err != nil {
+			return err
+		}
+		buf.Truncate(buf.Len() - 1) // Drop the encoder's trailing newline
+	}
+	buf.WriteString("]}")
+	return nil
+}
+
+// drainPermissionRequests appends the requests already queued on requests to batch without waiting for more
+func drainPermissionRequests(requests <-chan PermissionRequest, batch []PermissionRequest) []PermissionRequest {
+	for {
+		select {
+		case permReq, ok := <-requests:
+			if !ok {
+				return batch
+			}
+			batch = append(batch, permReq)
+		default:
+			return batch
+		}
+	}
+}
+
+// encodePermissionRequest writes prefix followed by the fields of body into buf
+func encodePermissionRequest(buf *bytes.Buffer, prefix []byte, body permissionRequestBody) error {
+	buf.Write(prefix)
+	start := buf.Len()
+	if err := encodeJSON(buf, body); err != nil {
+		return err
+	}
+	// Turn the body's opening brace into a comma so its fields continue the prefix's object
+	buf.Bytes()[start] = ','
+	buf.Truncate(buf.Len() - 1) // Drop the encoder's trailing newline
+	return nil
+}
+
 // forwardPermissionRequests monitors the session's permission request channel
 // and forwards requests to the WebSocket client
-func (h *AgentHandler) forwardPermissionRequests(c *fiberws.Conn, sessionID uuid.UUID, session *AgentSession) {
+func (h *AgentHandler) forwardPermissionRequests(c *fiberConn, sessionID uuid.UUID, session *AgentSession) {
+	framePrefix := permissionRequestPrefix(sessionID)
+	batchPrefix := permissionRequestBatchPrefix(sessionID)
 	logging.Info("🚀 Permission forwarder started for session %s", sessionID)
 
 	defer func() {
@@ -1053,9 +1298,9 @@ func (h *AgentHandler) forwardPermissionRequests(c *fiberws.Conn, sessionID uuid
 		logging.Info("🛑 Permission forwarder stopped for session %s", sessionID)
 	}()
 
-	// Create a ticker to periodically check WebSocket connection state
-	ticker := time.NewTicker(5 * time.Second)
-	defer ticker.Stop()
+	// Reused across wakeups; the agent often asks to approve several tool calls at once
+	var batch []PermissionRequest
+	var bodies []permissionRequestBody
 
 	for {
 		select {
@@ -1065,50 +1310,58 @@ func (h *AgentHandler) forwardPermissionRequests(c *fiberws.Conn, sessionID uuid
 				return
 			}
 
-			// Check if WebSocket is still connected before forwarding
-			if !session.IsWebSocketConnected() {
-				logging.Warning("⚠️ WebSocket disconnected, denying permission request: %s", permReq.RequestID)
-				select {
-				case permReq.ResponseChan <- PermissionResponse{
-					Approved:    false,
-					DenyMessage: "WebSocket connection lost",
-				}:
-				default:
+			// Forward every request already queued in one frame rather than one frame each
+			batch = drainPermissionRequests(session.permissionReqChan, append(batch[:0], permReq))
+			bodies = bodies[:0]
+
+			for _, permReq := range batch {
+				// Check if WebSocket is still connected before forwarding
+				if !session.IsWebSocketConnected() {
+					logging.Warning("⚠️ WebSocket disconnected, denying permission request: %s", permReq.RequestID)
+					session.respondPermission(permReq.RequestID, PermissionResponse{
+						Approved:    false,
+						DenyMessage: "WebSocket connection lost",
+					})
+					continue
+				}
+
+				// Tool input can be a whole file or script; only format it when debugging
+				logging.Info("🔐 PERMISSION REQUEST RECEIVED FROM CHANNEL: tool=%s, requestID=%s", permReq.ToolName, permReq.RequestID)
+				if logging.DebugEnabled() {
+					logging.Debug("Permission request %s input: %+v", permReq.RequestID, permReq.Input)
 				}
-				continue
-			}
 
-			logging.Info("🔐 PERMISSION REQUEST RECEIVED FROM CHANNEL: tool=%s, requestID=%s, input=%+v", permReq.ToolName, permReq.RequestID, permReq.Input)
+				// Generate human-readable description
+				description := formatPermissionDescription(permReq.ToolName, permReq.Input)
 
-			// Generate human-readable description
-			description := formatPermissionDescription(permReq.ToolName, permReq.Input)
+				bodies = append(bodies, permissionRequestBody{
+					PermissionID: permReq.RequestID,
+					Tool:         permReq.ToolName,
+					Action:       "use_tool",
+					Details:      permReq.Input,
+					Description:  description,
+				})
 
-			// Send permission request to frontend
-			response := PermissionRequestMessage{
-				BaseMessage:    BaseMessage{Type: MessageTypePermissionRequest},
-				SessionID:      sessionID,
-				PermissionID:   permReq.RequestID,
-				Tool:           permReq.ToolName,
-				Action:         "use_tool",
-				Details:        permReq.Input,
-				Description:    description,
+				logging.Info("📤 WS SENDING PERMISSION REQUEST TO FRONTEND: permissionID=%s, tool=%s, description=%s", permReq.RequestID, permReq.ToolName, description)
+			}
+			clear(batch) // Don't keep tool inputs alive until the next wakeup
+			if len(bodies) == 0 {
+				continue
 			}
 
-			logging.Info("📤 WS SENDING PERMISSION REQUEST TO FRONTEND: permissionID=%s, tool=%s, description=%s", permReq.RequestID, permReq.ToolName, description)
-
-			if err := c.WriteJSON(response); err != nil {
+			// Send permission requests to frontend
+			if err := writePermissionRequests(c, framePrefix, batchPrefix, bodies); err != nil {
 				logging.Error("❌ Failed to send permission request to WebSocket: %v", err)
 
 				// Mark session as disconnected
 				session.SetWebSocketConnected(false)
 
-				// Send error response back to callback
-				select {
-				case permReq.ResponseChan <- PermissionResponse{
-					Approved:    false,
-					DenyMessage: "Failed to send permission request to frontend (WebSocket error)",
-				}:
-				default:
+				// Send error responses back to the callbacks
+				for _, body := range bodies {
+					session.respondPermission(body.PermissionID, PermissionResponse{
+						Approved:    false,
+						DenyMessage: "Failed to send permission request to frontend (WebSocket error)",
+					})
 				}
 
 				// Clean up any other pending permissions
@@ -1116,15 +1369,14 @@ func (h *AgentHandler) forwardPermissionRequests(c *fiberws.Conn, sessionID uuid
 				return
 			}
 
-			logging.Info("✅ Permission request sent to WebSocket successfully: %s", permReq.RequestID)
+			logging.Info("✅ %d permission request(s) sent to WebSocket successfully", len(bodies))
+			clear(bodies)
 
-		case <-ticker.C:
-			// Periodically check if WebSocket is still connected
-			if !session.IsWebSocketConnected() {
-				logging.Info("⏱️ WebSocket connection lost, stopping permission forwarder for session %s", sessionID)
-				session.CleanupPendingPermissions()
-				return
-			}
+		case <-c.Done():
+			// The connection this forwarder writes to has closed
+			logging.Info("⏱️ WebSocket connection lost, stopping permission forwarder for session %s", sessionID)
+			session.CleanupPendingPermissions()
+			return
 
 		case <-session.ctx.Done():
 			logging.Info("Session %s context cancelled, stopping permission request forwarding", sessionID)
@@ -1135,12 +1387,13 @@ func (h *AgentHandler) forwardPermissionRequests(c *fiberws.Conn, sessionID uuid
 }
 
 // handleFiberPermissionResponse handles permission responses from the frontend
-func (h *AgentHandler) handleFiberPermissionResponse(c *fiberws.Conn, rawMsg map[string]interface{}) error {
-	logging.Info("📥 RAW PERMISSION RESPONSE from frontend: %+v", rawMsg)
+func (h *AgentHandler) handleFiberPermissionResponse(c *fiberConn, data []byte) error {
+	if logging.DebugEnabled() {
+		logging.Debug("📥 RAW PERMISSION RESPONSE from frontend: %s", data)
+	}
 
 	var msg PermissionResponseMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid permission_response message: %w", err)
 	}
 
@@ -1153,26 +1406,8 @@ func (h *AgentHandler) handleFiberPermissionResponse(c *fiberws.Conn, rawMsg map
 		return fmt.Errorf("session not found: %w", err)
 	}
 
-	// Find the pending permission request
-	// NOTE: Frontend doesn't send permission_id, so we look for any pending permission in this session
-	session.permMu.Lock()
-	var responseChan chan PermissionResponse
-	var exists bool
-
-	// Try to find by permission ID first (if frontend sends it)
-	if msg.PermissionID != "" {
-		responseChan, exists = session.pendingPermissions[msg.PermissionID]
-	}
-
-	// If not found or no ID provided, get the first (and should be only) pending permission
-	if !exists {
-		for _, ch := range session.pendingPermissions {
-			responseChan = ch
-			exists = true
-			break
-		}
-	}
-	session.permMu.Unlock()
+	// Take the pending permission request so it can only be answered once
+	responseChan, exists := session.takePermission(msg.PermissionID)
 
 	if !exists {
 		logging.Warning("No pending permission request found for session %s (permission_id='%s')", msg.SessionID, msg.PermissionID)
@@ -1187,12 +1422,14 @@ func (h *AgentHandler) handleFiberPermissionResponse(c *fiberws.Conn, rawMsg map
 		DenyMessage: "User denied permission",
 	}
 
+	// The channel has room for exactly one response and the request was taken above,
+	// so delivery never blocks; a full channel means the callback was already answered
 	select {
 	case responseChan <- response:
 		log.Printf("Permission response delivered to callback: %s", msg.PermissionID)
-	case <-time.After(5 * time.Second):
-		log.Printf("ERROR: Timeout delivering permission response to callback")
-		return fmt.Errorf("timeout delivering permission response")
+	default:
+		log.Printf("ERROR: Permission request %s was already answered", msg.PermissionID)
+		return fmt.Errorf("permission request already answered")
 	}
 
 	// Send acknowledgement to frontend
@@ -1201,16 +1438,14 @@ func (h *AgentHandler) handleFiberPermissionResponse(c *fiberws.Conn, rawMsg map
 }
 
 // handleFiberPing responds to ping with pong (Fiber version)
-func (h *AgentHandler) handleFiberPing(c *fiberws.Conn) error {
-	response := BaseMessage{Type: MessageTypePong}
-	return c.WriteJSON(response)
+func (h *AgentHandler) handleFiberPing(c *fiberConn) error {
+	return c.WriteFrame(pongFrame)
 }
 
 // handleFiberAddAlwaysAllowRule adds an always-allow rule to a session
-func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberConn, data []byte) error {
 	var msg AddAlwaysAllowRuleMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid add_always_allow_rule message: %w", err)
 	}
 
@@ -1245,13 +1480,15 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 	if msg.Rule.ID == "" {
 		msg.Rule.ID = uuid.New().String()
 	}
-	msg.Rule.CreatedAt = time.Now()
+	// Read the clock once, outside the lock; the rule and session share the timestamp
+	now := time.Now()
+	msg.Rule.CreatedAt = now
 
 	// Add rule to in-memory session for immediate effect
 	h.SessionManager.mu.Lock()
 	session.Options.AlwaysAllowRules = append(session.Options.AlwaysAllowRules, msg.Rule)
 	totalRules := len(session.Options.AlwaysAllowRules)
-	session.UpdatedAt = time.Now()
+	session.UpdatedAt = now
 	h.SessionManager.mu.Unlock()
 
 	logging.Info("✅ Rule added to session in-memory cache (total rules: %d)", totalRules)
@@ -1270,10 +1507,8 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 	if msg.PermissionID != "" {
 		logging.Info("📤 Approving pending permission request: %s", msg.PermissionID)
 
-		// Find the pending permission request
-		session.permMu.Lock()
-		responseChan, exists := session.pendingPermissions[msg.PermissionID]
-		session.permMu.Unlock()
+		// Take the pending permission request
+		responseChan, exists := session.takePermission(msg.PermissionID)
 
 		if exists {
 			// Send simple approval first (without the rule update)
@@ -1284,20 +1519,15 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 				DenyMessage: "",
 			}:
 				logging.Info("✅ Permission approved - Claude will continue processing")
-				// Clean up the pending permission immediately after approval
-				session.permMu.Lock()
-				delete(session.pendingPermissions, msg.PermissionID)
-				session.permMu.Unlock()
 
 				// Set flag to reload after next message
 				// This ensures Claude completes the current action before we reload
-				session.pendingReloadMu.Lock()
-				session.pendingReload = true
-				session.pendingReloadMu.Unlock()
+				session.pendingReload.Store(true)
 				logging.Info("📋 Marked session for reload after next message")
 
-			case <-time.After(3 * time.Second):
-				logging.Warning("⚠️ Timeout sending permission approval to SDK")
+			default:
+				// Already answered (e.g. denied on disconnect); the rule still applies to later requests
+				logging.Warning("⚠️ Permission %s was already answered", msg.PermissionID)
 			}
 		} else {
 			logging.Warning("⚠️ No pending permission found for ID: %s", msg.PermissionID)
@@ -1306,12 +1536,9 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 			if err := h.SessionManager.ReloadSessionSettings(msg.SessionID); err != nil {
 				logging.Error("Failed to reload session settings: %v", err)
 			} else {
-				go func() {
-					time.Sleep(200 * time.Millisecond)
-					if err := h.SessionManager.SendPrompt(msg.SessionID, "continue"); err != nil {
-						logging.Error("Failed to auto-continue session: %v", err)
-					}
-				}()
+				session.afterDelay(200*time.Millisecond, func() {
+					h.SessionManager.queueContinue(session)
+				})
 			}
 		}
 	} else {
@@ -1320,12 +1547,9 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 		if err := h.SessionManager.ReloadSessionSettings(msg.SessionID); err != nil {
 			logging.Error("Failed to reload session settings: %v", err)
 		} else {
-			go func() {
-				time.Sleep(200 * time.Millisecond)
-				if err := h.SessionManager.SendPrompt(msg.SessionID, "continue"); err != nil {
-					logging.Error("Failed to auto-continue session: %v", err)
-				}
-			}()
+			session.afterDelay(200*time.Millisecond, func() {
+				h.SessionManager.queueContinue(session)
+			})
 		}
 	}
 
@@ -1340,10 +1564,9 @@ func (h *AgentHandler) handleFiberAddAlwaysAllowRule(c *fiberws.Conn, rawMsg map
 }
 
 // handleFiberRemoveAlwaysAllowRule removes an always-allow rule from a session
-func (h *AgentHandler) handleFiberRemoveAlwaysAllowRule(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberRemoveAlwaysAllowRule(c *fiberConn, data []byte) error {
 	var msg RemoveAlwaysAllowRuleMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid remove_always_allow_rule message: %w", err)
 	}
 
@@ -1365,6 +1588,7 @@ func (h *AgentHandler) handleFiberRemoveAlwaysAllowRule(c *fiberws.Conn, rawMsg
 	settingsManager := NewClaudeSettingsManager(workingDir)
 
 	// Find the rule to remove and format its permission string
+	now := time.Now()
 	h.SessionManager.mu.Lock()
 	var ruleToRemove *AlwaysAllowRule
 	newRules := []AlwaysAllowRule{}
@@ -1376,7 +1600,7 @@ func (h *AgentHandler) handleFiberRemoveAlwaysAllowRule(c *fiberws.Conn, rawMsg
 		}
 	}
 	session.Options.AlwaysAllowRules = newRules
-	session.UpdatedAt = time.Now()
+	session.UpdatedAt = now
 	h.SessionManager.mu.Unlock()
 
 	// Remove from settings.local.json
@@ -1407,10 +1631,9 @@ func (h *AgentHandler) handleFiberRemoveAlwaysAllowRule(c *fiberws.Conn, rawMsg
 }
 
 // handleFiberListAlwaysAllowRules lists all always-allow rules for a session
-func (h *AgentHandler) handleFiberListAlwaysAllowRules(c *fiberws.Conn, rawMsg map[string]interface{}) error {
+func (h *AgentHandler) handleFiberListAlwaysAllowRules(c *fiberConn, data []byte) error {
 	var msg ListAlwaysAllowRulesMessage
-	msgBytes, _ := json.Marshal(rawMsg)
-	if err := json.Unmarshal(msgBytes, &msg); err != nil {
+	if err := json.Unmarshal(data, &msg); err != nil {
 		return fmt.Errorf("invalid list_always_allow_rules message: %w", err)
 	}
 
@@ -1433,14 +1656,13 @@ func (h *AgentHandler) handleFiberListAlwaysAllowRules(c *fiberws.Conn, rawMsg m
 // GetStats returns current handler statistics
 func (h *AgentHandler) GetStats() map[string]interface{} {
 	h.Mu.Lock()
-	defer h.Mu.Unlock()
-
-	sessions := h.SessionManager.ListSessions()
+	active := h.Active
+	h.Mu.Unlock()
 
 	return map[string]interface{}{
-		"active_connections": h.Active,
+		"active_connections": active,
 		"max_connections":    h.Config.MaxConcurrentSessions,
-		"active_sessions":    len(sessions),
+		"active_sessions":    h.SessionManager.SessionCount(),
 	}
 }
 
@@ -1467,58 +1689,66 @@ func (h *AgentHandler) HealthCheck(w http.ResponseWriter, r *http.Request) {
 	_ = ws.WriteJSON(stats)
 }
 
-// formatPermissionDescription generates a human-readable description for a permission request
-func formatPermissionDescription(toolName string, input map[string]interface{}) string {
-	switch toolName {
-	case "Bash":
-		if cmd, ok := input["command"].(string); ok {
-			return fmt.Sprintf("Execute command: %s", cmd)
-		}
-		return "Execute a bash command"
-
-	case "Read":
-		if path, ok := input["file_path"].(string); ok {
-			return fmt.Sprintf("Read file: %s", path)
-		}
-		return "Read a file"
-
-	case "Write":
-		if path, ok := input["file_path"].(string); ok {
-			return fmt.Sprintf("Write to file: %s", path)
-		}
-		return "Write to a file"
+// maxDescriptionValue caps how much of a tool argument is repeated in a permission description;
+// the full input is sent alongside in the request details
+const maxDescriptionValue = 512
 
-	case "Edit":
-		if path, ok := input["file_path"].(string); ok {
-			return fmt.Sprintf("Edit file: %s", path)
-		}
-		return "Edit a file"
+// truncateDescription shortens value to at most maxDescriptionValue bytes without splitting a UTF-8 sequence
+func truncateDescription(value string) string {
+	if len(value) <= maxDescriptionValue {
+		return value
+	}
+	cut := maxDescriptionValue
+	for cut > 0 && !utf8.RuneStart(value[cut]) {
+		cut--
+	}
+	return value[:cut] + "…"
+}
 
-	case "Glob":
-		if pattern, ok := input["pattern"].(string); ok {
-			return fmt.Sprintf("Search files matching: %s", pattern)
-		}
-		return "Search for files"
+// permissionDescriber describes one tool's permission requests: the input argument to show,
+// the text to prefix it with, and the description to use when the argument is missing
+type permissionDescriber struct {
+	arg      string
+	prefix   string
+	fallback string
+}
 
-	case "Grep":
-		if pattern, ok := input["pattern"].(string); ok {
-			return fmt.Sprintf("Search content matching: %s", pattern)
-		}
-		return "Search file contents"
+// permissionDescribers maps the built-in tools to their descriptions
+var permissionDescribers = map[string]permissionDescriber{
+	"Bash":      {arg: "command", prefix: "Execute command: ", fallback: "Execute a bash command"},
+	"Read":      {arg: "file_path", prefix: "Read file: ", fallback: "Read a file"},
+	"Write":     {arg: "file_path", prefix: "Write to file: ", fallback: "Write to a file"},
+	"Edit":      {arg: "file_path", prefix: "Edit file: ", fallback: "Edit a file"},
+	"Glob":      {arg: "pattern", prefix: "Search files matching: ", fallback: "Search for files"},
+	"Grep":      {arg: "pattern", prefix: "Search content matching: ", fallback: "Search file contents"},
+	"WebSearch": {arg: "query", prefix: "Web search: ", fallback: "Perform a web search"},
+	"WebFetch":  {arg: "url", prefix: "Fetch URL: ", fallback: "Fetch a web page"},
+}
 
-	case "WebSearch":
-		if query, ok := input["query"].(string); ok {
-			return fmt.Sprintf("Web search: %s", query)
-		}
-		return "Perform a web search"
+// parseMCPToolName splits an MCP tool name of the form mcp__<server>__<tool>
+func parseMCPToolName(toolName string) (server, tool string, ok bool) {
+	rest, ok := strings.CutPrefix(toolName, "mcp__")
+	if !ok {
+		return "", "", false
+	}
+	server, tool, ok = strings.Cut(rest, "__")
+	if !ok || server == "" || tool == "" {
+		return "", "", false
+	}
+	return server, tool, true
+}
 
-	case "WebFetch":
-		if url, ok := input["url"].(string); ok {
-			return fmt.Sprintf("Fetch URL: %s", url)
+// formatPermissionDescription generates a human-readable description for a permission request
+func formatPermissionDescription(toolName string, input map[string]interface{}) string {
+	d, ok := permissionDescribers[toolName]
+	if !ok {
+		if server, tool, ok := parseMCPToolName(toolName); ok {
+			return "Use " + tool + " tool from MCP server " + server
 		}
-		return "Fetch a web page"
-
-	default:
-		return fmt.Sprintf("Use %s tool", toolName)
+		return "Use " + toolName + " tool"
+	}
+	if value, ok := input[d.arg].(string); ok {
+		return d.prefix + truncateDescription(value)
 	}
+	return d.fallback
 }
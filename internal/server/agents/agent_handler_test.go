@@ -0,0 +1,300 @@
+package agents
+
+import (
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"strings"
+	"testing"
+
+	"github.com/google/uuid"
+)
+
+// TestBoundedRepr tests that boundedRepr truncates long values
+func TestBoundedRepr(t *testing.T) {
+	tests := []struct {
+		name     string
+		input    interface{}
+		limit    int
+		expected string
+	}{
+		{
+			name:     "short value unchanged",
+			input:    "hello",
+			limit:    10,
+			expected: "hello",
+		},
+		{
+			name:     "value at limit unchanged",
+			input:    "0123456789",
+			limit:    10,
+			expected: "0123456789",
+		},
+		{
+			name:     "long value truncated",
+			input:    strings.Repeat("a", 15),
+			limit:    10,
+			expected: "aaaaaaaaaa...[truncated 5 chars]",
+		},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			result := boundedRepr(tt.input, tt.limit)
+			if result != tt.expected {
+				t.Errorf("boundedRepr() = %q, want %q", result, tt.expected)
+			}
+		})
+	}
+}
+
+// TestFormatPermissionDescription tests descriptions for known and unknown tools
+func TestFormatPermissionDescription(t *testing.T) {
+	tests := []struct {
+		name     string
+		toolName string
+		input    map[string]interface{}
+		expected string
+	}{
+		{
+			name:     "bash with command",
+			toolName: "Bash",
+			input:    map[string]interface{}{"command": "ls -la"},
+			expected: "Execute command: ls -la",
+		},
+		{
+			name:     "bash without command",
+			toolName: "Bash",
+			input:    map[string]interface{}{},
+			expected: "Execute a bash command",
+		},
+		{
+			name:     "edit with path",
+			toolName: "Edit",
+			input:    map[string]interface{}{"file_path": "/tmp/a.go"},
+			expected: "Edit file: /tmp/a.go",
+		},
+		{
+			name:     "grep with non-string pattern",
+			toolName: "Grep",
+			input:    map[string]interface{}{"pattern": 42},
+			expected: "Search file contents",
+		},
+		{
+			name:     "web fetch with url",
+			toolName: "WebFetch",
+			input:    map[string]interface{}{"url": "https://example.com"},
+			expected: "Fetch URL: https://example.com",
+		},
+		{
+			name:     "bash with long command",
+			toolName: "Bash",
+			input:    map[string]interface{}{"command": strings.Repeat("a", maxDescriptionValue+10)},
+			expected: "Execute command: " + strings.Repeat("a", maxDescriptionValue) + "…",
+		},
+		{
+			name:     "long value not split inside a rune",
+			toolName: "Grep",
+			input:    map[string]interface{}{"pattern": strings.Repeat("a", maxDescriptionValue-1) + "é"},
+			expected: "Search content matching: " + strings.Repeat("a", maxDescriptionValue-1) + "…",
+		},
+		{
+			name:     "unknown tool",
+			toolName: "NotebookEdit",
+			input:    map[string]interface{}{"notebook_path": "a.ipynb"},
+			expected: "Use NotebookEdit tool",
+		},
+		{
+			name:     "mcp tool",
+			toolName: "mcp__github__create_issue",
+			input:    map[string]interface{}{"title": "Bug"},
+			expected: "Use create_issue tool from MCP server github",
+		},
+		{
+			name:     "malformed mcp tool",
+			toolName: "mcp__github",
+			input:    map[string]interface{}{},
+			expected: "Use mcp__github tool",
+		},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			result := formatPermissionDescription(tt.toolName, tt.input)
+			if result != tt.expected {
+				t.Errorf("formatPermissionDescription() = %q, want %q", result, tt.expected)
+			}
+		})
+	}
+}
+
+// TestPongFrame tests that the pre-encoded pong frame is a valid pong message
+func TestPongFrame(t *testing.T) {
+	var msg BaseMessage
+	if err := json.Unmarshal(pongFrame, &msg); err != nil {
+		t.Fatalf("Failed to decode pongFrame: %v", err)
+	}
+	if msg.Type != MessageTypePong {
+		t.Errorf("pongFrame type = %s, want %s", msg.Type, MessageTypePong)
+	}
+}
+
+// TestEncodeJSON tests that outbound frames are encoded without HTML escaping
+func TestEncodeJSON(t *testing.T) {
+	var buf bytes.Buffer
+	if err := encodeJSON(&buf, map[string]string{"text": "if a < b && b > c {}"}); err != nil {
+		t.Fatalf("encodeJSON() error = %v", err)
+	}
+
+	expected := `{"text":"if a < b && b > c {}"}` + "\n"
+	if buf.String() != expected {
+		t.Errorf("encodeJSON() = %q, want %q", buf.String(), expected)
+	}
+}
+
+// TestAgentMessageEnvelope tests that envelope frames match an encoded AgentMessageResponse
+func TestAgentMessageEnvelope(t *testing.T) {
+	sessionID := uuid.New()
+	envelope := newAgentMessageEnvelope(sessionID)
+	content := AssistantContent{Type: "assistant", Text: []string{"hello"}}
+
+	tests := []struct {
+		name      string
+		msgType   MessageType
+		gitBranch string
+	}{
+		{name: "no branch", msgType: MessageTypeAgentMessage},
+		{name: "with branch", msgType: MessageTypeAgentMessage, gitBranch: "main"},
+		{name: "branch changed", msgType: MessageTypeAgentMessage, gitBranch: "feature/x"},
+		{name: "permission request", msgType: MessageTypePermissionRequest, gitBranch: "feature/x"},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			var buf bytes.Buffer
+			if err := envelope.encode(&buf, tt.msgType, content, tt.gitBranch); err != nil {
+				t.Fatalf("encode() error = %v", err)
+			}
+
+			response := AgentMessageResponse{
+				BaseMessage: BaseMessage{Type: tt.msgType},
+				SessionID:   sessionID,
+				Content:     content,
+			}
+			if tt.gitBranch != "" {
+				response.Metadata = AgentMessageMetadata{GitBranch: tt.gitBranch}
+			}
+			expected, err := json.Marshal(response)
+			if err != nil {
+				t.Fatalf("json.Marshal() error = %v", err)
+			}
+
+			if buf.String() != string(expected) {
+				t.Errorf("encode() = %s, want %s", buf.String(), expected)
+			}
+		})
+	}
+}
+
+// TestEncodePermissionRequest tests that prefix plus body encodes the same frame as PermissionRequestMessage
+func TestEncodePermissionRequest(t *testing.T) {
+	sessionID := uuid.New()
+	prefix := permissionRequestPrefix(sessionID)
+
+	tests := []struct {
+		name    string
+		details interface{}
+	}{
+		{name: "with details", details: map[string]interface{}{"command": "ls && echo <done>"}},
+		{name: "without details", details: nil},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			var buf bytes.Buffer
+			body := permissionRequestBody{
+				PermissionID: "req-1",
+				Tool:         "Bash",
+				Action:       "use_tool",
+				Details:      tt.details,
+				Description:  "Execute command: ls",
+			}
+			if err := encodePermissionRequest(&buf, prefix, body); err != nil {
+				t.Fatalf("encodePermissionRequest() error = %v", err)
+			}
+
+			var expected bytes.Buffer
+			if err := encodeJSON(&expected, PermissionRequestMessage{
+				BaseMessage:  BaseMessage{Type: MessageTypePermissionRequest},
+				SessionID:    sessionID,
+				PermissionID: body.PermissionID,
+				Tool:         body.Tool,
+				Action:       body.Action,
+				Details:      body.Details,
+				Description:  body.Description,
+			}); err != nil {
+				t.Fatalf("encodeJSON() error = %v", err)
+			}
+
+			if want := strings.TrimSuffix(expected.String(), "\n"); buf.String() != want {
+				t.Errorf("encodePermissionRequest() = %s, want %s", buf.String(), want)
+			}
+		})
+	}
+}
+
+// TestEncodePermissionRequestBatch tests that a batch frame carries every request under the session
+func TestEncodePermissionRequestBatch(t *testing.T) {
+	sessionID := uuid.New()
+	bodies := []permissionRequestBody{
+		{PermissionID: "1", Tool: "Bash", Action: "use_tool", Details: map[string]interface{}{"command": "ls"}, Description: "Execute command: ls"},
+		{PermissionID: "2", Tool: "Write", Action: "use_tool", Description: "Write file"},
+	}
+
+	var buf bytes.Buffer
+	if err := encodePermissionRequestBatch(&buf, permissionRequestBatchPrefix(sessionID), bodies); err != nil {
+		t.Fatalf("encodePermissionRequestBatch() error = %v", err)
+	}
+
+	var frame struct {
+		Type      MessageType             `json:"type"`
+		SessionID uuid.UUID               `json:"session_id"`
+		Requests  []permissionRequestBody `json:"requests"`
+	}
+	if err := json.Unmarshal(buf.Bytes(), &frame); err != nil {
+		t.Fatalf("batch frame is not valid JSON: %v (%s)", err, buf.String())
+	}
+	if frame.Type != MessageTypePermissionRequestBatch || frame.SessionID != sessionID {
+		t.Errorf("frame header = (%s, %s), want (%s, %s)", frame.Type, frame.SessionID, MessageTypePermissionRequestBatch, sessionID)
+	}
+	if len(frame.Requests) != len(bodies) {
+		t.Fatalf("len(requests) = %d, want %d", len(frame.Requests), len(bodies))
+	}
+	for i, body := range bodies {
+		if got := frame.Requests[i]; got.PermissionID != body.PermissionID || got.Tool != body.Tool {
+			t.Errorf("requests[%d] = %+v, want %+v", i, got, body)
+		}
+	}
+}
+
+// TestDrainPermissionRequests tests that draining takes only the requests already queued
+func TestDrainPermissionRequests(t *testing.T) {
+	requests := make(chan PermissionRequest, 3)
+	requests <- PermissionRequest{RequestID: "2"}
+	requests <- PermissionRequest{RequestID: "3"}
+
+	batch := drainPermissionRequests(requests, []PermissionRequest{{RequestID: "1"}})
+	if len(batch) != 3 {
+		t.Fatalf("len(batch) = %d, want 3", len(batch))
+	}
+	for i, permReq := range batch {
+		if want := fmt.Sprint(i + 1); permReq.RequestID != want {
+			t.Errorf("batch[%d].RequestID = %s, want %s", i, permReq.RequestID, want)
+		}
+	}
+
+	close(requests)
+	if batch := drainPermissionRequests(requests, nil); len(batch) != 0 {
+		t.Errorf("drainPermissionRequests() on a closed channel = %d requests, want 0", len(batch))
+	}
+}
@@ -281,12 +281,13 @@ func deduplicatePermissions(permissions []string) []string {
 		return permissions
 	}
 
-	seen := make(map[string]bool)
+	// Sized up front so the set never rehashes; empty values keep it to the keys alone
+	seen := make(map[string]struct{}, len(permissions))
 	result := make([]string, 0, len(permissions))
 
 	for _, perm := range permissions {
-		if !seen[perm] {
-			seen[perm] = true
+		if _, ok := seen[perm]; !ok {
+			seen[perm] = struct{}{}
 			result = append(result, perm)
 		}
 	}
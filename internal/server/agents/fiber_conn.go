@@ -0,0 +1,273 @@
+package agents
+
+import (
+	"bytes"
+	"errors"
+	"sync"
+
+	fiberws "github.com/gofiber/websocket/v2"
+	"github.com/google/uuid"
+)
+
+// outboundQueueSize bounds how many frames may wait for a slow client before senders block.
+// The channel buffer is allocated up front for every connection; the byte budget below
+// is what bounds large bursts, so this only needs to absorb a stream of small frames.
+const outboundQueueSize = 128
+
+// Byte watermarks for queued frames: senders block once maxPendingBytes are queued
+// and resume when the writer has drained the queue to resumePendingBytes
+const (
+	maxPendingBytes    = 4 << 20
+	resumePendingBytes = 1 << 20
+)
+
+// errConnClosed is returned when writing to a connection whose writer has stopped
+var errConnClosed = errors.New("websocket connection closed")
+
+// outboundFrame is a queued text frame; buf is returned to jsonBufferPool once written
+type outboundFrame struct {
+	data []byte
+	buf  *bytes.Buffer
+}
+
+// fiberConn serializes all writes to a Fiber WebSocket through a single writer goroutine.
+// The underlying connection does not support concurrent writers, and prompt streams,
+// permission forwarders and request handlers all send on the same connection.
+type fiberConn struct {
+	conn      *fiberws.Conn
+	out       chan outboundFrame
+	closed    chan struct{}
+	closeOnce sync.Once
+
+	// writerDone is closed once the writer goroutine has exited and will not touch conn again
+	writerDone chan struct{}
+
+	// err is written once before closed is closed and only read after observing that
+	err error
+
+	// pendingBytes counts bytes queued but not yet written; pendingCond wakes blocked senders
+	pendingMu    sync.Mutex
+	pendingCond  *sync.Cond
+	pendingBytes int
+	stopped      bool
+
+	// streaming tracks sessions that already have a response streamer on this connection
+	streamMu        sync.Mutex
+	streaming       map[uuid.UUID]streamMark
+	lastStreamToken uint64
+}
+
+// streamMark identifies the response streamer running for a session on a connection
+type streamMark struct {
+	token uint64
+	done  <-chan struct{} // The session context the streamer stops with
+}
+
+// newFiberConn wraps c and starts its writer goroutine
+func newFiberConn(c *fiberws.Conn) *fiberConn {
+	fc := &fiberConn{
+		conn:       c,
+		out:        make(chan outboundFrame, outboundQueueSize),
+		closed:     make(chan struct{}),
+		writerDone: make(chan struct{}),
+		streaming:  make(map[uuid.UUID]streamMark),
+	}
+	fc.pendingCond = sync.NewCond(&fc.pendingMu)
+	go fc.writeLoop()
+	return fc
+}
+
+// WriteJSON encodes v into a pooled buffer and queues it as a single text frame.
+// It blocks while the queue is full, by frame count or by bytes, applying backpressure to the sender.
+func (fc *fiberConn) WriteJSON(v interface{}) error {
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+
+	if err := encodeJSON(buf, v); err != nil {
+		releaseBuffer(buf)
+		return err
+	}
+	return fc.WriteBuffer(buf)
+}
+
+// WriteBuffer queues buf, a frame already encoded into a buffer from jsonBufferPool.
+// The connection takes ownership of buf and returns it to the pool once written.
+func (fc *fiberConn) WriteBuffer(buf *bytes.Buffer) error {
+	return fc.enqueue(outboundFrame{data: buf.Bytes(), buf: buf})
+}
+
+// WriteFrame queues a pre-encoded text frame; data must not be modified afterwards
+func (fc *fiberConn) WriteFrame(data []byte) error {
+	return fc.enqueue(outboundFrame{data: data})
+}
+
+// enqueue hands a frame to the writer goroutine unless the connection is closed
+func (fc *fiberConn) enqueue(frame outboundFrame) error {
+	// Check closed first: a select with both cases ready picks one at random
+	select {
+	case <-fc.closed:
+		releaseBuffer(frame.buf)
+		return fc.closeErr()
+	default:
+	}
+
+	if !fc.reserve(len(frame.data)) {
+		releaseBuffer(frame.buf)
+		return fc.closeErr()
+	}
+
+	select {
+	case fc.out <- frame:
+		return nil
+	case <-fc.closed:
+		fc.unreserve(len(frame.data))
+		releaseBuffer(frame.buf)
+		return fc.closeErr()
+	}
+}
+
+// reserve accounts n bytes as queued, first waiting while the queue is over maxPendingBytes.
+// Returns false if the connection stopped while waiting.
+func (fc *fiberConn) reserve(n int) bool {
+	fc.pendingMu.Lock()
+	defer fc.pendingMu.Unlock()
+
+	for fc.pendingBytes >= maxPendingBytes && !fc.stopped {
+		fc.pendingCond.Wait()
+	}
+	if fc.stopped {
+		return false
+	}
+	fc.pendingBytes += n
+	return true
+}
+
+// unreserve releases n queued bytes, waking blocked senders once the queue has drained enough
+func (fc *fiberConn) unreserve(n int) {
+	fc.pendingMu.Lock()
+	defer fc.pendingMu.Unlock()
+
+	fc.pendingBytes -= n
+	if fc.pendingBytes <= resumePendingBytes {
+		fc.pendingCond.Broadcast()
+	}
+}
+
+// writeLoop writes queued frames in order until the connection is closed or a write fails
+func (fc *fiberConn) writeLoop() {
+	defer close(fc.writerDone)
+	for {
+		select {
+		case frame := <-fc.out:
+			if err := fc.writeBatch(frame); err != nil {
+				fc.closeWithError(err)
+				return
+			}
+		case <-fc.closed:
+			return
+		}
+	}
+}
+
+// writeBatch writes frame and the frames already queued behind it, then releases their bytes at once.
+// A streaming response queues many small frames; draining them together takes the budget lock
+// and wakes blocked senders once per batch instead of once per frame. A batch stops at
+// maxPendingBytes-resumePendingBytes, the amount that always brings a full queue back under the resume mark.
+func (fc *fiberConn) writeBatch(frame outboundFrame) error {
+	written := 0
+	defer func() {
+		fc.unreserve(written)
+	}()
+
+	for {
+		// Never start a write once closed: Close only waits for a write already in progress,
+		// and the handler hands the underlying connection back to its pool after that
+		select {
+		case <-fc.closed:
+			releaseBuffer(frame.buf)
+			return nil
+		default:
+		}
+
+		err := fc.conn.WriteMessage(fiberws.TextMessage, frame.data)
+		written += len(frame.data)
+		releaseBuffer(frame.buf)
+		if err != nil || written >= maxPendingBytes-resumePendingBytes {
+			return err
+		}
+
+		select {
+		case frame = <-fc.out:
+		case <-fc.closed:
+			return nil
+		default:
+			return nil
+		}
+	}
+}
+
+// Close stops the writer goroutine and waits for it to exit; frames still queued are dropped.
+// Once Close returns the underlying connection is no longer written to.
+func (fc *fiberConn) Close() {
+	fc.closeWithError(errConnClosed)
+	<-fc.writerDone
+}
+
+// Done returns a channel that is closed once the connection stops accepting writes
+func (fc *fiberConn) Done() <-chan struct{} {
+	return fc.closed
+}
+
+// startStream marks a response streamer as running for sessionID until done is closed.
+// Returns the streamer's token for stopStream and true if the caller should start one, or
+// false if one is already running for the current session context. A streamer whose context
+// has been cancelled, as by an interrupt, is replaced even before it has removed its mark.
+func (fc *fiberConn) startStream(sessionID uuid.UUID, done <-chan struct{}) (uint64, bool) {
+	fc.streamMu.Lock()
+	defer fc.streamMu.Unlock()
+	if mark, ok := fc.streaming[sessionID]; ok {
+		select {
+		case <-mark.done:
+		default:
+			return 0, false
+		}
+	}
+	fc.lastStreamToken++
+	fc.streaming[sessionID] = streamMark{token: fc.lastStreamToken, done: done}
+	return fc.lastStreamToken, true
+}
+
+// stopStream marks the response streamer for sessionID as stopped, unless a newer one has replaced it
+func (fc *fiberConn) stopStream(sessionID uuid.UUID, token uint64) {
+	fc.streamMu.Lock()
+	defer fc.streamMu.Unlock()
+	if fc.streaming[sessionID].token == token {
+		delete(fc.streaming, sessionID)
+	}
+}
+
+// closeWithError records the first error that stopped the connection and signals senders
+func (fc *fiberConn) closeWithError(err error) {
+	fc.closeOnce.Do(func() {
+		fc.err = err
+		close(fc.closed)
+
+		// Wake senders blocked on the byte budget
+		fc.pendingMu.Lock()
+		fc.stopped = true
+		fc.pendingCond.Broadcast()
+		fc.pendingMu.Unlock()
+	})
+}
+
+// closeErr returns the error that stopped the connection; only valid once closed has been observed
+func (fc *fiberConn) closeErr() error {
+	return fc.err
+}
+
+// releaseBuffer returns buf to jsonBufferPool unless it has grown too large to keep
+func releaseBuffer(buf *bytes.Buffer) {
+	if buf != nil && buf.Cap() <= maxPooledBufferSize {
+		jsonBufferPool.Put(buf)
+	}
+}
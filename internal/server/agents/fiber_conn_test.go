@@ -0,0 +1,115 @@
+package agents
+
+import (
+	"context"
+	"errors"
+	"testing"
+	"time"
+
+	"github.com/google/uuid"
+)
+
+// TestFiberConnClosed tests that writes fail fast once the connection is closed
+func TestFiberConnClosed(t *testing.T) {
+	fc := newFiberConn(nil)
+	fc.Close()
+	fc.Close() // Closing twice must not panic
+
+	if err := fc.WriteJSON(BaseMessage{Type: MessageTypePong}); !errors.Is(err, errConnClosed) {
+		t.Errorf("WriteJSON() after Close error = %v, want %v", err, errConnClosed)
+	}
+	if err := fc.WriteFrame(pongFrame); !errors.Is(err, errConnClosed) {
+		t.Errorf("WriteFrame() after Close error = %v, want %v", err, errConnClosed)
+	}
+}
+
+// TestFiberConnCloseWaitsForWriter tests that Close returns only after the writer goroutine has exited
+func TestFiberConnCloseWaitsForWriter(t *testing.T) {
+	fc := newFiberConn(nil)
+	fc.Close()
+
+	select {
+	case <-fc.writerDone:
+	default:
+		t.Fatal("Close() returned while the writer goroutine was still running")
+	}
+}
+
+// TestFiberConnStreamTracking tests that only one response streamer runs per session
+func TestFiberConnStreamTracking(t *testing.T) {
+	fc := newFiberConn(nil)
+	defer fc.Close()
+
+	sessionID := uuid.New()
+	done := make(chan struct{})
+	token, ok := fc.startStream(sessionID, done)
+	if !ok {
+		t.Fatal("startStream() = false for a new session, want true")
+	}
+	if _, ok := fc.startStream(sessionID, done); ok {
+		t.Error("startStream() = true while a streamer is running, want false")
+	}
+	if _, ok := fc.startStream(uuid.New(), done); !ok {
+		t.Error("startStream() = false for a different session, want true")
+	}
+
+	fc.stopStream(sessionID, token)
+	if _, ok := fc.startStream(sessionID, done); !ok {
+		t.Error("startStream() = false after stopStream, want true")
+	}
+}
+
+// TestFiberConnStreamAfterInterrupt tests that a prompt sent right after an interrupt gets a new
+// streamer even though the interrupted one has not stopped yet, and that the old one stopping
+// late leaves the new mark in place
+func TestFiberConnStreamAfterInterrupt(t *testing.T) {
+	fc := newFiberConn(nil)
+	defer fc.Close()
+
+	sessionID := uuid.New()
+	ctx, cancel := context.WithCancel(context.Background())
+	oldToken, ok := fc.startStream(sessionID, ctx.Done())
+	if !ok {
+		t.Fatal("startStream() = false for a new session, want true")
+	}
+
+	// Interrupt: the session context is cancelled and replaced before the old streamer exits
+	cancel()
+	next, cancelNext := context.WithCancel(context.Background())
+	defer cancelNext()
+
+	if _, ok := fc.startStream(sessionID, next.Done()); !ok {
+		t.Fatal("startStream() after interrupt = false, want true")
+	}
+
+	fc.stopStream(sessionID, oldToken)
+	if _, ok := fc.startStream(sessionID, next.Done()); ok {
+		t.Error("interrupted streamer's stopStream removed the new streamer's mark")
+	}
+}
+
+// TestFiberConnByteBudget tests that senders block over the byte budget and wake on close
+func TestFiberConnByteBudget(t *testing.T) {
+	fc := newFiberConn(nil)
+
+	// Fill the budget without a writer draining it
+	if !fc.reserve(maxPendingBytes) {
+		t.Fatal("reserve() on empty budget = false, want true")
+	}
+
+	blocked := make(chan bool)
+	go func() {
+		blocked <- fc.reserve(1)
+	}()
+
+	select {
+	case <-blocked:
+		t.Fatal("reserve() over budget returned without blocking")
+	case <-time.After(50 * time.Millisecond):
+	}
+
+	fc.Close()
+	if ok := <-blocked; ok {
+		t.Error("reserve() after Close = true, want false")
+	}
+}
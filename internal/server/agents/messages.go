@@ -37,6 +37,7 @@ const (
 
 	// Permission requests
 	MessageTypePermissionRequest      MessageType = "permission_request"
+	MessageTypePermissionRequestBatch MessageType = "permission_request_batch" // Several permission requests for one session in a single frame
 	MessageTypePermissionResponse     MessageType = "permission_response"
 	MessageTypePermissionAcknowledged MessageType = "permission_acknowledged"
 
@@ -193,6 +194,76 @@ type AgentMessageResponse struct {
 	Metadata  interface{} `json:"metadata,omitempty"`
 }
 
+// AgentMessageMetadata is the metadata attached to an agent_message
+type AgentMessageMetadata struct {
+	GitBranch string `json:"git_branch"`
+}
+
+// AssistantContent is the content of an assistant agent_message
+type AssistantContent struct {
+	Type  string           `json:"type"`
+	Text  []string         `json:"text"`
+	Tools []ToolUseContent `json:"tools"`
+}
+
+// ToolUseContent describes a tool invocation within an assistant message
+type ToolUseContent struct {
+	ID     string      `json:"id"`
+	Name   string      `json:"name"`
+	Input  interface{} `json:"input"`
+	Status string      `json:"status"`
+}
+
+// UserContent is the content of a user agent_message
+type UserContent struct {
+	Type        string              `json:"type"`
+	Content     interface{}         `json:"content"`
+	ToolResults []ToolResultContent `json:"tool_results"`
+}
+
+// ToolResultContent marks a tool call as finished within a user message.
+// The result itself is only sent once, in the user message's content blocks.
+type ToolResultContent struct {
+	ToolUseID string      `json:"tool_use_id"`
+	IsError   interface{} `json:"is_error"`
+	Status    string      `json:"status"`
+}
+
+// ResultContent is the content of a result agent_message, sent when a turn completes
+type ResultContent struct {
+	Type       string      `json:"type"`
+	Success    bool        `json:"success"`
+	NumTurns   int         `json:"num_turns"`
+	DurationMs interface{} `json:"duration_ms"`
+	IsError    interface{} `json:"is_error"`
+	CostUSD    *float64    `json:"cost_usd,omitempty"`
+	Usage      interface{} `json:"usage,omitempty"`
+}
+
+// SystemContent is the content of a system agent_message
+type SystemContent struct {
+	Type    string      `json:"type"`
+	Subtype interface{} `json:"subtype"`
+	Data    interface{} `json:"data"`
+}
+
+// PermissionRequestContent is the content of a permission_request forwarded from a control_request
+type PermissionRequestContent struct {
+	Type         string      `json:"type"`
+	PermissionID interface{} `json:"permission_id"`
+	Tool         interface{} `json:"tool"`
+	Action       interface{} `json:"action"`
+	Details      interface{} `json:"details"`
+}
+
+// AgentToolUseMessage is broadcast for every tool invocation (metrics tracking)
+type AgentToolUseMessage struct {
+	BaseMessage
+	SessionID  uuid.UUID   `json:"session_id"`
+	Tool       string      `json:"tool"`
+	Parameters interface{} `json:"parameters"`
+}
+
 // EndSessionMessage represents ending a session
 type EndSessionMessage struct {
 	BaseMessage
@@ -1,6 +1,7 @@
 package agents
 
 import (
+	"bytes"
 	"encoding/json"
 	"path/filepath"
 	"strings"
@@ -39,33 +40,52 @@ func GeneratePattern(toolName string, input map[string]interface{}) *RulePattern
 
 // MatchesRule checks if current request matches an always-allow rule
 func MatchesRule(rule AlwaysAllowRule, toolName string, input map[string]interface{}) bool {
+	request := ruleRequest{toolName: toolName, input: input}
+	return request.matches(rule)
+}
+
+// ruleRequest is a tool request being checked against always-allow rules.
+// Its parameters are encoded at most once, however many exact rules it is checked against.
+type ruleRequest struct {
+	toolName  string
+	input     map[string]interface{}
+	inputJSON []byte
+	inputErr  error
+	encoded   bool
+}
+
+// matches checks if the request matches an always-allow rule
+func (r *ruleRequest) matches(rule AlwaysAllowRule) bool {
 	// Tool name must always match
-	if rule.Tool != toolName {
+	if rule.Tool != r.toolName {
 		return false
 	}
 
 	switch rule.MatchMode {
 	case RuleMatchExact:
-		return parametersMatchExact(rule.Parameters, input)
+		return r.matchesExact(rule.Parameters)
 
 	case RuleMatchPattern:
-		return parametersMatchPattern(rule.Pattern, toolName, input)
+		return parametersMatchPattern(rule.Pattern, r.toolName, r.input)
 	}
 
 	return false
 }
 
-// parametersMatchExact performs deep equality check on parameters
-func parametersMatchExact(ruleParams, requestParams map[string]interface{}) bool {
+// matchesExact performs deep equality check of the request parameters against ruleParams
+func (r *ruleRequest) matchesExact(ruleParams map[string]interface{}) bool {
 	// Convert both to JSON for deep comparison
-	ruleJSON, err1 := json.Marshal(ruleParams)
-	requestJSON, err2 := json.Marshal(requestParams)
+	if !r.encoded {
+		r.inputJSON, r.inputErr = json.Marshal(r.input)
+		r.encoded = true
+	}
+	ruleJSON, err := json.Marshal(ruleParams)
 
-	if err1 != nil || err2 != nil {
+	if err != nil || r.inputErr != nil {
 		return false
 	}
 
-	return string(ruleJSON) == string(requestJSON)
+	return bytes.Equal(ruleJSON, r.inputJSON)
 }
 
 // parametersMatchPattern checks pattern-based matching
@@ -233,21 +253,33 @@ func FormatPatternDescription(pattern *RulePattern, toolName string) string {
 
 // CheckAlwaysAllowRules checks if a tool request matches any always-allow rules
 // Returns (matched bool, ruleDescription string)
+// The per-rule trace runs on every tool call, so it is only built when debug logging is on;
+// callers log the outcome.
 func CheckAlwaysAllowRules(rules []AlwaysAllowRule, toolName string, input map[string]interface{}) (bool, string) {
-	logging.Info("🔍 CheckAlwaysAllowRules: checking %d rules for tool %s", len(rules), toolName)
+	debug := logging.DebugEnabled()
+	if debug {
+		logging.Debug("🔍 CheckAlwaysAllowRules: checking %d rules for tool %s", len(rules), toolName)
+	}
+	request := ruleRequest{toolName: toolName, input: input}
 	for i, rule := range rules {
-		logging.Info("  Rule %d: tool=%s, mode=%s, desc=%s", i, rule.Tool, rule.MatchMode, rule.Description)
-		if rule.Pattern != nil {
-			logging.Info("    Pattern: cmd_prefix=%v, dir_path=%v, path_pattern=%v",
-				rule.Pattern.CommandPrefix, rule.Pattern.DirectoryPath, rule.Pattern.PathPattern)
+		if debug {
+			logging.Debug("  Rule %d: tool=%s, mode=%s, desc=%s", i, rule.Tool, rule.MatchMode, rule.Description)
+			if rule.Pattern != nil {
+				logging.Debug("    Pattern: cmd_prefix=%v, dir_path=%v, path_pattern=%v",
+					rule.Pattern.CommandPrefix, rule.Pattern.DirectoryPath, rule.Pattern.PathPattern)
+			}
 		}
-		if MatchesRule(rule, toolName, input) {
-			logging.Info("✅ AUTO-APPROVED via always-allow rule: %s (rule: %s, mode: %s)",
-				toolName, rule.Description, rule.MatchMode)
+		if request.matches(rule) {
+			if debug {
+				logging.Debug("✅ Matched always-allow rule: %s (rule: %s, mode: %s)",
+					toolName, rule.Description, rule.MatchMode)
+			}
 			return true, rule.Description
 		}
 	}
-	logging.Info("❌ No matching rule found")
+	if debug {
+		logging.Debug("❌ No matching rule found")
+	}
 	return false, ""
 }
 
@@ -0,0 +1,83 @@
+package agents
+
+import (
+	"testing"
+)
+
+// TestCheckAlwaysAllowRules tests matching a request against a list of rules
+func TestCheckAlwaysAllowRules(t *testing.T) {
+	rules := []AlwaysAllowRule{
+		{
+			Tool:        "Bash",
+			MatchMode:   RuleMatchExact,
+			Parameters:  map[string]interface{}{"command": "ls"},
+			Description: "exact ls",
+		},
+		{
+			Tool:        "Bash",
+			MatchMode:   RuleMatchExact,
+			Parameters:  map[string]interface{}{"command": "pwd"},
+			Description: "exact pwd",
+		},
+		{
+			Tool:        "Bash",
+			MatchMode:   RuleMatchPattern,
+			Pattern:     &RulePattern{CommandPrefix: stringPtr("git ")},
+			Description: "git commands",
+		},
+	}
+
+	tests := []struct {
+		name         string
+		toolName     string
+		input        map[string]interface{}
+		expectMatch  bool
+		expectedDesc string
+	}{
+		{
+			name:         "first exact rule",
+			toolName:     "Bash",
+			input:        map[string]interface{}{"command": "ls"},
+			expectMatch:  true,
+			expectedDesc: "exact ls",
+		},
+		{
+			name:         "later exact rule",
+			toolName:     "Bash",
+			input:        map[string]interface{}{"command": "pwd"},
+			expectMatch:  true,
+			expectedDesc: "exact pwd",
+		},
+		{
+			name:         "pattern rule after exact rules",
+			toolName:     "Bash",
+			input:        map[string]interface{}{"command": "git status"},
+			expectMatch:  true,
+			expectedDesc: "git commands",
+		},
+		{
+			name:        "no matching rule",
+			toolName:    "Bash",
+			input:       map[string]interface{}{"command": "rm -rf /tmp/x"},
+			expectMatch: false,
+		},
+		{
+			name:        "different tool",
+			toolName:    "Read",
+			input:       map[string]interface{}{"command": "ls"},
+			expectMatch: false,
+		},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			matched, desc := CheckAlwaysAllowRules(rules, tt.toolName, tt.input)
+			if matched != tt.expectMatch {
+				t.Errorf("CheckAlwaysAllowRules() matched = %v, want %v", matched, tt.expectMatch)
+			}
+			if desc != tt.expectedDesc {
+				t.Errorf("CheckAlwaysAllowRules() desc = %q, want %q", desc, tt.expectedDesc)
+			}
+		})
+	}
+}
@@ -4,8 +4,12 @@ import (
 	"context"
 	"database/sql"
 	"encoding/json"
+	"errors"
 	"fmt"
+	"strconv"
+	"strings"
 	"sync"
+	"sync/atomic"
 	"time"
 
 	"github.com/google/uuid"
@@ -25,11 +29,10 @@ type SessionManager struct {
 
 // PermissionRequest represents a pending permission request
 type PermissionRequest struct {
-	RequestID   string
-	ToolName    string
-	Input       map[string]interface{}
-	Context     types.ToolPermissionContext
-	ResponseChan chan PermissionResponse
+	RequestID string
+	ToolName  string
+	Input     map[string]interface{}
+	Context   types.ToolPermissionContext
 }
 
 // PermissionResponse represents the user's response to a permission request
@@ -46,19 +49,50 @@ type AgentSession struct {
 	ctx                    context.Context
 	cancel                 context.CancelFunc
 	responseChan           chan types.Message
-	permissionReqChan      chan *PermissionRequest  // Outgoing permission requests to frontend
-	permissionRespChan     chan *PermissionResponse // Incoming permission responses from frontend
-	pendingPermissions     map[string]chan PermissionResponse // Map of request_id -> response channel
+	permissionReqChan      chan PermissionRequest   // Outgoing permission requests to frontend, held by value in the channel buffer
+	pendingPermissions     map[uint64]chan PermissionResponse // Map of request ID -> response channel, created on first request
+	lastPermissionID       atomic.Uint64  // Last permission request ID handed out; IDs are only unique within the session
 	permMu                 sync.Mutex
-	permForwarderRunning   bool // Track if permission forwarder goroutine is running
-	permForwarderMu        sync.Mutex
-	wsConnected            bool // Track WebSocket connection state
-	wsConnMu               sync.Mutex
-	active                 bool
+	permForwarderRunning   atomic.Bool // Track if permission forwarder goroutine is running
+	wsConnected            atomic.Bool // Track WebSocket connection state
 	client                 *claude.Client // Streaming client for this session
 	mu                     sync.Mutex     // Protects client field
-	pendingReload          bool           // Track if we should reload after next message
-	pendingReloadMu        sync.Mutex     // Protects pendingReload field
+	pendingReload          atomic.Bool    // Track if we should reload after next message
+	promptMu               sync.Mutex     // Serializes prompts so a session never creates two clients
+	prompts                chan promptJob // Prompts waiting to be sent, in arrival order
+	promptSenderOnce       sync.Once      // Starts the prompt sender on the first queued prompt
+	promptsDone            chan struct{}  // Closed when the session shuts down, stopping the prompt sender
+	promptsMu              sync.Mutex     // Orders QueuePrompt against closing promptsDone
+}
+
+// maxQueuedPrompts bounds how many prompts may wait on a session before new ones are rejected as busy
+const maxQueuedPrompts = 4
+
+var (
+	errPromptQueueFull = errors.New("too many queued prompts")
+	errSessionEnded    = errors.New("session has ended")
+)
+
+// promptJob sends one queued prompt to the session's agent
+type promptJob func()
+
+// responseBufferSize is how many SDK messages can queue for the WebSocket writer,
+// letting the SDK reader run ahead of a slow client without unbounded buffering
+const responseBufferSize = 64
+
+// newAgentSession wraps a session with its context, channels and permission
+// bookkeeping so that every path putting a session in memory sets them up alike
+func newAgentSession(session Session) *AgentSession {
+	ctx, cancel := context.WithCancel(context.Background())
+	return &AgentSession{
+		Session:           session,
+		ctx:               ctx,
+		cancel:            cancel,
+		responseChan:      make(chan types.Message, responseBufferSize),
+		permissionReqChan: make(chan PermissionRequest, 10),
+		prompts:           make(chan promptJob, maxQueuedPrompts),
+		promptsDone:       make(chan struct{}),
+	}
 }
 
 // NewSessionManager creates a new session manager
@@ -97,36 +131,23 @@ func (sm *SessionManager) loadSessionsFromDB() error {
 
 	for _, sessionMeta := range sessions {
 		// Create an in-memory session object
-		session := &AgentSession{
-			Session: Session{
-				ID:              sessionMeta.ID,
-				CreatedAt:       sessionMeta.CreatedAt,
-				UpdatedAt:       sessionMeta.UpdatedAt,
-				Status:          SessionStatus(sessionMeta.Status),
-				MessageCount:    sessionMeta.MessageCount,
-				CostUSD:         sessionMeta.CostUSD,
-				NumTurns:        sessionMeta.NumTurns,
-				DurationMS:      sessionMeta.DurationMS,
-				ModelName:       sessionMeta.ModelName,
-				ClaudeSessionID: sessionMeta.ClaudeSessionID,
-			},
-			active: true,
-		}
+		session := newAgentSession(Session{
+			ID:              sessionMeta.ID,
+			CreatedAt:       sessionMeta.CreatedAt,
+			UpdatedAt:       sessionMeta.UpdatedAt,
+			Status:          SessionStatus(sessionMeta.Status),
+			MessageCount:    sessionMeta.MessageCount,
+			CostUSD:         sessionMeta.CostUSD,
+			NumTurns:        sessionMeta.NumTurns,
+			DurationMS:      sessionMeta.DurationMS,
+			ModelName:       sessionMeta.ModelName,
+			ClaudeSessionID: sessionMeta.ClaudeSessionID,
+		})
 
 		if sessionMeta.ErrorMessage != "" {
 			session.ErrorMessage = &sessionMeta.ErrorMessage
 		}
 
-		// Create context for session
-		session.ctx, session.cancel = context.WithCancel(context.Background())
-
-		// Create channels
-		session.responseChan = make(chan types.Message, 10)
-		session.permissionReqChan = make(chan *PermissionRequest, 10)
-		session.permissionRespChan = make(chan *PermissionResponse, 10)
-		session.pendingPermissions = make(map[string]chan PermissionResponse)
-		session.wsConnected = false // Will be set to true when WebSocket connects
-
 		sm.sessions[sessionMeta.ID] = session
 
 		logging.Info("Loaded session from database: %s (status: %s, messages: %d)",
@@ -215,38 +236,25 @@ func (sm *SessionManager) CreateSession(sessionID uuid.UUID, options SessionOpti
 		}
 
 		// Restore session to memory with data from database
-		session := &AgentSession{
-			Session: Session{
-				ID:              existingMeta.ID,
-				CreatedAt:       existingMeta.CreatedAt,
-				UpdatedAt:       time.Now(), // Update to current time
-				Status:          SessionStatus(existingMeta.Status),
-				Options:         restoredOptions, // Use restored options from database
-				MessageCount:    existingMeta.MessageCount,
-				CostUSD:         existingMeta.CostUSD,
-				NumTurns:        existingMeta.NumTurns,
-				DurationMS:      existingMeta.DurationMS,
-				ModelName:       existingMeta.ModelName,
-				ClaudeSessionID: existingMeta.ClaudeSessionID, // CRITICAL: Restore Claude session ID
-				GitBranch:       gitBranch,
-			},
-			active: true,
-		}
+		session := newAgentSession(Session{
+			ID:              existingMeta.ID,
+			CreatedAt:       existingMeta.CreatedAt,
+			UpdatedAt:       time.Now(), // Update to current time
+			Status:          SessionStatus(existingMeta.Status),
+			Options:         restoredOptions, // Use restored options from database
+			MessageCount:    existingMeta.MessageCount,
+			CostUSD:         existingMeta.CostUSD,
+			NumTurns:        existingMeta.NumTurns,
+			DurationMS:      existingMeta.DurationMS,
+			ModelName:       existingMeta.ModelName,
+			ClaudeSessionID: existingMeta.ClaudeSessionID, // CRITICAL: Restore Claude session ID
+			GitBranch:       gitBranch,
+		})
 
 		if existingMeta.ErrorMessage != "" {
 			session.ErrorMessage = &existingMeta.ErrorMessage
 		}
 
-		// Create context for restored session
-		session.ctx, session.cancel = context.WithCancel(context.Background())
-
-		// Create response and permission channels
-		session.responseChan = make(chan types.Message, 10)
-		session.permissionReqChan = make(chan *PermissionRequest, 10)
-		session.permissionRespChan = make(chan *PermissionResponse, 10)
-		session.pendingPermissions = make(map[string]chan PermissionResponse)
-		session.wsConnected = false // Will be set to true when WebSocket connects
-
 		sm.sessions[sessionID] = session
 
 		logging.Info("Session restored from database: %s (total sessions: %d)", sessionID, len(sm.sessions))
@@ -263,32 +271,19 @@ func (sm *SessionManager) CreateSession(sessionID uuid.UUID, options SessionOpti
 		gitBranch = GetGitBranch(*options.WorkingDirectory)
 	}
 
-	session := &AgentSession{
-		Session: Session{
-			ID:           sessionID,
-			CreatedAt:    now,
-			UpdatedAt:    now,
-			Status:       SessionStatusIdle,
-			Options:      options,
-			MessageCount: 0,
-			CostUSD:      0.0,
-			NumTurns:     0,
-			DurationMS:   0,
-			ModelName:    sm.config.Model,
-			GitBranch:    gitBranch,
-		},
-		active: true,
-	}
-
-	// Create context for session
-	session.ctx, session.cancel = context.WithCancel(context.Background())
-
-	// Create response and permission channels
-	session.responseChan = make(chan types.Message, 10)
-	session.permissionReqChan = make(chan *PermissionRequest, 10)
-	session.permissionRespChan = make(chan *PermissionResponse, 10)
-	session.pendingPermissions = make(map[string]chan PermissionResponse)
-	session.wsConnected = false // Will be set to true when WebSocket connects
+	session := newAgentSession(Session{
+		ID:           sessionID,
+		CreatedAt:    now,
+		UpdatedAt:    now,
+		Status:       SessionStatusIdle,
+		Options:      options,
+		MessageCount: 0,
+		CostUSD:      0.0,
+		NumTurns:     0,
+		DurationMS:   0,
+		ModelName:    sm.config.Model,
+		GitBranch:    gitBranch,
+	})
 
 	sm.sessions[sessionID] = session
 
@@ -374,6 +369,13 @@ func (sm *SessionManager) ListSessions() []Session {
 	return sessions
 }
 
+// SessionCount returns the number of sessions in memory without copying them
+func (sm *SessionManager) SessionCount() int {
+	sm.mu.RLock()
+	defer sm.mu.RUnlock()
+	return len(sm.sessions)
+}
+
 // ListAllSessions returns all sessions (active and ended) from database
 func (sm *SessionManager) ListAllSessions(statusFilter string) ([]Session, error) {
 	sessionMetas, err := sm.storage.ListSessions(statusFilter)
@@ -430,17 +432,17 @@ func (sm *SessionManager) InterruptSession(sessionID uuid.UUID) error {
 
 	logging.Info("Interrupting session %s (status: %s)", sessionID, session.Status)
 
+	// Prompts queued behind the interrupted one were sent before the user pressed stop
+	if dropped := session.dropQueuedPrompts(); dropped > 0 {
+		logging.Info("Dropped %d queued prompts for interrupted session %s", dropped, sessionID)
+	}
+
 	// Close the streaming client BEFORE cancelling context
 	// This ensures the client can clean up properly
-	session.mu.Lock()
-	if session.client != nil {
-		logging.Info("Closing client for interrupted session %s", sessionID)
-		// Use a background context for closing, not the about-to-be-cancelled session context
-		closeCtx := context.Background()
-		session.client.Close(closeCtx)
-		session.client = nil
+	// Use a background context for closing, not the about-to-be-cancelled session context
+	if session.closeClient(context.Background()) {
+		logging.Info("Closed client for interrupted session %s", sessionID)
 	}
-	session.mu.Unlock()
 
 	// Now cancel current context (this will interrupt any ongoing agent operations)
 	if session.cancel != nil {
@@ -477,13 +479,9 @@ func (sm *SessionManager) ReloadSessionSettings(sessionID uuid.UUID) error {
 	logging.Info("🔄 Reloading settings for session %s (closing and recreating client)", sessionID)
 
 	// Close existing client if exists
-	session.mu.Lock()
-	if session.client != nil {
-		session.client.Close(session.ctx)
-		session.client = nil
+	if session.closeClient(session.ctx) {
 		logging.Info("  ✅ Closed existing client")
 	}
-	session.mu.Unlock()
 
 	// The next SendPrompt/SendPromptWithContent will automatically create a new client
 	// with fresh settings loaded from disk (settings.local.json)
@@ -495,30 +493,15 @@ func (sm *SessionManager) ReloadSessionSettings(sessionID uuid.UUID) error {
 // EndSession ends a session
 func (sm *SessionManager) EndSession(sessionID uuid.UUID) error {
 	sm.mu.Lock()
-	defer sm.mu.Unlock()
-
 	session, exists := sm.sessions[sessionID]
 	if !exists {
+		sm.mu.Unlock()
 		return fmt.Errorf("session not found: %s", sessionID)
 	}
 
-	// Close streaming client if exists
-	session.mu.Lock()
-	if session.client != nil {
-		session.client.Close(session.ctx)
-		session.client = nil
-	}
-	session.mu.Unlock()
-
-	// Cancel context (will stop any ongoing queries)
-	if session.cancel != nil {
-		session.cancel()
-	}
-
 	// Update status
 	session.Status = SessionStatusEnded
 	session.UpdatedAt = time.Now()
-	session.active = false
 
 	// Calculate duration
 	session.DurationMS = time.Since(session.CreatedAt).Milliseconds()
@@ -533,6 +516,11 @@ func (sm *SessionManager) EndSession(sessionID uuid.UUID) error {
 
 	logging.Info("Session ended: %s (duration: %dms, messages: %d)",
 		sessionID, session.DurationMS, session.MessageCount)
+	sm.mu.Unlock()
+
+	// Close streaming client and cancel context (will stop any ongoing queries).
+	// Closing the client waits for the CLI process, so it happens outside the lock.
+	session.shutdown()
 
 	return nil
 }
@@ -540,29 +528,21 @@ func (sm *SessionManager) EndSession(sessionID uuid.UUID) error {
 // DeleteSession deletes a session from the database
 func (sm *SessionManager) DeleteSession(sessionID uuid.UUID) error {
 	sm.mu.Lock()
-	defer sm.mu.Unlock()
-
-	// If session is still active, end it first
-	if session, exists := sm.sessions[sessionID]; exists {
-		// Close streaming client if exists
-		session.mu.Lock()
-		if session.client != nil {
-			session.client.Close(session.ctx)
-			session.client = nil
-		}
-		session.mu.Unlock()
-
-		// Cancel context
-		if session.cancel != nil {
-			session.cancel()
-		}
-
+	session, exists := sm.sessions[sessionID]
+	if exists {
 		// Remove from active sessions
 		delete(sm.sessions, sessionID)
 	}
 
 	// Delete from database
-	if err := sm.storage.DeleteSession(sessionID); err != nil {
+	err := sm.storage.DeleteSession(sessionID)
+	sm.mu.Unlock()
+
+	// If session was still active, end it outside the lock
+	if exists {
+		session.shutdown()
+	}
+	if err != nil {
 		return fmt.Errorf("failed to delete session from storage: %w", err)
 	}
 
@@ -573,62 +553,64 @@ func (sm *SessionManager) DeleteSession(sessionID uuid.UUID) error {
 // EndAllSessions ends all active sessions
 func (sm *SessionManager) EndAllSessions() int {
 	sm.mu.Lock()
-	defer sm.mu.Unlock()
+	sessions := sm.takeAllSessionsLocked()
+	sm.mu.Unlock()
 
-	count := 0
-	for sessionID, session := range sm.sessions {
-		if session.cancel != nil {
-			session.cancel()
+	// Shut the sessions down outside the lock so other requests aren't blocked
+	shutdownSessions(sessions)
+
+	return len(sessions)
+}
+
+// shutdownSessions closes the clients of the given sessions in parallel and
+// cancels their contexts, so the total time is that of the slowest client
+// rather than the sum of all of them
+func shutdownSessions(sessions []*AgentSession) {
+	var wg sync.WaitGroup
+	for _, session := range sessions {
+		// Most sessions, such as those restored at startup, never started a client;
+		// they have nothing to wait for and are shut down without a goroutine
+		if !session.hasClient() {
+			session.shutdown()
+			continue
 		}
-		delete(sm.sessions, sessionID)
-		count++
+		wg.Add(1)
+		go func(session *AgentSession) {
+			defer wg.Done()
+			session.shutdown()
+		}(session)
 	}
+	wg.Wait()
+}
 
-	return count
+// takeAllSessionsLocked removes every session from the active map and returns them.
+// sm.mu must be held.
+func (sm *SessionManager) takeAllSessionsLocked() []*AgentSession {
+	sessions := make([]*AgentSession, 0, len(sm.sessions))
+	for sessionID, session := range sm.sessions {
+		sessions = append(sessions, session)
+		delete(sm.sessions, sessionID)
+	}
+	return sessions
 }
 
 // DeleteAllSessions deletes all sessions from the database
 func (sm *SessionManager) DeleteAllSessions() (int, error) {
 	sm.mu.Lock()
-	defer sm.mu.Unlock()
-
-	// First, end all active sessions
-	for sessionID, session := range sm.sessions {
-		// Close streaming client if exists
-		session.mu.Lock()
-		if session.client != nil {
-			session.client.Close(session.ctx)
-			session.client = nil
-		}
-		session.mu.Unlock()
-
-		// Cancel context
-		if session.cancel != nil {
-			session.cancel()
-		}
+	sessions := sm.takeAllSessionsLocked()
+	sm.mu.Unlock()
 
-		// Remove from active sessions
-		delete(sm.sessions, sessionID)
-	}
+	// First, end all active sessions, outside the lock like EndAllSessions
+	shutdownSessions(sessions)
 
-	// Get all sessions from database to count them
-	allSessions, err := sm.storage.ListSessions("all")
+	// Delete every row at once rather than listing and deleting them one statement at a time
+	count, err := sm.storage.DeleteAllSessions()
 	if err != nil {
-		return 0, fmt.Errorf("failed to list sessions: %w", err)
-	}
-
-	count := 0
-	// Delete each session from database
-	for _, session := range allSessions {
-		if err := sm.storage.DeleteSession(session.ID); err != nil {
-			logging.Error("Failed to delete session %s: %v", session.ID, err)
-			continue
-		}
-		count++
+		return 0, err
 	}
 
 	logging.Info("Deleted %d sessions from database", count)
-	return count, nil
+	return int(count), nil
 }
 
 // SendPrompt sends a prompt to an agent session using claude.Query
@@ -640,6 +622,10 @@ func (sm *SessionManager) SendPrompt(sessionID uuid.UUID, prompt string) error {
 		return err
 	}
 
+	// Queued prompts run one at a time, but SendPrompt is also called directly; never run two at once
+	session.promptMu.Lock()
+	defer session.promptMu.Unlock()
+
 	// Update session status
 	sm.mu.Lock()
 	session.Status = SessionStatusProcessing
@@ -655,117 +641,160 @@ func (sm *SessionManager) SendPrompt(sessionID uuid.UUID, prompt string) error {
 
 	logging.Debug("SendPrompt: Executing query for session %s", sessionID)
 
-	// Determine permission mode
-	permMode := types.PermissionModeDefault
-	if session.Options.PermissionMode != nil {
-		switch *session.Options.PermissionMode {
-		case "allow-all":
-			permMode = types.PermissionModeBypassPermissions
-		case "read-only":
-			permMode = types.PermissionModeDefault
-		default:
-			permMode = types.PermissionModeDefault
-		}
-	}
-
-	// Build SDK options
-	logging.Debug("SendPrompt: Building SDK options (model: %s, permMode: %v, verbose: %v)", sm.config.Model, permMode, sm.config.Verbose)
+	// Reuse existing client if available (preserves conversation context)
+	// Otherwise create a new client. SDK options are only built when a new
+	// client is needed, so follow-up prompts skip that setup entirely.
+	session.mu.Lock()
+	client := session.client
+	session.mu.Unlock()
 
-	// Create permission callback
-	canUseTool := func(ctx context.Context, toolName string, input map[string]interface{}, permCtx types.ToolPermissionContext) (interface{}, error) {
-		requestID := uuid.New().String()
-		logging.Info("🔐🔐🔐 CALLBACK INVOKED: tool=%s, requestID=%s, input=%+v", toolName, requestID, input)
+	if client == nil {
+		// Create permission callback
+		bypass := bypassesPermissions(session.Options)
+		canUseTool := func(ctx context.Context, toolName string, input map[string]interface{}, permCtx types.ToolPermissionContext) (interface{}, error) {
+			if bypass || neverNeedsPermission(toolName) {
+				return types.PermissionResultAllow{}, nil
+			}
 
-		// Check if WebSocket is connected before proceeding
-		if !session.IsWebSocketConnected() {
-			logging.Warning("Permission request rejected: WebSocket not connected (tool=%s, requestID=%s)", toolName, requestID)
-			return types.PermissionResultDeny{Message: "WebSocket connection lost - cannot request permission"}, nil
-		}
+			permissionID := session.nextPermissionID()
+			requestID := strconv.FormatUint(permissionID, 10)
+			logging.Info("🔐🔐🔐 CALLBACK INVOKED: tool=%s, requestID=%s", toolName, requestID)
+			if logging.DebugEnabled() {
+				logging.Debug("Permission request %s input: %+v", requestID, input)
+			}
 
-		// Create response channel for this specific request
-		responseChan := make(chan PermissionResponse, 1)
+			// Check if WebSocket is connected before proceeding
+			if !session.IsWebSocketConnected() {
+				logging.Warning("Permission request rejected: WebSocket not connected (tool=%s, requestID=%s)", toolName, requestID)
+				return types.PermissionResultDeny{Message: "WebSocket connection lost - cannot request permission"}, nil
+			}
 
-		// Store in pending permissions map
-		session.permMu.Lock()
-		session.pendingPermissions[requestID] = responseChan
-		session.permMu.Unlock()
+			// Create response channel for this specific request; clean up when done
+			responseChan := session.addPermission(permissionID)
+			defer session.removePermission(permissionID)
 
-		// Clean up when done
-		defer func() {
-			session.permMu.Lock()
-			delete(session.pendingPermissions, requestID)
-			session.permMu.Unlock()
-		}()
+			// Send permission request to frontend via channel
+			permReq := PermissionRequest{
+				RequestID: requestID,
+				ToolName:  toolName,
+				Input:     input,
+				Context:   permCtx,
+			}
 
-		// Send permission request to frontend via channel
-		permReq := &PermissionRequest{
-			RequestID:    requestID,
-			ToolName:     toolName,
-			Input:        input,
-			Context:      permCtx,
-			ResponseChan: responseChan,
-		}
+			logging.Info("⏳ Sending permission request to channel...")
 
-		logging.Info("⏳ Sending permission request to channel...")
+			// One timer covers both the send and the wait for the user's response
+			timeout := time.NewTimer(permissionSendTimeout)
+			defer timeout.Stop()
 
-		select {
-		case session.permissionReqChan <- permReq:
-			logging.Info("✅ Permission request sent to channel successfully: %s", requestID)
-		case <-ctx.Done():
-			return nil, ctx.Err()
-		case <-session.ctx.Done():
-			logging.Warning("Session context cancelled while sending permission request")
-			return types.PermissionResultDeny{Message: "Session ended"}, nil
-		case <-time.After(5 * time.Second):
-			logging.Warning("Timeout sending permission request to frontend")
-			return types.PermissionResultDeny{Message: "Permission request timeout"}, nil
-		}
+			select {
+			case session.permissionReqChan <- permReq:
+				logging.Info("✅ Permission request sent to channel successfully: %s", requestID)
+			case <-ctx.Done():
+				return nil, ctx.Err()
+			case <-session.ctx.Done():
+				logging.Warning("Session context cancelled while sending permission request")
+				return types.PermissionResultDeny{Message: "Session ended"}, nil
+			case <-timeout.C:
+				logging.Warning("Timeout sending permission request to frontend")
+				return types.PermissionResultDeny{Message: "Permission request timeout"}, nil
+			}
 
-		// Wait for response from frontend with reduced timeout (60 seconds instead of 5 minutes)
-		select {
-		case response := <-responseChan:
-			logging.Info("Permission response received: approved=%v, requestID=%s", response.Approved, requestID)
-			if response.Approved {
-				result := types.PermissionResultAllow{
-					Behavior: "allow",
-				}
-				if response.UpdatedInput != nil {
-					result.UpdatedInput = response.UpdatedInput
-				}
-				if len(response.UpdatedPermissions) > 0 {
-					result.UpdatedPermissions = response.UpdatedPermissions
-					logging.Info("✨ Including %d permission update(s) in approval response", len(response.UpdatedPermissions))
+			// Wait for response from frontend with reduced timeout (60 seconds instead of 5 minutes)
+			timeout.Reset(permissionResponseTimeout)
+			select {
+			case response := <-responseChan:
+				logging.Info("Permission response received: approved=%v, requestID=%s", response.Approved, requestID)
+				if response.Approved {
+					result := types.PermissionResultAllow{
+						Behavior: "allow",
+					}
+					if response.UpdatedInput != nil {
+						result.UpdatedInput = response.UpdatedInput
+					}
+					if len(response.UpdatedPermissions) > 0 {
+						result.UpdatedPermissions = response.UpdatedPermissions
+						logging.Info("✨ Including %d permission update(s) in approval response", len(response.UpdatedPermissions))
+					}
+					return result, nil
+				} else {
+					return types.PermissionResultDeny{
+						Behavior: "deny",
+						Message:  response.DenyMessage,
+					}, nil
 				}
-				return result, nil
-			} else {
-				return types.PermissionResultDeny{
-					Behavior: "deny",
-					Message:  response.DenyMessage,
-				}, nil
+			case <-ctx.Done():
+				return nil, ctx.Err()
+			case <-session.ctx.Done():
+				logging.Warning("Session context cancelled while waiting for permission response")
+				return types.PermissionResultDeny{Message: "Session ended"}, nil
+			case <-timeout.C:
+				logging.Warning("Timeout waiting for permission response from user (tool=%s, requestID=%s)", toolName, requestID)
+				return types.PermissionResultDeny{Message: "Permission request timed out after 60 seconds"}, nil
 			}
-		case <-ctx.Done():
-			return nil, ctx.Err()
-		case <-session.ctx.Done():
-			logging.Warning("Session context cancelled while waiting for permission response")
-			return types.PermissionResultDeny{Message: "Session ended"}, nil
-		case <-time.After(60 * time.Second): // Reduced from 5 minutes to 60 seconds
-			logging.Warning("Timeout waiting for permission response from user (tool=%s, requestID=%s)", toolName, requestID)
-			return types.PermissionResultDeny{Message: "Permission request timed out after 60 seconds"}, nil
 		}
+
+		client, err = sm.createClient(session, canUseTool)
+		if err != nil {
+			return err
+		}
+	} else {
+		logging.Info("SendPrompt: Reusing existing client for session %s (preserves conversation context)", sessionID)
 	}
 
-	// Define available tools (Claude Code standard tools)
-	allowedTools := []string{
-		"Bash", "Read", "Write", "Edit", "Glob", "Grep",
-		"WebSearch", "WebFetch",
+	// Send the query
+	if err := client.Query(session.ctx, prompt); err != nil {
+		logging.Error("SendPrompt: Failed to send query: %v", err)
+		sm.mu.Lock()
+		errMsg := err.Error()
+		session.ErrorMessage = &errMsg
+		session.Status = SessionStatusError
+		sm.mu.Unlock()
+		return fmt.Errorf("failed to send query: %w", err)
 	}
 
+	// Get response channel
+	messages := client.ReceiveResponse(session.ctx)
+	logging.Info("SendPrompt: Client connected and query sent, starting response stream")
+	logging.Info("Streaming client created for session %s, starting response stream", sessionID)
+
+	go sm.receiveQueryResponses(session, messages)
+
+	logging.Debug("SendPrompt: Completed successfully for session %s", sessionID)
+	return nil
+}
+
+// defaultAllowedTools are the Claude Code standard tools, shared by every
+// session that doesn't specify its own tool list
+var defaultAllowedTools = []string{
+	"Bash", "Read", "Write", "Edit", "Glob", "Grep",
+	"WebSearch", "WebFetch",
+}
+
+// createClient builds the SDK options for a session and connects a new client.
+// The client is stored on the session so that later prompts can reuse it.
+func (sm *SessionManager) createClient(session *AgentSession, canUseTool types.CanUseToolFunc) (*claude.Client, error) {
+	sessionID := session.ID
+
+	// Determine permission mode
+	permMode := types.PermissionModeDefault
+	if bypassesPermissions(session.Options) {
+		permMode = types.PermissionModeBypassPermissions
+	}
+
+	// Build SDK options
+	logging.Debug("createClient: Building SDK options (model: %s, permMode: %v, verbose: %v)", sm.config.Model, permMode, sm.config.Verbose)
+
+	// Define available tools (Claude Code standard tools). The shared default list is
+	// used as-is, never copied; tools are not passed to the SDK, so the list is only logged.
+	allowedTools := defaultAllowedTools
+
 	// If session options specify tools, use those instead
 	if len(session.Options.Tools) > 0 {
 		allowedTools = session.Options.Tools
 	}
 
-	logging.Info("Allowed tools for session %s: %v", sessionID, allowedTools)
+	logging.Debug("Allowed tools for session %s: %v", sessionID, allowedTools)
 	logging.Info("Permission mode: %v", permMode)
 
 	// Determine model to use: session-specific > config default
@@ -824,89 +853,64 @@ func (sm *SessionManager) SendPrompt(sessionID uuid.UUID, prompt string) error {
 
 	// Set working directory if provided
 	if session.Options.WorkingDirectory != nil && *session.Options.WorkingDirectory != "" {
-		logging.Debug("SendPrompt: Setting working directory: %s", *session.Options.WorkingDirectory)
+		logging.Debug("createClient: Setting working directory: %s", *session.Options.WorkingDirectory)
 		opts = opts.WithCWD(*session.Options.WorkingDirectory)
 	}
 
 	// Resume existing conversation if Claude session ID exists
 	if session.ClaudeSessionID != "" {
-		logging.Debug("SendPrompt: Resuming conversation from Claude session: %s", session.ClaudeSessionID)
+		logging.Debug("createClient: Resuming conversation from Claude session: %s", session.ClaudeSessionID)
 		opts = opts.WithResume(session.ClaudeSessionID)
 	}
 
-	// Reuse existing client if available (preserves conversation context)
-	// Otherwise create a new client
 	session.mu.Lock()
-	client := session.client
 	hasClaudeSession := session.ClaudeSessionID != ""
 	session.mu.Unlock()
 
-	if client == nil {
-		// Execute query using streaming mode (required for permission callbacks via control protocol)
-		if hasClaudeSession {
-			logging.Info("SendPrompt: Creating new client for restored session %s (Claude session: %s)", sessionID, session.ClaudeSessionID)
-		} else {
-			logging.Debug("SendPrompt: Creating streaming client...")
-		}
-		logging.Debug("SendPrompt: API Key length: %d", len(sm.config.APIKey))
-		logging.Debug("Creating streaming client for session %s with options: model=%s, permMode=%v",
-			sessionID, sm.config.Model, permMode)
-
-		newClient, err := claude.NewClient(session.ctx, opts)
-		if err != nil {
-			logging.Error("SendPrompt: Failed to create client: %v", err)
-			sm.mu.Lock()
-			errMsg := err.Error()
-			session.ErrorMessage = &errMsg
-			session.Status = SessionStatusError
-			sm.mu.Unlock()
-			return fmt.Errorf("failed to create client: %w", err)
-		}
-
-		// Connect to Claude
-		if err := newClient.Connect(session.ctx); err != nil {
-			logging.Error("SendPrompt: Failed to connect client: %v", err)
-			sm.mu.Lock()
-			errMsg := err.Error()
-			session.ErrorMessage = &errMsg
-			session.Status = SessionStatusError
-			sm.mu.Unlock()
-			return fmt.Errorf("failed to connect client: %w", err)
-		}
-
-		// Store client reference
-		session.mu.Lock()
-		session.client = newClient
-		session.mu.Unlock()
-		client = newClient
+	// Execute query using streaming mode (required for permission callbacks via control protocol)
+	if hasClaudeSession {
+		logging.Info("createClient: Creating new client for restored session %s (Claude session: %s)", sessionID, session.ClaudeSessionID)
 	} else {
-		logging.Info("SendPrompt: Reusing existing client for session %s (preserves conversation context)", sessionID)
+		logging.Debug("createClient: Creating streaming client...")
 	}
+	logging.Debug("createClient: API Key length: %d", len(sm.config.APIKey))
+	logging.Debug("Creating streaming client for session %s with options: model=%s, permMode=%v",
+		sessionID, sm.config.Model, permMode)
 
-	// Send the query
-	if err := client.Query(session.ctx, prompt); err != nil {
-		logging.Error("SendPrompt: Failed to send query: %v", err)
+	newClient, err := claude.NewClient(session.ctx, opts)
+	if err != nil {
+		logging.Error("createClient: Failed to create client: %v", err)
 		sm.mu.Lock()
 		errMsg := err.Error()
 		session.ErrorMessage = &errMsg
 		session.Status = SessionStatusError
 		sm.mu.Unlock()
-		return fmt.Errorf("failed to send query: %w", err)
+		return nil, fmt.Errorf("failed to create client: %w", err)
 	}
 
-	// Get response channel
-	messages := client.ReceiveResponse(session.ctx)
-	logging.Info("SendPrompt: Client connected and query sent, starting response stream")
-	logging.Info("Streaming client created for session %s, starting response stream", sessionID)
+	// Connect to Claude
+	if err := newClient.Connect(session.ctx); err != nil {
+		logging.Error("createClient: Failed to connect client: %v", err)
+		sm.mu.Lock()
+		errMsg := err.Error()
+		session.ErrorMessage = &errMsg
+		session.Status = SessionStatusError
+		sm.mu.Unlock()
+		return nil, fmt.Errorf("failed to connect client: %w", err)
+	}
 
-	go sm.receiveQueryResponses(session, messages)
+	// Store client reference
+	session.mu.Lock()
+	session.client = newClient
+	session.mu.Unlock()
 
-	logging.Debug("SendPrompt: Completed successfully for session %s", sessionID)
-	return nil
+	return newClient, nil
 }
 
 // SendPromptWithContent sends structured content (text + images) to an agent session
-// This method bypasses the SDK's Query method to support image content blocks
+// This method bypasses the SDK's Query method to support image content blocks.
+// Prompts from a client should be queued with QueuePrompt, which orders content
+// prompts together with text prompts sent through SendPrompt.
 func (sm *SessionManager) SendPromptWithContent(sessionID uuid.UUID, content []ContentBlock) error {
 	logging.Debug("SendPromptWithContent: Getting session %s", sessionID)
 	session, err := sm.GetSession(sessionID)
@@ -915,6 +919,10 @@ func (sm *SessionManager) SendPromptWithContent(sessionID uuid.UUID, content []C
 		return err
 	}
 
+	// Queued prompts run one at a time, but SendPrompt is also called directly; never run two at once
+	session.promptMu.Lock()
+	defer session.promptMu.Unlock()
+
 	// Update session status
 	sm.mu.Lock()
 	session.Status = SessionStatusProcessing
@@ -944,116 +952,15 @@ func (sm *SessionManager) SendPromptWithContent(sessionID uuid.UUID, content []C
 
 	// If no client exists, we need to create one first
 	if client == nil {
-		// Create client using the same logic as SendPrompt
-		// For brevity, we'll call SendPrompt with an empty string to initialize the client
-		// then send our structured content
 		logging.Info("SendPromptWithContent: No client exists, initializing session first")
 
-		// We need to create the client but not send a query yet
-		// Let's replicate the client creation logic here
-		permMode := types.PermissionModeDefault
-		if session.Options.PermissionMode != nil {
-			switch *session.Options.PermissionMode {
-			case "allow-all":
-				permMode = types.PermissionModeBypassPermissions
-			case "read-only":
-				permMode = types.PermissionModeDefault
-			default:
-				permMode = types.PermissionModeDefault
-			}
-		}
-
-		// Create permission callback (same as SendPrompt)
-		canUseTool := sm.createPermissionCallback(session)
-
-		// Determine model to use
-		modelToUse := sm.config.Model
-		if session.Options.Model != nil && *session.Options.Model != "" {
-			modelToUse = *session.Options.Model
-		}
-
-		opts := types.NewClaudeAgentOptions().
-			WithModel(modelToUse).
-			WithPermissionMode(permMode).
-			WithVerbose(sm.config.Verbose).
-			WithCanUseTool(canUseTool).
-			WithSystemPrompt("code")
-
-		// Set other options (base URL, API key, working directory, resume)
-		if session.Options.BaseURL != nil && *session.Options.BaseURL != "" {
-			opts = opts.WithBaseURL(*session.Options.BaseURL)
-		}
-
-		apiKeyToUse := sm.config.APIKey
-		if session.Options.Provider != nil && *session.Options.Provider != "" {
-			var apiKey string
-			err := sm.db.QueryRow("SELECT api_key FROM providers WHERE provider_id = ? LIMIT 1", *session.Options.Provider).Scan(&apiKey)
-			if err == nil && apiKey != "" {
-				apiKeyToUse = apiKey
-			}
-		}
-		if session.Options.APIKey != nil && *session.Options.APIKey != "" {
-			apiKeyToUse = *session.Options.APIKey
-		}
-		if apiKeyToUse != "" {
-			opts = opts.WithEnvVar("ANTHROPIC_API_KEY", apiKeyToUse)
-		}
-
-		if session.Options.WorkingDirectory != nil && *session.Options.WorkingDirectory != "" {
-			opts = opts.WithCWD(*session.Options.WorkingDirectory)
-		}
-
-		if session.ClaudeSessionID != "" {
-			opts = opts.WithResume(session.ClaudeSessionID)
-		}
-
-		// Create new client
-		newClient, err := claude.NewClient(session.ctx, opts)
+		client, err = sm.createClient(session, sm.createPermissionCallback(session))
 		if err != nil {
-			logging.Error("SendPromptWithContent: Failed to create client: %v", err)
-			sm.mu.Lock()
-			errMsg := err.Error()
-			session.ErrorMessage = &errMsg
-			session.Status = SessionStatusError
-			sm.mu.Unlock()
-			return fmt.Errorf("failed to create client: %w", err)
+			return err
 		}
-
-		if err := newClient.Connect(session.ctx); err != nil {
-			logging.Error("SendPromptWithContent: Failed to connect client: %v", err)
-			sm.mu.Lock()
-			errMsg := err.Error()
-			session.ErrorMessage = &errMsg
-			session.Status = SessionStatusError
-			sm.mu.Unlock()
-			return fmt.Errorf("failed to connect client: %w", err)
-		}
-
-		session.mu.Lock()
-		session.client = newClient
-		session.mu.Unlock()
-		client = newClient
 	}
 
-	// Convert ContentBlock array to interface{} for SDK
-	// The SDK's QueryWithContent accepts interface{} which can be a content array
-	contentInterface := make([]interface{}, len(content))
-	for i, block := range content {
-		blockMap := make(map[string]interface{})
-		blockMap["type"] = block.Type
-
-		if block.Type == "text" {
-			blockMap["text"] = block.Text
-		} else if block.Type == "image" && block.Source != nil {
-			blockMap["source"] = map[string]interface{}{
-				"type":       block.Source.Type,
-				"media_type": block.Source.MediaType,
-				"data":       block.Source.Data,
-			}
-		}
-
-		contentInterface[i] = blockMap
-	}
+	contentInterface := queryContent(content)
 
 	logging.Info("SendPromptWithContent: Sending %d content blocks to Claude CLI", len(content))
 
@@ -1078,6 +985,33 @@ func (sm *SessionManager) SendPromptWithContent(sessionID uuid.UUID, content []C
 	return nil
 }
 
+// queryContent converts content blocks to the generic form the SDK's QueryWithContent accepts.
+// Each block map is built at its final size in one literal; image data is referenced, not copied.
+func queryContent(content []ContentBlock) []interface{} {
+	contentInterface := make([]interface{}, len(content))
+	for i, block := range content {
+		switch {
+		case block.Type == "text":
+			contentInterface[i] = map[string]interface{}{
+				"type": block.Type,
+				"text": block.Text,
+			}
+		case block.Type == "image" && block.Source != nil:
+			contentInterface[i] = map[string]interface{}{
+				"type": block.Type,
+				"source": map[string]interface{}{
+					"type":       block.Source.Type,
+					"media_type": block.Source.MediaType,
+					"data":       block.Source.Data,
+				},
+			}
+		default:
+			contentInterface[i] = map[string]interface{}{"type": block.Type}
+		}
+	}
+	return contentInterface
+}
+
 // RestartClient closes the current client and forces a new client to be created
 // on the next SendPrompt. This is useful after updating permissions in settings.local.json.
 func (sm *SessionManager) RestartClient(sessionID uuid.UUID) error {
@@ -1089,17 +1023,8 @@ func (sm *SessionManager) RestartClient(sessionID uuid.UUID) error {
 		return fmt.Errorf("session not found: %s", sessionID)
 	}
 
-	session.mu.Lock()
-	defer session.mu.Unlock()
-
-	if session.client != nil {
-		logging.Info("Closing existing client for session %s to reload permissions", sessionID)
-		// Close the existing client
-		if err := session.client.Close(session.ctx); err != nil {
-			logging.Warning("Error closing client: %v", err)
-		}
-		// Clear the client reference so a new one will be created
-		session.client = nil
+	// Close the existing client and clear the reference so a new one will be created
+	if session.closeClient(session.ctx) {
 		logging.Info("✅ Client restarted for session %s - permissions will be reloaded", sessionID)
 	} else {
 		logging.Info("No active client for session %s - nothing to restart", sessionID)
@@ -1108,28 +1033,60 @@ func (sm *SessionManager) RestartClient(sessionID uuid.UUID) error {
 	return nil
 }
 
+// Permission requests must reach the frontend within permissionSendTimeout,
+// and the user then has permissionResponseTimeout to answer
+const (
+	permissionSendTimeout     = 5 * time.Second
+	permissionResponseTimeout = 60 * time.Second
+)
+
+// bypassesPermissions reports whether the session's permission mode skips permission prompts.
+// Only "allow-all" does; "read-only" and unknown modes keep the default prompting.
+func bypassesPermissions(options SessionOptions) bool {
+	return options.PermissionMode != nil && *options.PermissionMode == "allow-all"
+}
+
+// toolsWithoutPermission are tools that only touch the agent's own state, never files,
+// commands or the network, so asking the user about them would be noise
+var toolsWithoutPermission = map[string]struct{}{
+	"TodoWrite": {},
+}
+
+// neverNeedsPermission reports whether toolName is approved without asking
+func neverNeedsPermission(toolName string) bool {
+	_, ok := toolsWithoutPermission[toolName]
+	return ok
+}
+
 // createPermissionCallback creates the permission callback function for a session
 func (sm *SessionManager) createPermissionCallback(session *AgentSession) types.CanUseToolFunc {
-	sessionID := session.ID // Capture session ID to look up latest rules
+	// The permission mode is fixed for the client's lifetime, so decide once whether to gate tools
+	bypass := bypassesPermissions(session.Options)
 	return func(ctx context.Context, toolName string, input map[string]interface{}, permCtx types.ToolPermissionContext) (interface{}, error) {
-		requestID := uuid.New().String()
+		if bypass || neverNeedsPermission(toolName) {
+			return types.PermissionResultAllow{}, nil
+		}
+
+		permissionID := session.nextPermissionID()
+		requestID := strconv.FormatUint(permissionID, 10)
 		logging.Info("🔐 PERMISSION CALLBACK: tool=%s, requestID=%s", toolName, requestID)
 
-		// Check always-allow rules first - get latest rules from session manager
-		sm.mu.RLock()
-		currentSession, exists := sm.sessions[sessionID]
-		if exists {
-			logging.Info("📋 Checking %d always-allow rules for tool %s", len(currentSession.Options.AlwaysAllowRules), toolName)
-			if matched, ruleDesc := CheckAlwaysAllowRules(currentSession.Options.AlwaysAllowRules, toolName, input); matched {
+		// Check always-allow rules first. The session record is never replaced while it is
+		// in the session manager, so its latest rules are read directly instead of looking
+		// it up again; a cancelled context means it has since been ended or deleted.
+		if session.ctx.Err() == nil {
+			sm.mu.RLock()
+			logging.Debug("📋 Checking %d always-allow rules for tool %s", len(session.Options.AlwaysAllowRules), toolName)
+			if matched, ruleDesc := CheckAlwaysAllowRules(session.Options.AlwaysAllowRules, toolName, input); matched {
 				sm.mu.RUnlock()
 				logging.Info("✅ AUTO-APPROVED via always-allow rule: %s (rule: %s)", toolName, ruleDesc)
 				return types.PermissionResultAllow{}, nil
 			}
-			logging.Info("❌ No matching always-allow rule found for tool %s", toolName)
+			sm.mu.RUnlock()
+			logging.Debug("❌ No matching always-allow rule found for tool %s", toolName)
 		} else {
-			logging.Warning("⚠️ Session %s not found in session manager", sessionID)
+			logging.Warning("⚠️ Session %s is no longer active", session.ID)
 		}
-		sm.mu.RUnlock()
 
 		// Check if WebSocket is connected before proceeding with permission request
 		if !session.IsWebSocketConnected() {
@@ -1137,26 +1094,20 @@ func (sm *SessionManager) createPermissionCallback(session *AgentSession) types.
 			return types.PermissionResultDeny{Message: "WebSocket connection lost - cannot request permission"}, nil
 		}
 
-		responseChan := make(chan PermissionResponse, 1)
-
-		session.permMu.Lock()
-		session.pendingPermissions[requestID] = responseChan
-		session.permMu.Unlock()
+		responseChan := session.addPermission(permissionID)
+		defer session.removePermission(permissionID)
 
-		defer func() {
-			session.permMu.Lock()
-			delete(session.pendingPermissions, requestID)
-			session.permMu.Unlock()
-		}()
+		// One timer covers both the send and the wait for the user's response
+		timeout := time.NewTimer(permissionSendTimeout)
+		defer timeout.Stop()
 
 		// Send permission request to frontend via channel
 		select {
-		case session.permissionReqChan <- &PermissionRequest{
-			RequestID:    requestID,
-			ToolName:     toolName,
-			Input:        input,
-			Context:      permCtx,
-			ResponseChan: responseChan,
+		case session.permissionReqChan <- PermissionRequest{
+			RequestID: requestID,
+			ToolName:  toolName,
+			Input:     input,
+			Context:   permCtx,
 		}:
 			logging.Info("✅ Permission request sent to channel: %s", requestID)
 		case <-ctx.Done():
@@ -1165,12 +1116,13 @@ func (sm *SessionManager) createPermissionCallback(session *AgentSession) types.
 		case <-session.ctx.Done():
 			logging.Warning("Session context cancelled while sending permission request")
 			return types.PermissionResultDeny{Message: "Session ended"}, nil
-		case <-time.After(5 * time.Second):
+		case <-timeout.C:
 			logging.Warning("Timeout sending permission request to channel")
 			return types.PermissionResultDeny{Message: "Permission request timeout"}, nil
 		}
 
 		// Wait for response from frontend with reduced timeout (60 seconds instead of unlimited)
+		timeout.Reset(permissionResponseTimeout)
 		select {
 		case response := <-responseChan:
 			if response.Approved {
@@ -1199,13 +1151,16 @@ func (sm *SessionManager) createPermissionCallback(session *AgentSession) types.
 		case <-session.ctx.Done():
 			logging.Warning("⏱️ Session ended while waiting for permission (tool=%s, request %s)", toolName, requestID)
 			return types.PermissionResultDeny{Message: "Session ended"}, nil
-		case <-time.After(60 * time.Second): // Reduced from unlimited to 60 seconds
+		case <-timeout.C:
 			logging.Warning("⏱️ Permission request TIMEOUT for %s (request %s)", toolName, requestID)
 			return types.PermissionResultDeny{Message: "Permission request timed out after 60 seconds"}, nil
 		}
 	}
 }
 
+// queryResponseTimeout is how long receiveQueryResponses waits for the next message
+const queryResponseTimeout = 300 * time.Second
+
 // receiveQueryResponses receives responses from a Query and sends them to the response channel
 func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages <-chan types.Message) {
 	defer func() {
@@ -1222,7 +1177,16 @@ func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages
 	logging.Debug("Session %s: Starting to receive query responses", session.ID)
 
 	messageCount := 0
-	timeout := time.After(300 * time.Second) // 5 minute timeout for first message
+	debug := logging.DebugEnabled()
+
+	// A single timer is reused for the whole stream instead of allocating a new
+	// one per message, so long responses don't leave a trail of pending timers.
+	timeout := time.NewTimer(queryResponseTimeout)
+	defer timeout.Stop()
+
+	// Fields used on every message are read once for the whole stream
+	responseChan := session.responseChan
+	sessionDone := session.ctx.Done()
 
 	for {
 		select {
@@ -1231,8 +1195,10 @@ func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages
 				logging.Info("Session %s: Messages channel closed after %d messages", session.ID, messageCount)
 
 				// Refresh git branch after conversation turn completes
-				if _, changed, err := sm.RefreshGitBranch(session.ID); err == nil && changed {
-					logging.Debug("Session %s: Git branch updated after conversation turn", session.ID)
+				if _, changed := sm.refreshGitBranch(session); changed {
+					if debug {
+						logging.Debug("Session %s: Git branch updated after conversation turn", session.ID)
+					}
 				}
 
 				// Update session in database before finishing
@@ -1244,12 +1210,15 @@ func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages
 			}
 
 			messageCount++
-			logging.Debug("Session %s: Received message #%d, type: %s", session.ID, messageCount, msg.GetMessageType())
+			if debug {
+				logging.Debug("Session %s: Received message #%d, type: %s", session.ID, messageCount, msg.GetMessageType())
+			}
 
-			// Refresh git branch before forwarding message (especially after tool execution)
-			// This ensures the current message will have the updated git branch
-			if _, _, err := sm.RefreshGitBranch(session.ID); err != nil {
-				logging.Debug("Session %s: Failed to refresh git branch: %v", session.ID, err)
+			// Refresh git branch before forwarding tool results, since only tool
+			// execution can switch branches. This ensures the current message will
+			// have the updated git branch without spawning git for every streamed message
+			if _, isToolResult := msg.(*types.UserMessage); isToolResult {
+				sm.refreshGitBranch(session)
 			}
 
 			// Increment session message count atomically and get sequence number
@@ -1261,27 +1230,29 @@ func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages
 			// Save message to database based on type with proper sequence number
 			sm.persistSDKMessage(session.ID, sequenceNum, msg)
 
-			select {
-			case session.responseChan <- msg:
-				logging.Debug("Session %s: Message #%d forwarded to response channel", session.ID, messageCount)
-			case <-session.ctx.Done():
-				logging.Info("Session %s: Context cancelled after %d messages", session.ID, messageCount)
-				return
+			// Only forward while a WebSocket is attached. The message is already
+			// persisted, and blocking on a consumer that has gone away would stall
+			// the SDK stream until the session ends
+			if session.IsWebSocketConnected() {
+				select {
+				case responseChan <- msg:
+					if debug {
+						logging.Debug("Session %s: Message #%d forwarded to response channel", session.ID, messageCount)
+					}
+				case <-sessionDone:
+					logging.Info("Session %s: Context cancelled after %d messages", session.ID, messageCount)
+					return
+				}
+			} else if debug {
+				logging.Debug("Session %s: Message #%d not forwarded, WebSocket disconnected", session.ID, messageCount)
 			}
 
 			// Check if we should reload after this message (from "Allow Similar" flow)
-			session.pendingReloadMu.Lock()
-			shouldReload := session.pendingReload
-			if shouldReload {
-				session.pendingReload = false // Clear the flag
-			}
-			session.pendingReloadMu.Unlock()
-
-			if shouldReload {
+			// Swap clears the flag in the same step as reading it
+			if session.pendingReload.Swap(false) {
 				logging.Info("🔄 Pending reload detected - reloading session settings after message")
-				// Reload in a goroutine so we don't block message processing
-				go func() {
-					time.Sleep(300 * time.Millisecond) // Small delay to ensure message is fully processed
+				// Reload later so we don't block message processing; the small delay ensures the message is fully processed
+				session.afterDelay(300*time.Millisecond, func() {
 					if err := sm.ReloadSessionSettings(session.ID); err != nil {
 						logging.Error("Failed to reload session settings: %v", err)
 						return
@@ -1289,21 +1260,20 @@ func (sm *SessionManager) receiveQueryResponses(session *AgentSession, messages
 
 					// After reloading, send "continue" to resume
 					logging.Info("▶️  Auto-resuming session with 'continue' command")
-					time.Sleep(200 * time.Millisecond)
-					if err := sm.SendPrompt(session.ID, "continue"); err != nil {
-						logging.Error("Failed to auto-continue session: %v", err)
-					}
-				}()
+					session.afterDelay(200*time.Millisecond, func() {
+						sm.queueContinue(session)
+					})
+				})
 			}
 
 			// Reset timeout after each message
-			timeout = time.After(300 * time.Second)
+			timeout.Reset(queryResponseTimeout)
 
-		case <-timeout:
+		case <-timeout.C:
 			logging.Warning("Session %s: TIMEOUT waiting for messages (received %d so far)", session.ID, messageCount)
 			return
 
-		case <-session.ctx.Done():
+		case <-sessionDone:
 			logging.Info("Session %s: Context cancelled while waiting for messages", session.ID)
 			return
 		}
@@ -1328,9 +1298,18 @@ func (sm *SessionManager) RefreshGitBranch(sessionID uuid.UUID) (newBranch strin
 		return "", false, err
 	}
 
+	newBranch, changed = sm.refreshGitBranch(session)
+	return newBranch, changed, nil
+}
+
+// refreshGitBranch is RefreshGitBranch for a session the caller already holds,
+// so the response stream doesn't look the session up again for every tool result
+func (sm *SessionManager) refreshGitBranch(session *AgentSession) (newBranch string, changed bool) {
+	sessionID := session.ID
+
 	// Only refresh if we have a working directory
 	if session.Options.WorkingDirectory == nil || *session.Options.WorkingDirectory == "" {
-		return session.GitBranch, false, nil
+		return session.GitBranch, false
 	}
 
 	// Detect current git branch
@@ -1348,60 +1327,236 @@ func (sm *SessionManager) RefreshGitBranch(sessionID uuid.UUID) (newBranch strin
 		sm.mu.Unlock()
 	}
 
-	return currentBranch, changed, nil
+	return currentBranch, changed
+}
+
+// hasClient reports whether the session currently has a streaming client
+func (s *AgentSession) hasClient() bool {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	return s.client != nil
+}
+
+// shutdown tears down all of the session's runtime state: it denies pending permission
+// requests, closes the streaming client, if any, and cancels its context.
+// Denying first lets permission callbacks return before the client waits for the CLI to exit.
+func (s *AgentSession) shutdown() {
+	s.promptsMu.Lock()
+	select {
+	case <-s.promptsDone:
+	default:
+		close(s.promptsDone)
+	}
+	s.promptsMu.Unlock()
+	s.denyPendingPermissions("Session ended")
+	s.closeClient(s.ctx)
+	if s.cancel != nil {
+		s.cancel()
+	}
+}
+
+// closeClient closes the session's streaming client, if any, and clears the
+// reference so the next prompt creates a fresh one. Returns true if a client was closed
+func (s *AgentSession) closeClient(ctx context.Context) bool {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	if s.client == nil {
+		return false
+	}
+	if err := s.client.Close(ctx); err != nil {
+		logging.Warning("Error closing client for session %s: %v", s.ID, err)
+	}
+	s.client = nil
+	return true
 }
 
 // StartPermissionForwarder marks that the permission forwarder is running
 // Returns true if this call started it, false if it was already running
 func (s *AgentSession) StartPermissionForwarder() bool {
-	s.permForwarderMu.Lock()
-	defer s.permForwarderMu.Unlock()
+	// Only the caller that flips the flag from false to true starts the forwarder
+	return s.permForwarderRunning.CompareAndSwap(false, true)
+}
+
+// QueuePrompt queues job to run after every prompt queued before it.
+// Returns errPromptQueueFull if maxQueuedPrompts prompts are already waiting,
+// or errSessionEnded once the session has shut down and nothing would run the job.
+func (s *AgentSession) QueuePrompt(job promptJob) error {
+	s.promptsMu.Lock()
+	defer s.promptsMu.Unlock()
 
-	if s.permForwarderRunning {
-		return false // Already running
+	select {
+	case <-s.promptsDone:
+		return errSessionEnded
+	default:
 	}
 
-	s.permForwarderRunning = true
-	return true // Started by this call
+	// Most sessions, such as those restored at startup, never receive a prompt
+	s.promptSenderOnce.Do(func() { go s.sendQueuedPrompts() })
+	select {
+	case s.prompts <- job:
+		return nil
+	default:
+		return errPromptQueueFull
+	}
+}
+
+// dropQueuedPrompts discards prompts still waiting to be sent and returns how many there were
+func (s *AgentSession) dropQueuedPrompts() int {
+	dropped := 0
+	for {
+		select {
+		case <-s.prompts:
+			dropped++
+		default:
+			return dropped
+		}
+	}
+}
+
+// sendQueuedPrompts runs queued prompts one at a time, in the order they were queued,
+// until the session shuts down
+func (s *AgentSession) sendQueuedPrompts() {
+	for {
+		select {
+		case job := <-s.prompts:
+			job()
+		case <-s.promptsDone:
+			return
+		}
+	}
 }
 
 // StopPermissionForwarder marks that the permission forwarder has stopped
 func (s *AgentSession) StopPermissionForwarder() {
-	s.permForwarderMu.Lock()
-	defer s.permForwarderMu.Unlock()
-	s.permForwarderRunning = false
+	s.permForwarderRunning.Store(false)
 }
 
 // SetWebSocketConnected updates the WebSocket connection state
 func (s *AgentSession) SetWebSocketConnected(connected bool) {
-	s.wsConnMu.Lock()
-	defer s.wsConnMu.Unlock()
-	s.wsConnected = connected
+	s.wsConnected.Store(connected)
 }
 
 // IsWebSocketConnected returns the current WebSocket connection state
 func (s *AgentSession) IsWebSocketConnected() bool {
-	s.wsConnMu.Lock()
-	defer s.wsConnMu.Unlock()
-	return s.wsConnected
+	return s.wsConnected.Load()
+}
+
+// nextPermissionID returns a new permission request ID.
+// The frontend tracks permissions per session, so a per-session counter is enough and avoids
+// generating a random UUID per request; it also keys the pending table by integer.
+func (s *AgentSession) nextPermissionID() uint64 {
+	return s.lastPermissionID.Add(1)
+}
+
+// queueContinue queues a "continue" prompt so the agent resumes after its settings were reloaded
+func (sm *SessionManager) queueContinue(session *AgentSession) {
+	err := session.QueuePrompt(func() {
+		if err := sm.SendPrompt(session.ID, "continue"); err != nil {
+			logging.Error("Failed to auto-continue session: %v", err)
+		}
+	})
+	if err != nil {
+		logging.Warning("Not auto-continuing session %s: %v", session.ID, err)
+	}
+}
+
+// afterDelay runs fn on its own goroutine after delay, unless the session has ended by then.
+// Auto-continue work is fire-and-forget, so it is tied to the session's lifetime rather than
+// to the request that scheduled it; no goroutine is parked while waiting.
+func (s *AgentSession) afterDelay(delay time.Duration, fn func()) {
+	time.AfterFunc(delay, func() {
+		if s.ctx.Err() == nil {
+			fn()
+		}
+	})
+}
+
+// addPermission registers a pending permission request and returns the channel its response is delivered on
+func (s *AgentSession) addPermission(permissionID uint64) chan PermissionResponse {
+	responseChan := make(chan PermissionResponse, 1)
+	s.permMu.Lock()
+	if s.pendingPermissions == nil {
+		// Most sessions, such as those restored at startup, never ask for a permission
+		s.pendingPermissions = make(map[uint64]chan PermissionResponse)
+	}
+	s.pendingPermissions[permissionID] = responseChan
+	s.permMu.Unlock()
+	return responseChan
+}
+
+// removePermission drops a pending permission request once it is no longer awaited
+func (s *AgentSession) removePermission(permissionID uint64) {
+	s.permMu.Lock()
+	delete(s.pendingPermissions, permissionID)
+	s.permMu.Unlock()
+}
+
+// respondPermission delivers response to the pending request requestID.
+// Returns false if the request was already answered or is no longer awaited.
+func (s *AgentSession) respondPermission(requestID string, response PermissionResponse) bool {
+	responseChan, ok := s.takePermission(requestID)
+	if !ok {
+		return false
+	}
+	// Taking the request makes this the channel's only send, so its one slot is free
+	responseChan <- response
+	return true
+}
+
+// takePermission removes the pending permission request for requestID and returns its response channel.
+// Taking the request means each permission is answered at most once.
+func (s *AgentSession) takePermission(requestID string) (chan PermissionResponse, bool) {
+	permissionID, err := strconv.ParseUint(requestID, 10, 64)
+	if err != nil {
+		return nil, false
+	}
+
+	s.permMu.Lock()
+	defer s.permMu.Unlock()
+
+	responseChan, ok := s.pendingPermissions[permissionID]
+	if ok {
+		delete(s.pendingPermissions, permissionID)
+	}
+	return responseChan, ok
 }
 
 // CleanupPendingPermissions cancels all pending permissions with a disconnect message
 func (s *AgentSession) CleanupPendingPermissions() {
+	s.denyPendingPermissions("WebSocket connection lost")
+}
+
+// denyPendingPermissions answers every pending permission request with a denial and forgets them
+func (s *AgentSession) denyPendingPermissions(reason string) {
 	s.permMu.Lock()
 	defer s.permMu.Unlock()
 
-	for requestID, responseChan := range s.pendingPermissions {
-		logging.Info("Cleaning up pending permission: %s (WebSocket disconnected)", requestID)
+	for permissionID, responseChan := range s.pendingPermissions {
+		logging.Info("Cleaning up pending permission: %d (%s)", permissionID, reason)
 		select {
 		case responseChan <- PermissionResponse{
 			Approved:    false,
-			DenyMessage: "WebSocket connection lost",
+			DenyMessage: reason,
 		}:
 		default:
 			// Channel might be closed or full, ignore
 		}
-		delete(s.pendingPermissions, requestID)
+		delete(s.pendingPermissions, permissionID)
+	}
+}
+
+// DiscardPendingResponses drops messages queued for a WebSocket that has disconnected,
+// so a later prompt's stream doesn't start with stale messages from the previous turn
+func (s *AgentSession) DiscardPendingResponses() int {
+	discarded := 0
+	for {
+		select {
+		case <-s.responseChan:
+			discarded++
+		default:
+			return discarded
+		}
 	}
 }
 
@@ -1436,140 +1591,161 @@ func (sm *SessionManager) GetMessages(sessionID uuid.UUID, limit, offset int) ([
 	return sm.storage.GetMessages(sessionID, limit, offset)
 }
 
-// persistSDKMessage saves an SDK message to the database
-func (sm *SessionManager) persistSDKMessage(sessionID uuid.UUID, sequence int, msg types.Message) {
-	messageType := msg.GetMessageType()
+// lineJoiner joins strings with newlines, skipping the separator while the result is still empty.
+// Most assistant messages carry a single text block, which is returned as-is without being copied.
+type lineJoiner struct {
+	first string
+	b     strings.Builder
+}
 
-	switch messageType {
-	case "assistant":
-		// Assistant message contains multiple content blocks
-		if assistantMsg, ok := msg.(*types.AssistantMessage); ok {
-			var textContent, thinkingContent string
-			var toolUses []map[string]interface{}
-
-			// Extract content from blocks
-			for _, block := range assistantMsg.Content {
-				switch b := block.(type) {
-				case *types.TextBlock:
-					if textContent != "" {
-						textContent += "\n"
-					}
-					textContent += b.Text
+// add appends s to the joined result
+func (j *lineJoiner) add(s string) {
+	switch {
+	case j.b.Len() > 0:
+		j.b.WriteByte('\n')
+		j.b.WriteString(s)
+	case j.first == "":
+		j.first = s
+	default:
+		// Second non-empty part: copy into the builder once, sized for both parts
+		j.b.Grow(len(j.first) + 1 + len(s))
+		j.b.WriteString(j.first)
+		j.b.WriteByte('\n')
+		j.b.WriteString(s)
+	}
+}
 
-				case *types.ThinkingBlock:
-					if thinkingContent != "" {
-						thinkingContent += "\n"
-					}
-					thinkingContent += b.Thinking
+// String returns the joined result
+func (j *lineJoiner) String() string {
+	if j.b.Len() == 0 {
+		return j.first
+	}
+	return j.b.String()
+}
 
-				case *types.ToolUseBlock:
-					toolUses = append(toolUses, map[string]interface{}{
-						"id":    b.ID,
-						"name":  b.Name,
-						"input": b.Input,
-					})
-				}
+// persistSDKMessage saves an SDK message to the database
+func (sm *SessionManager) persistSDKMessage(sessionID uuid.UUID, sequence int, msg types.Message) {
+	switch m := msg.(type) {
+	case *types.AssistantMessage:
+		// Assistant message contains multiple content blocks
+		var textContent, thinkingContent lineJoiner
+		var toolUses []map[string]interface{}
+
+		// Extract content from blocks
+		for _, block := range m.Content {
+			switch b := block.(type) {
+			case *types.TextBlock:
+				textContent.add(b.Text)
+
+			case *types.ThinkingBlock:
+				thinkingContent.add(b.Thinking)
+
+			case *types.ToolUseBlock:
+				toolUses = append(toolUses, map[string]interface{}{
+					"id":    b.ID,
+					"name":  b.Name,
+					"input": b.Input,
+				})
 			}
+		}
 
-			// Save the combined assistant message
-			var toolUsesData interface{}
-			if len(toolUses) > 0 {
-				toolUsesData = toolUses
-			}
+		// Save the combined assistant message
+		var toolUsesData interface{}
+		if len(toolUses) > 0 {
+			toolUsesData = toolUses
+		}
 
-			if err := sm.saveMessageToDB(sessionID, sequence, "assistant", textContent, thinkingContent, toolUsesData); err != nil {
-				logging.Error("Failed to save assistant message: %v", err)
-			}
+		if err := sm.saveMessageToDB(sessionID, sequence, "assistant", textContent.String(), thinkingContent.String(), toolUsesData); err != nil {
+			logging.Error("Failed to save assistant message: %v", err)
 		}
 
-	case "result":
+	case *types.ResultMessage:
 		// Result message with cost and usage info
-		if resultMsg, ok := msg.(*types.ResultMessage); ok {
-			content := ""
-			if resultMsg.Result != nil {
-				content = *resultMsg.Result
-			}
+		content := ""
+		if m.Result != nil {
+			content = *m.Result
+		}
 
-			resultData := map[string]interface{}{
-				"duration_ms":     resultMsg.DurationMs,
-				"duration_api_ms": resultMsg.DurationAPIMs,
-				"is_error":        resultMsg.IsError,
-				"num_turns":       resultMsg.NumTurns,
-			}
-			if resultMsg.TotalCostUSD != nil {
-				resultData["total_cost_usd"] = *resultMsg.TotalCostUSD
-			}
-			if resultMsg.Usage != nil {
-				resultData["usage"] = resultMsg.Usage
-			}
+		resultData := map[string]interface{}{
+			"duration_ms":     m.DurationMs,
+			"duration_api_ms": m.DurationAPIMs,
+			"is_error":        m.IsError,
+			"num_turns":       m.NumTurns,
+		}
+		if m.TotalCostUSD != nil {
+			resultData["total_cost_usd"] = *m.TotalCostUSD
+		}
+		if m.Usage != nil {
+			resultData["usage"] = m.Usage
+		}
 
-			if err := sm.saveMessageToDB(sessionID, sequence, "system", content, "", resultData); err != nil {
-				logging.Error("Failed to save result message: %v", err)
-			}
+		if err := sm.saveMessageToDB(sessionID, sequence, "system", content, "", resultData); err != nil {
+			logging.Error("Failed to save result message: %v", err)
+		}
 
-			// Update session with cost and turn info
-			sm.mu.Lock()
-			if session, exists := sm.sessions[sessionID]; exists {
-				if resultMsg.TotalCostUSD != nil {
-					session.CostUSD = *resultMsg.TotalCostUSD
-				}
-				session.NumTurns = resultMsg.NumTurns
-				session.DurationMS = int64(resultMsg.DurationMs)
-
-				// Extract and store Claude CLI session ID for resuming conversations
-				if resultMsg.SessionID != "" && session.ClaudeSessionID == "" {
-					session.ClaudeSessionID = resultMsg.SessionID
-					logging.Debug("Extracted Claude session ID for session %s: %s", sessionID, resultMsg.SessionID)
-
-					// Persist to database
-					metadata := sm.sessionToMetadata(&session.Session)
-					if err := sm.storage.UpdateSession(metadata); err != nil {
-						logging.Error("Failed to persist Claude session ID: %v", err)
-					}
+		// Update session with cost and turn info
+		sm.mu.Lock()
+		if session, exists := sm.sessions[sessionID]; exists {
+			if m.TotalCostUSD != nil {
+				session.CostUSD = *m.TotalCostUSD
+			}
+			session.NumTurns = m.NumTurns
+			session.DurationMS = int64(m.DurationMs)
+
+			// Extract and store Claude CLI session ID for resuming conversations
+			if m.SessionID != "" && session.ClaudeSessionID == "" {
+				session.ClaudeSessionID = m.SessionID
+				logging.Debug("Extracted Claude session ID for session %s: %s", sessionID, m.SessionID)
+
+				// Persist to database
+				metadata := sm.sessionToMetadata(&session.Session)
+				if err := sm.storage.UpdateSession(metadata); err != nil {
+					logging.Error("Failed to persist Claude session ID: %v", err)
 				}
 			}
-			sm.mu.Unlock()
 		}
+		sm.mu.Unlock()
 
-	case "user":
+	case *types.UserMessage:
 		// User message (shouldn't normally come through here, but handle it)
-		if userMsg, ok := msg.(*types.UserMessage); ok {
-			content := ""
-
-			// Handle different content types:
-			// 1. String content (simple text prompt)
-			// 2. ContentBlocks (structured content with images, tool results, etc.)
-			if str, ok := userMsg.Content.(string); ok {
-				content = str
-			} else if contentBlocks, ok := userMsg.Content.([]types.ContentBlock); ok {
-				// User message contains ContentBlocks (e.g., tool results, images)
-				// Serialize to JSON for storage
-				contentJSON, err := json.Marshal(contentBlocks)
-				if err != nil {
-					logging.Error("Failed to marshal user content blocks: %v", err)
-					content = "" // Fallback to empty
-				} else {
-					content = string(contentJSON)
-				}
+		content := ""
+
+		// Handle different content types:
+		// 1. String content (simple text prompt)
+		// 2. ContentBlocks (structured content with images, tool results, etc.)
+		switch c := m.Content.(type) {
+		case string:
+			content = c
+		case []types.ContentBlock:
+			// User message contains ContentBlocks (e.g., tool results, images)
+			// Serialize to JSON for storage
+			contentJSON, err := json.Marshal(c)
+			if err != nil {
+				logging.Error("Failed to marshal user content blocks: %v", err)
+				content = "" // Fallback to empty
 			} else {
-				// Unknown content type - log warning and try to marshal as JSON
-				logging.Warning("Unknown user message content type: %T - attempting JSON marshal", userMsg.Content)
-				contentJSON, err := json.Marshal(userMsg.Content)
-				if err != nil {
-					logging.Error("Failed to marshal unknown user content: %v", err)
-					content = ""
-				} else {
-					content = string(contentJSON)
-				}
+				content = string(contentJSON)
 			}
-
-			if err := sm.saveMessageToDB(sessionID, sequence, "user", content, "", nil); err != nil {
-				logging.Error("Failed to save user message: %v", err)
+		default:
+			// Unknown content type - log warning and try to marshal as JSON
+			logging.Warning("Unknown user message content type: %T - attempting JSON marshal", m.Content)
+			contentJSON, err := json.Marshal(m.Content)
+			if err != nil {
+				logging.Error("Failed to marshal unknown user content: %v", err)
+				content = ""
+			} else {
+				content = string(contentJSON)
 			}
 		}
 
+		if err := sm.saveMessageToDB(sessionID, sequence, "user", content, "", nil); err != nil {
+			logging.Error("Failed to save user message: %v", err)
+		}
+
 	default:
 		// Log unhandled message types (system, stream_event, etc.)
-		logging.Debug("Unhandled message type for persistence: %s", messageType)
+		if logging.DebugEnabled() {
+			logging.Debug("Unhandled message type for persistence: %s", msg.GetMessageType())
+		}
 	}
 }
@@ -0,0 +1,374 @@
+package agents
+
+import (
+	"reflect"
+	"testing"
+	"time"
+
+	"github.com/google/uuid"
+	"github.com/schlunsen/claude-agent-sdk-go/types"
+)
+
+// TestDiscardPendingResponses tests that queued responses are dropped without blocking
+func TestDiscardPendingResponses(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.cancel()
+
+	if discarded := session.DiscardPendingResponses(); discarded != 0 {
+		t.Errorf("DiscardPendingResponses() on empty channel = %d, want 0", discarded)
+	}
+
+	session.responseChan <- &types.AssistantMessage{}
+	session.responseChan <- &types.ResultMessage{}
+
+	if discarded := session.DiscardPendingResponses(); discarded != 2 {
+		t.Errorf("DiscardPendingResponses() = %d, want 2", discarded)
+	}
+	if len(session.responseChan) != 0 {
+		t.Errorf("responseChan length = %d, want 0", len(session.responseChan))
+	}
+}
+
+// TestQueuePrompt tests that queued prompts run in arrival order and that a full queue rejects new ones
+func TestQueuePrompt(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.shutdown()
+
+	// Hold the sender on the first prompt so the rest stay queued
+	release := make(chan struct{})
+	started := make(chan struct{})
+	if err := session.QueuePrompt(func() { close(started); <-release }); err != nil {
+		t.Fatalf("QueuePrompt() on an empty queue = %v, want nil", err)
+	}
+	<-started
+
+	var order []int
+	done := make(chan struct{})
+	for i := 0; i < maxQueuedPrompts; i++ {
+		i := i
+		if err := session.QueuePrompt(func() {
+			order = append(order, i)
+			if i == maxQueuedPrompts-1 {
+				close(done)
+			}
+		}); err != nil {
+			t.Fatalf("QueuePrompt() #%d = %v, want nil", i+1, err)
+		}
+	}
+	if err := session.QueuePrompt(func() {}); err != errPromptQueueFull {
+		t.Errorf("QueuePrompt() beyond limit = %v, want %v", err, errPromptQueueFull)
+	}
+
+	close(release)
+	select {
+	case <-done:
+	case <-time.After(time.Second):
+		t.Fatal("queued prompts did not run")
+	}
+	for i, got := range order {
+		if got != i {
+			t.Fatalf("prompts ran in order %v, want ascending", order)
+		}
+	}
+}
+
+// TestQueuePromptAfterShutdown tests that an ended session rejects prompts instead of queuing them
+func TestQueuePromptAfterShutdown(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	session.shutdown()
+
+	if err := session.QueuePrompt(func() {}); err != errSessionEnded {
+		t.Errorf("QueuePrompt() after shutdown = %v, want %v", err, errSessionEnded)
+	}
+}
+
+// TestDropQueuedPrompts tests that prompts waiting behind a running one are discarded
+func TestDropQueuedPrompts(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.shutdown()
+
+	release := make(chan struct{})
+	started := make(chan struct{})
+	if err := session.QueuePrompt(func() { close(started); <-release }); err != nil {
+		t.Fatalf("QueuePrompt() = %v, want nil", err)
+	}
+	<-started
+
+	ran := make(chan struct{}, 2)
+	for i := 0; i < 2; i++ {
+		if err := session.QueuePrompt(func() { ran <- struct{}{} }); err != nil {
+			t.Fatalf("QueuePrompt() = %v, want nil", err)
+		}
+	}
+	if dropped := session.dropQueuedPrompts(); dropped != 2 {
+		t.Errorf("dropQueuedPrompts() = %d, want 2", dropped)
+	}
+
+	// A prompt queued after the drop still runs
+	after := make(chan struct{})
+	if err := session.QueuePrompt(func() { close(after) }); err != nil {
+		t.Fatalf("QueuePrompt() = %v, want nil", err)
+	}
+	close(release)
+	select {
+	case <-after:
+	case <-time.After(time.Second):
+		t.Fatal("prompt queued after the drop did not run")
+	}
+	if len(ran) != 0 {
+		t.Errorf("%d dropped prompts ran, want 0", len(ran))
+	}
+}
+
+// TestSessionCount tests that SessionCount reports the in-memory sessions
+func TestSessionCount(t *testing.T) {
+	sm := &SessionManager{sessions: make(map[uuid.UUID]*AgentSession)}
+	if count := sm.SessionCount(); count != 0 {
+		t.Errorf("SessionCount() = %d, want 0", count)
+	}
+
+	for i := 0; i < 3; i++ {
+		session := newAgentSession(Session{ID: uuid.New()})
+		defer session.cancel()
+		sm.sessions[session.ID] = session
+	}
+	if count := sm.SessionCount(); count != 3 {
+		t.Errorf("SessionCount() = %d, want 3", count)
+	}
+}
+
+// TestLineJoiner tests that lineJoiner joins parts like the newline-separated builder it replaces
+func TestLineJoiner(t *testing.T) {
+	tests := []struct {
+		name     string
+		parts    []string
+		expected string
+	}{
+		{name: "no parts", parts: nil, expected: ""},
+		{name: "single part", parts: []string{"hello"}, expected: "hello"},
+		{name: "two parts", parts: []string{"hello", "world"}, expected: "hello\nworld"},
+		{name: "three parts", parts: []string{"a", "b", "c"}, expected: "a\nb\nc"},
+		{name: "leading empty part", parts: []string{"", "hello"}, expected: "hello"},
+		{name: "trailing empty part", parts: []string{"hello", ""}, expected: "hello\n"},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			var j lineJoiner
+			for _, part := range tt.parts {
+				j.add(part)
+			}
+			if got := j.String(); got != tt.expected {
+				t.Errorf("String() = %q, want %q", got, tt.expected)
+			}
+		})
+	}
+}
+
+// TestTakePermission tests that a pending permission can only be taken once
+func TestTakePermission(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.cancel()
+
+	first := session.addPermission(1)
+	second := session.addPermission(2)
+
+	responseChan, ok := session.takePermission("1")
+	if !ok || responseChan != first {
+		t.Fatal("takePermission(1) did not return the registered channel")
+	}
+	if _, ok := session.takePermission("1"); ok {
+		t.Error("takePermission(1) succeeded twice, want false")
+	}
+
+	// A missing or unknown ID never answers another pending request
+	if _, ok := session.takePermission(""); ok {
+		t.Error("takePermission(\"\") = true, want false")
+	}
+	if _, ok := session.takePermission("3"); ok {
+		t.Error("takePermission(3) = true, want false")
+	}
+
+	responseChan, ok = session.takePermission("2")
+	if !ok || responseChan != second {
+		t.Fatal("takePermission(2) did not return the registered channel")
+	}
+
+	// Removing an already-taken request is a no-op
+	session.removePermission(2)
+}
+
+// TestNextPermissionID tests that permission request IDs are unique within a session
+func TestNextPermissionID(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.cancel()
+
+	first := session.nextPermissionID()
+	if second := session.nextPermissionID(); second == first {
+		t.Errorf("nextPermissionID() returned %d twice", first)
+	}
+	if _, ok := session.takePermission("not-a-number"); ok {
+		t.Error("takePermission() with a malformed ID = true, want false")
+	}
+}
+
+// TestAfterDelay tests that delayed work runs for an active session and is dropped once it ends
+func TestAfterDelay(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+
+	ran := make(chan struct{})
+	session.afterDelay(time.Millisecond, func() { close(ran) })
+	select {
+	case <-ran:
+	case <-time.After(time.Second):
+		t.Fatal("afterDelay() did not run fn for an active session")
+	}
+
+	session.afterDelay(10*time.Millisecond, func() { t.Error("afterDelay() ran fn after the session ended") })
+	session.cancel()
+	time.Sleep(50 * time.Millisecond)
+}
+
+// TestRespondPermission tests that a response is delivered once and only while the request is pending
+func TestRespondPermission(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.cancel()
+
+	responseChan := session.addPermission(1)
+	if !session.respondPermission("1", PermissionResponse{Approved: true}) {
+		t.Fatal("respondPermission() on a pending request = false, want true")
+	}
+	if session.respondPermission("1", PermissionResponse{}) {
+		t.Error("respondPermission() succeeded twice, want false")
+	}
+
+	select {
+	case response := <-responseChan:
+		if !response.Approved {
+			t.Error("delivered response was denied, want approved")
+		}
+	default:
+		t.Fatal("respondPermission() did not deliver the response")
+	}
+
+	if session.respondPermission("2", PermissionResponse{}) {
+		t.Error("respondPermission() for an unknown request = true, want false")
+	}
+}
+
+// TestQueryContent tests converting content blocks to the SDK query form
+func TestQueryContent(t *testing.T) {
+	content := []ContentBlock{
+		{Type: "text", Text: "describe this"},
+		{Type: "image", Source: &ImageSource{Type: "base64", MediaType: "image/png", Data: "aGVsbG8="}},
+		{Type: "image"},
+	}
+
+	expected := []interface{}{
+		map[string]interface{}{"type": "text", "text": "describe this"},
+		map[string]interface{}{
+			"type": "image",
+			"source": map[string]interface{}{
+				"type":       "base64",
+				"media_type": "image/png",
+				"data":       "aGVsbG8=",
+			},
+		},
+		map[string]interface{}{"type": "image"},
+	}
+
+	if got := queryContent(content); !reflect.DeepEqual(got, expected) {
+		t.Errorf("queryContent() = %v, want %v", got, expected)
+	}
+}
+
+// TestPendingPermissionsCreatedOnDemand tests that the pending permission map is only allocated
+// by the first request, and that every other operation works before then
+func TestPendingPermissionsCreatedOnDemand(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	defer session.cancel()
+
+	if session.pendingPermissions != nil {
+		t.Fatal("new session allocated its pending permission map up front")
+	}
+
+	// Operations on a session that never asked for a permission must not panic
+	if _, ok := session.takePermission("1"); ok {
+		t.Error("takePermission() on a new session = true, want false")
+	}
+	session.removePermission(1)
+	session.CleanupPendingPermissions()
+
+	session.addPermission(1)
+	if len(session.pendingPermissions) != 1 {
+		t.Errorf("len(pendingPermissions) = %d after addPermission, want 1", len(session.pendingPermissions))
+	}
+}
+
+// TestShutdownDeniesPendingPermissions tests that ending a session answers its pending permission requests
+func TestShutdownDeniesPendingPermissions(t *testing.T) {
+	session := newAgentSession(Session{ID: uuid.New()})
+	responseChan := session.addPermission(1)
+
+	session.shutdown()
+
+	select {
+	case response := <-responseChan:
+		if response.Approved {
+			t.Error("pending permission was approved on shutdown, want denied")
+		}
+	default:
+		t.Fatal("pending permission was not answered on shutdown")
+	}
+	if _, ok := session.takePermission("1"); ok {
+		t.Error("permission still pending after shutdown")
+	}
+	if session.ctx.Err() == nil {
+		t.Error("session context not cancelled after shutdown")
+	}
+}
+
+// TestBypassesPermissions tests that only the allow-all mode skips permission prompts
+func TestBypassesPermissions(t *testing.T) {
+	mode := func(s string) *string { return &s }
+
+	tests := []struct {
+		name string
+		mode *string
+		want bool
+	}{
+		{name: "unset", mode: nil, want: false},
+		{name: "allow-all", mode: mode("allow-all"), want: true},
+		{name: "read-only", mode: mode("read-only"), want: false},
+		{name: "unknown", mode: mode("plan"), want: false},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			if got := bypassesPermissions(SessionOptions{PermissionMode: tt.mode}); got != tt.want {
+				t.Errorf("bypassesPermissions() = %v, want %v", got, tt.want)
+			}
+		})
+	}
+}
+
+// TestNeverNeedsPermission tests that only tools without side effects skip the permission prompt
+func TestNeverNeedsPermission(t *testing.T) {
+	tests := []struct {
+		toolName string
+		want     bool
+	}{
+		{toolName: "TodoWrite", want: true},
+		{toolName: "Read", want: false},
+		{toolName: "Bash", want: false},
+		{toolName: "mcp__github__create_issue", want: false},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.toolName, func(t *testing.T) {
+			if got := neverNeedsPermission(tt.toolName); got != tt.want {
+				t.Errorf("neverNeedsPermission(%q) = %v, want %v", tt.toolName, got, tt.want)
+			}
+		})
+	}
+}
@@ -17,6 +17,7 @@ type SessionStorage interface {
 	GetSession(sessionID uuid.UUID) (*SessionMetadata, error)
 	ListSessions(statusFilter string) ([]*SessionMetadata, error)
 	DeleteSession(sessionID uuid.UUID) error
+	DeleteAllSessions() (int64, error)
 
 	// Message operations
 	SaveMessage(msg *MessageRecord) error
@@ -357,6 +358,23 @@ func (s *SQLiteSessionStorage) DeleteSession(sessionID uuid.UUID) error {
 	return nil
 }
 
+// DeleteAllSessions removes every session and its messages in a single statement
+func (s *SQLiteSessionStorage) DeleteAllSessions() (int64, error) {
+	result, err := s.db.Exec(`DELETE FROM agent_sessions`)
+	if err != nil {
+		return 0, fmt.Errorf("failed to delete sessions: %w", err)
+	}
+
+	rowsAffected, err := result.RowsAffected()
+	if err != nil {
+		return 0, fmt.Errorf("failed to get rows affected: %w", err)
+	}
+
+	// Messages are automatically deleted via CASCADE
+
+	return rowsAffected, nil
+}
+
 // SaveMessage inserts a new message into the database
 func (s *SQLiteSessionStorage) SaveMessage(msg *MessageRecord) error {
 	query := `
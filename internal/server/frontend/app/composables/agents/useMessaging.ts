@@ -251,7 +251,7 @@ export function useMessaging(params: MessagingParams) {
       agentWs.send({
         type: 'permission_response',
         session_id: request.session_id,
-        request_id: request.request_id,
+        permission_id: request.request_id,
         approved: approved,
         reason: reason
       })
@@ -111,6 +111,17 @@ export const useAgentWebSocket = () => {
               callbacks.onPermissionRequest?.(message)
               break
 
+            case 'permission_request_batch':
+              // Permission requests queued together arrive in one frame; handle each like a single request
+              for (const request of message.requests || []) {
+                callbacks.onPermissionRequest?.({
+                  type: 'permission_request',
+                  session_id: message.session_id,
+                  ...request
+                })
+              }
+              break
+
             case 'permission_acknowledged':
               callbacks.onPermissionAcknowledged?.(message)
               break
@@ -11,7 +11,6 @@ export interface ToolUse {
 
 export interface ToolResult {
   tool_use_id: string
-  content: any
   is_error?: boolean
   status: 'completed'
 }
@@ -11,6 +11,7 @@ import (
 	"os"
 	"path/filepath"
 	"strings"
+	"sync"
 	"time"
 
 	"github.com/google/uuid"
@@ -56,6 +57,14 @@ type Server struct {
 	verbose               bool // Enable verbose/debug logging
 }
 
+// agentWebSocketConfig sizes the agent socket buffers for streamed agent output.
+// Tool inputs, tool results and pasted images routinely exceed the 4KB defaults,
+// which would split each message into several fragments and writes.
+var agentWebSocketConfig = websocket.Config{
+	ReadBufferSize:  16 * 1024,
+	WriteBufferSize: 32 * 1024,
+}
+
 // NewServer creates a new Fiber server instance
 func NewServer(claudeDir string, port int) *Server {
 	return NewServerWithOptions(claudeDir, port, false, false)
@@ -218,6 +227,8 @@ func (s *Server) Setup() error {
 		AllowOrigins: strings.Join(config.CORS.AllowedOrigins, ","),
 		AllowMethods: "GET,POST,PUT,DELETE,OPTIONS",
 		AllowHeaders: "Origin,Content-Type,Accept,Authorization",
+		// WebSocket upgrades are not subject to CORS; skip the middleware for /ws and /agent/ws
+		Next: websocket.IsWebSocketUpgrade,
 	}
 	s.app.Use(cors.New(corsConfig))
 
@@ -403,7 +414,7 @@ func (s *Server) setupRoutes() {
 
 	// Agent WebSocket endpoint (direct, not proxied)
 	// Use Fiber's WebSocket middleware with our Fiber-compatible handler
-	s.app.Get("/agent/ws", websocket.New(s.agentHandler.HandleFiberWebSocket))
+	s.app.Get("/agent/ws", websocket.New(s.agentHandler.HandleFiberWebSocket, agentWebSocketConfig))
 
 	// Providers endpoint (serve providers.json for unified configuration)
 	api.Get("/providers", s.handleGetProviders)
@@ -960,11 +971,17 @@ func (s *Server) handleGetPromptStats(c *fiber.Ctx) error {
 
 	totalPrompts := len(allPrompts)
 
-	// Calculate average prompt length
+	// Sum prompt lengths and collect unique conversations and branches in one pass
 	totalLength := 0
-	if totalPrompts > 0 {
-		for _, msg := range allPrompts {
-			totalLength += msg.MessageLength
+	conversationSet := make(map[string]struct{})
+	branchSet := make(map[string]struct{})
+	for _, msg := range allPrompts {
+		totalLength += msg.MessageLength
+		if msg.ConversationID != "" {
+			conversationSet[msg.ConversationID] = struct{}{}
+		}
+		if msg.GitBranch != "" {
+			branchSet[msg.GitBranch] = struct{}{}
 		}
 	}
 
@@ -973,22 +990,6 @@ func (s *Server) handleGetPromptStats(c *fiber.Ctx) error {
 		avgLength = totalLength / totalPrompts
 	}
 
-	// Get unique conversations
-	conversationSet := make(map[string]bool)
-	for _, msg := range allPrompts {
-		if msg.ConversationID != "" {
-			conversationSet[msg.ConversationID] = true
-		}
-	}
-
-	// Get unique branches
-	branchSet := make(map[string]bool)
-	for _, msg := range allPrompts {
-		if msg.GitBranch != "" {
-			branchSet[msg.GitBranch] = true
-		}
-	}
-
 	return c.JSON(fiber.Map{
 		"total_prompts":      totalPrompts,
 		"avg_prompt_length":  avgLength,
@@ -1619,26 +1620,44 @@ func (s *Server) handleGetSessionResumeData(c *fiber.Ctx) error {
 
 	contextMessages := userMessages[len(userMessages)-contextLimit:]
 
-	// Build formatted context string
-	var contextBuilder strings.Builder
-	contextBuilder.WriteString("Previous conversation history:\n\n")
-
-	for _, msg := range contextMessages {
-		contextBuilder.WriteString(fmt.Sprintf("User: %s\n", msg.Message))
-		contextBuilder.WriteString(fmt.Sprintf("(at %s)\n\n", msg.SubmittedAt.Format("3:04 PM")))
-	}
-
 	return c.JSON(fiber.Map{
 		"conversation_id":    conversationID,
 		"session_name":       sessionName,
 		"working_directory":  workingDir,
-		"context":            contextBuilder.String(),
+		"context":            formatConversationContext(contextMessages),
 		"total_messages":     len(userMessages),
 		"last_activity":      userMessages[len(userMessages)-1].SubmittedAt,
 		"messages":           contextMessages,
 	})
 }
 
+// formatConversationContext formats prompts as the conversation history handed to an agent.
+// The builder is sized for every line up front and each part is written directly,
+// instead of formatting every line into a temporary string first.
+func formatConversationContext(messages []*database.UserMessage) string {
+	const header = "Previous conversation history:\n\n"
+	const lineOverhead = len("User: \n(at 12:00 PM)\n\n")
+
+	size := len(header)
+	for _, msg := range messages {
+		size += lineOverhead + len(msg.Message)
+	}
+
+	var b strings.Builder
+	b.Grow(size)
+	b.WriteString(header)
+
+	var timeBuf [len("12:00 PM")]byte
+	for _, msg := range messages {
+		b.WriteString("User: ")
+		b.WriteString(msg.Message)
+		b.WriteString("\n(at ")
+		b.Write(msg.SubmittedAt.AppendFormat(timeBuf[:0], "3:04 PM"))
+		b.WriteString(")\n\n")
+	}
+	return b.String()
+}
+
 // Handler: Get API key for frontend (secured endpoint)
 func (s *Server) handleGetAPIKey(c *fiber.Ctx) error {
 	// Only allow GET requests from same origin (browser)
@@ -1755,35 +1774,34 @@ func (s *Server) handleGetProjectPermissions(c *fiber.Ctx) error {
 	})
 }
 
-// Helper function to categorize permissions
-func categorizePermissions(permissions []string) map[string]interface{} {
-	categories := map[string][]string{
-		"bash":     []string{},
-		"read":     []string{},
-		"write":    []string{},
-		"edit":     []string{},
-		"webfetch": []string{},
-		"mcp":      []string{},
-		"other":    []string{},
+// permissionToolCategories maps the tool of a "Tool(pattern)" permission to its category
+var permissionToolCategories = map[string]string{
+	"Bash":     "bash",
+	"Read":     "read",
+	"Write":    "write",
+	"Edit":     "edit",
+	"WebFetch": "webfetch",
+}
+
+// permissionCategory splits the tool name off a permission once and looks its category up
+func permissionCategory(perm string) string {
+	if strings.HasPrefix(perm, "mcp__") {
+		return "mcp"
 	}
+	if open := strings.IndexByte(perm, '('); open > 0 {
+		if category, ok := permissionToolCategories[perm[:open]]; ok {
+			return category
+		}
+	}
+	return "other"
+}
 
+// Helper function to categorize permissions
+func categorizePermissions(permissions []string) map[string]interface{} {
+	categories := make(map[string][]string)
 	for _, perm := range permissions {
-		switch {
-		case strings.HasPrefix(perm, "Bash("):
-			categories["bash"] = append(categories["bash"], perm)
-		case strings.HasPrefix(perm, "Read("):
-			categories["read"] = append(categories["read"], perm)
-		case strings.HasPrefix(perm, "Write("):
-			categories["write"] = append(categories["write"], perm)
-		case strings.HasPrefix(perm, "Edit("):
-			categories["edit"] = append(categories["edit"], perm)
-		case strings.HasPrefix(perm, "WebFetch("):
-			categories["webfetch"] = append(categories["webfetch"], perm)
-		case strings.HasPrefix(perm, "mcp__"):
-			categories["mcp"] = append(categories["mcp"], perm)
-		default:
-			categories["other"] = append(categories["other"], perm)
-		}
+		category := permissionCategory(perm)
+		categories[category] = append(categories[category], perm)
 	}
 
 	// Build response with counts
@@ -1811,56 +1829,97 @@ func (s *Server) handleListAgents(c *fiber.Ctx) error {
 
 	agentsDir := filepath.Join(cwd, ".claude", "agents")
 
-	// Check if agents directory exists
-	if _, err := os.Stat(agentsDir); os.IsNotExist(err) {
+	// Read all markdown files in agents directory
+	entries, err := os.ReadDir(agentsDir)
+	if os.IsNotExist(err) {
 		return c.JSON(fiber.Map{
 			"agents": make(map[string]interface{}),
 			"count":  0,
 			"dir":    agentsDir,
 		})
 	}
-
-	// Read all markdown files in agents directory
-	entries, err := os.ReadDir(agentsDir)
 	if err != nil {
 		return c.Status(500).JSON(fiber.Map{
 			"error": fmt.Sprintf("Failed to read agents directory: %v", err),
 		})
 	}
 
-	agents := make(map[string]interface{})
-
+	// Only process markdown files
+	var files []os.DirEntry
 	for _, entry := range entries {
-		if entry.IsDir() {
-			continue
+		if !entry.IsDir() && strings.HasSuffix(entry.Name(), ".md") {
+			files = append(files, entry)
 		}
+	}
 
-		// Only process markdown files
-		if !strings.HasSuffix(entry.Name(), ".md") {
-			continue
-		}
+	parsed := loadAgentFiles(agentsDir, files)
 
-		agentName := strings.TrimSuffix(entry.Name(), ".md")
-		filePath := filepath.Join(agentsDir, entry.Name())
+	// Reuse the encoded response while none of the agent files changed
+	body, ok := agentLists.get(agentsDir, parsed)
+	if !ok {
+		agents := make(map[string]interface{}, len(files))
+		for i, af := range parsed {
+			if af != nil && af.frontmatter != nil && af.frontmatter["name"] != nil {
+				agents[strings.TrimSuffix(files[i].Name(), ".md")] = af.frontmatter
+			}
+		}
 
-		// Read file
-		content, err := os.ReadFile(filePath)
+		body, err = json.Marshal(fiber.Map{
+			"agents": agents,
+			"count":  len(agents),
+			"dir":    agentsDir,
+		})
 		if err != nil {
-			continue
+			return c.Status(500).JSON(fiber.Map{
+				"error": fmt.Sprintf("Failed to encode agents: %v", err),
+			})
 		}
+		agentLists.put(agentsDir, parsed, body)
+	}
 
-		// Parse frontmatter
-		agentData := parseFrontmatter(string(content))
-		if agentData != nil && agentData["name"] != nil {
-			agents[agentName] = agentData
-		}
+	c.Set("Content-Type", fiber.MIMEApplicationJSON)
+	return c.Send(body)
+}
+
+// agentLoadWorkers bounds how many agent files are read concurrently
+const agentLoadWorkers = 8
+
+// loadAgentFiles returns the parsed agent for each file in dir, overlapping the file reads.
+// Unchanged files are served from the agent file cache, and cached files no longer in the listing are dropped.
+// The result is indexed like files; unreadable files yield nil.
+func loadAgentFiles(dir string, files []os.DirEntry) []*agentFile {
+	results := make([]*agentFile, len(files))
+
+	workers := agentLoadWorkers
+	if len(files) < workers {
+		workers = len(files)
+	}
+
+	indexes := make(chan int)
+	var wg sync.WaitGroup
+	for w := 0; w < workers; w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			for i := range indexes {
+				af, err := agentFiles.loadEntry(dir, files[i])
+				if err != nil {
+					continue
+				}
+				results[i] = af
+			}
+		}()
 	}
 
-	return c.JSON(fiber.Map{
-		"agents": agents,
-		"count":  len(agents),
-		"dir":    agentsDir,
-	})
+	for i := range files {
+		indexes <- i
+	}
+	close(indexes)
+	wg.Wait()
+
+	agentFiles.prune(dir, files)
+
+	return results
 }
 
 // Handler: Get specific agent details with full system prompt
@@ -1881,108 +1940,80 @@ func (s *Server) handleGetAgentDetail(c *fiber.Ctx) error {
 
 	agentFile := filepath.Join(cwd, ".claude", "agents", agentName+".md")
 
-	// Check if agent file exists
-	if _, err := os.Stat(agentFile); os.IsNotExist(err) {
+	// Read and parse file (served from cache when unchanged)
+	af, err := agentFiles.load(agentFile)
+	if os.IsNotExist(err) {
 		return c.Status(404).JSON(fiber.Map{
 			"error": fmt.Sprintf("Agent '%s' not found", agentName),
 		})
 	}
-
-	// Read file
-	content, err := os.ReadFile(agentFile)
 	if err != nil {
 		return c.Status(500).JSON(fiber.Map{
 			"error": fmt.Sprintf("Failed to read agent file: %v", err),
 		})
 	}
 
-	// Parse frontmatter and system prompt
-	agentData := parseFrontmatterWithPrompt(string(content))
-	if agentData == nil {
+	// Frontmatter and system prompt
+	if af.detail == nil {
 		return c.Status(500).JSON(fiber.Map{
 			"error": "Failed to parse agent file",
 		})
 	}
 
-	return c.JSON(fiber.Map{
-		"agent": agentData,
-	})
-}
-
-// parseFrontmatter extracts YAML frontmatter from markdown content
-func parseFrontmatter(content string) map[string]interface{} {
-	// Look for frontmatter between --- markers
-	lines := strings.Split(content, "\n")
-	if len(lines) < 3 || lines[0] != "---" {
-		return nil
+	body, err := af.detailJSON()
+	if err != nil {
+		return c.Status(500).JSON(fiber.Map{
+			"error": fmt.Sprintf("Failed to encode agent: %v", err),
+		})
 	}
 
-	// Find closing ---
-	var endLine int
-	for i := 1; i < len(lines); i++ {
-		if lines[i] == "---" {
-			endLine = i
-			break
-		}
-	}
+	c.Set("Content-Type", fiber.MIMEApplicationJSON)
+	return c.Send(body)
+}
 
-	if endLine == 0 {
-		return nil
+// splitFrontmatter locates the frontmatter between --- markers without splitting the whole file.
+// hasBody reports whether anything (even an empty line) follows the closing marker.
+func splitFrontmatter(content string) (frontmatter, body string, hasBody, ok bool) {
+	if !strings.HasPrefix(content, "---\n") {
+		return "", "", false, false
 	}
+	rest := content[len("---\n"):]
 
-	// Extract YAML lines
-	yamlLines := lines[1:endLine]
-	data := make(map[string]interface{})
-
-	for _, line := range yamlLines {
-		line = strings.TrimSpace(line)
-		if line == "" || strings.HasPrefix(line, "#") {
-			continue
+	// Find closing --- on a line of its own
+	for pos := 0; ; {
+		nl := strings.IndexByte(rest[pos:], '\n')
+		line := rest[pos:]
+		if nl >= 0 {
+			line = rest[pos : pos+nl]
 		}
 
-		// Simple YAML parsing (key: value format)
-		if idx := strings.Index(line, ":"); idx > 0 {
-			key := strings.TrimSpace(line[:idx])
-			value := strings.TrimSpace(line[idx+1:])
-
-			// Remove quotes if present
-			if strings.HasPrefix(value, "\"") && strings.HasSuffix(value, "\"") {
-				value = value[1 : len(value)-1]
+		if line == "---" {
+			if nl < 0 {
+				// Closing marker ends the file; an empty block here is not frontmatter
+				return rest[:pos], "", false, pos > 0
 			}
+			return rest[:pos], rest[pos+nl+1:], true, true
+		}
 
-			data[key] = value
+		if nl < 0 {
+			return "", "", false, false
 		}
+		pos += nl + 1
 	}
-
-	return data
 }
 
-// parseFrontmatterWithPrompt extracts frontmatter AND system prompt from markdown
-func parseFrontmatterWithPrompt(content string) map[string]interface{} {
-	// Look for frontmatter between --- markers
-	lines := strings.Split(content, "\n")
-	if len(lines) < 3 || lines[0] != "---" {
-		return nil
-	}
+// parseFrontmatterFields parses simple "key: value" frontmatter lines
+func parseFrontmatterFields(frontmatter string) map[string]interface{} {
+	data := make(map[string]interface{})
 
-	// Find closing ---
-	var endLine int
-	for i := 1; i < len(lines); i++ {
-		if lines[i] == "---" {
-			endLine = i
-			break
+	for frontmatter != "" {
+		line := frontmatter
+		if nl := strings.IndexByte(frontmatter, '\n'); nl >= 0 {
+			line, frontmatter = frontmatter[:nl], frontmatter[nl+1:]
+		} else {
+			frontmatter = ""
 		}
-	}
-
-	if endLine == 0 {
-		return nil
-	}
 
-	// Extract YAML lines
-	yamlLines := lines[1:endLine]
-	data := make(map[string]interface{})
-
-	for _, line := range yamlLines {
 		line = strings.TrimSpace(line)
 		if line == "" || strings.HasPrefix(line, "#") {
 			continue
@@ -1994,7 +2025,7 @@ func parseFrontmatterWithPrompt(content string) map[string]interface{} {
 			value := strings.TrimSpace(line[idx+1:])
 
 			// Remove quotes if present
-			if strings.HasPrefix(value, "\"") && strings.HasSuffix(value, "\"") {
+			if len(value) >= 2 && strings.HasPrefix(value, "\"") && strings.HasSuffix(value, "\"") {
 				value = value[1 : len(value)-1]
 			}
 
@@ -2002,22 +2033,6 @@ func parseFrontmatterWithPrompt(content string) map[string]interface{} {
 		}
 	}
 
-	// Extract system prompt (everything after the closing ---)
-	if endLine+1 < len(lines) {
-		promptLines := lines[endLine+1:]
-		// Skip empty lines at start
-		for i := 0; i < len(promptLines); i++ {
-			if strings.TrimSpace(promptLines[i]) != "" {
-				promptLines = promptLines[i:]
-				break
-			}
-		}
-		systemPrompt := strings.Join(promptLines, "\n")
-		systemPrompt = strings.TrimSpace(systemPrompt)
-		data["system_prompt"] = systemPrompt
-		data["system_prompt_length"] = len(systemPrompt)
-	}
-
 	return data
 }
 
@@ -3,11 +3,15 @@ package server
 import (
 	"io"
 	"net/http/httptest"
+	"os"
+	"path/filepath"
 	"strings"
 	"testing"
+	"time"
 
 	"github.com/gofiber/fiber/v2"
 	"github.com/schlunsen/claude-control-terminal/internal/analytics"
+	"github.com/schlunsen/claude-control-terminal/internal/database"
 	ws "github.com/schlunsen/claude-control-terminal/internal/websocket"
 )
 
@@ -627,3 +631,156 @@ func TestServerFieldAccess(t *testing.T) {
 		t.Error("app should be initialized")
 	}
 }
+
+func TestParseAgentFile(t *testing.T) {
+	tests := []struct {
+		name       string
+		content    string
+		wantNil    bool
+		wantName   string
+		wantPrompt *string
+	}{
+		{
+			name:       "frontmatter with prompt",
+			content:    "---\nname: \"reviewer\"\n# comment\ndescription: Reviews code\n---\n\n\nYou review code.\n",
+			wantName:   "reviewer",
+			wantPrompt: strPtr("You review code."),
+		},
+		{
+			name:       "closing marker at end of file",
+			content:    "---\nname: reviewer\n---",
+			wantName:   "reviewer",
+			wantPrompt: nil,
+		},
+		{
+			name:       "empty prompt after closing marker",
+			content:    "---\nname: reviewer\n---\n",
+			wantName:   "reviewer",
+			wantPrompt: strPtr(""),
+		},
+		{
+			name:    "no frontmatter",
+			content: "# Just markdown\n",
+			wantNil: true,
+		},
+		{
+			name:    "unterminated frontmatter",
+			content: "---\nname: reviewer\n",
+			wantNil: true,
+		},
+		{
+			name:    "empty frontmatter at end of file",
+			content: "---\n---",
+			wantNil: true,
+		},
+	}
+
+	for _, tt := range tests {
+		t.Run(tt.name, func(t *testing.T) {
+			data := parseAgentFile(tt.content).detail
+			if tt.wantNil {
+				if data != nil {
+					t.Errorf("expected nil, got %v", data)
+				}
+				return
+			}
+			if data == nil {
+				t.Fatal("expected frontmatter data, got nil")
+			}
+
+			if data["name"] != tt.wantName {
+				t.Errorf("expected name %q, got %v", tt.wantName, data["name"])
+			}
+
+			prompt, hasPrompt := data["system_prompt"]
+			if tt.wantPrompt == nil {
+				if hasPrompt {
+					t.Errorf("expected no system_prompt, got %q", prompt)
+				}
+			} else if prompt != *tt.wantPrompt {
+				t.Errorf("expected system_prompt %q, got %v", *tt.wantPrompt, prompt)
+			}
+		})
+	}
+}
+
+func strPtr(s string) *string {
+	return &s
+}
+
+func TestLoadAgentFiles(t *testing.T) {
+	tmpDir := t.TempDir()
+	files := map[string]string{
+		"a.md": "---\nname: a\n---\nPrompt A",
+		"b.md": "no frontmatter",
+		"c.md": "---\nname: c\n---\n",
+	}
+	for name, content := range files {
+		if err := os.WriteFile(filepath.Join(tmpDir, name), []byte(content), 0644); err != nil {
+			t.Fatalf("Failed to write %s: %v", name, err)
+		}
+	}
+
+	entries, err := os.ReadDir(tmpDir)
+	if err != nil {
+		t.Fatalf("Failed to read dir: %v", err)
+	}
+
+	// File removed after listing
+	if err := os.Remove(filepath.Join(tmpDir, "c.md")); err != nil {
+		t.Fatalf("Failed to remove c.md: %v", err)
+	}
+
+	results := loadAgentFiles(tmpDir, entries)
+	if len(results) != 3 {
+		t.Fatalf("expected 3 results, got %d", len(results))
+	}
+	if results[0] == nil || results[0].frontmatter["name"] != "a" {
+		t.Errorf("expected agent 'a' at index 0, got %v", results[0])
+	}
+	if results[1] == nil || results[1].frontmatter != nil {
+		t.Errorf("expected no frontmatter for file without frontmatter, got %v", results[1])
+	}
+	if results[2] != nil {
+		t.Errorf("expected nil for removed file, got %v", results[2])
+	}
+}
+
+func TestPermissionCategory(t *testing.T) {
+	tests := map[string]string{
+		"Bash(git:*)":            "bash",
+		"Read(//tmp/**)":         "read",
+		"Write(**)":              "write",
+		"Edit(**)":               "edit",
+		"WebFetch(domain:x.com)": "webfetch",
+		"mcp__github__get_issue": "mcp",
+		"Glob(*)":                "other",
+		"Bash":                   "other",
+		"BashOutput(*)":          "other",
+		"(Bash)":                 "other",
+	}
+
+	for perm, expected := range tests {
+		if got := permissionCategory(perm); got != expected {
+			t.Errorf("expected category %q for %q, got %q", expected, perm, got)
+		}
+	}
+}
+
+func TestFormatConversationContext(t *testing.T) {
+	messages := []*database.UserMessage{
+		{Message: "fix the build", SubmittedAt: time.Date(2025, 1, 2, 9, 5, 0, 0, time.UTC)},
+		{Message: "now add tests", SubmittedAt: time.Date(2025, 1, 2, 14, 30, 0, 0, time.UTC)},
+	}
+
+	expected := "Previous conversation history:\n\n" +
+		"User: fix the build\n(at 9:05 AM)\n\n" +
+		"User: now add tests\n(at 2:30 PM)\n\n"
+	if got := formatConversationContext(messages); got != expected {
+		t.Errorf("expected %q, got %q", expected, got)
+	}
+
+	if got := formatConversationContext(nil); got != "Previous conversation history:\n\n" {
+		t.Errorf("expected header only for no messages, got %q", got)
+	}
+}